@@ -1,5 +1,8 @@
 # myapp/middleware.py
 
+import re
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 
@@ -7,22 +10,35 @@ from django.urls import reverse
 class LoginRequiredMiddleware:
     """
     Middleware that requires a user to be authenticated to access certain views.
+
+    The public paths are resolved once, when the middleware is created:
+    LOGIN_EXEMPT_URLS (URL names), LOGIN_EXEMPT_PREFIXES (path prefixes like
+    the static files) and LOGIN_EXEMPT_REGEXES. They are checked before the
+    user, so a public request never loads the session.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
+        # Paths that don't require authentication
+        self.exempt_urls = frozenset(reverse(name) for name in settings.LOGIN_EXEMPT_URLS)
+        self.exempt_prefixes = tuple(settings.LOGIN_EXEMPT_PREFIXES)
+        self.exempt_regex = (
+            re.compile("|".join(f"(?:{regex})" for regex in settings.LOGIN_EXEMPT_REGEXES))
+            if settings.LOGIN_EXEMPT_REGEXES else None
+        )
+        self.login_url = reverse("login")
+
+    def is_exempt(self, path):
+        return (
+            path in self.exempt_urls
+            or path.startswith(self.exempt_prefixes)
+            or (self.exempt_regex is not None and self.exempt_regex.match(path) is not None)
+        )
 
     def __call__(self, request):
-        # List of URL names that don't require authentication
-        exempt_urls = [
-            reverse("login"),
-            reverse("register")
-            # Add other URLs that should be accessible without login
-        ]
-
-        # Check if the user is not authenticated and the requested URL is not exempt
-        if not request.user.is_authenticated and request.path not in exempt_urls:
-            return redirect("login")  # Redirect to the login page
+        # Check if the requested URL is not exempt and the user is not authenticated
+        if not self.is_exempt(request.path) and not request.user.is_authenticated:
+            return redirect(self.login_url)  # Redirect to the login page
 
         response = self.get_response(request)
         return response
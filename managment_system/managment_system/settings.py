@@ -82,6 +82,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "supply_room.apps.SupplyRoomConfig",
     # other 3rd party apps…
     "django_select2",
@@ -94,11 +95,17 @@ LOGIN_REDIRECT_URL = "/"  # new
 LOGOUT_REDIRECT_URL = "/"  # new
 
 MIDDLEWARE = [
+    # First, so the metrics include the time of the other middleware
+    "supply_room.metrics.MetricsMiddleware",
+    # Removed from the chain unless SLOW_QUERY_THRESHOLD_MS is set
+    "supply_room.slow_queries.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Needs the user, profiles the requests of the admins with ?perfilar
+    "supply_room.profiling.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "managment_system.middleware.LoginRequiredMiddleware",
@@ -205,6 +212,13 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR.parent / "static"
 
+# Paths that LoginRequiredMiddleware serves without authentication, checked
+# before the session is loaded: URL names, path prefixes and regular
+# expressions matched from the start of the path
+LOGIN_EXEMPT_URLS = ["login", "register", "health"]
+LOGIN_EXEMPT_PREFIXES = [f"/{STATIC_URL}"]
+LOGIN_EXEMPT_REGEXES = []
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -215,15 +229,26 @@ AUTH_USER_MODEL = "supply_room.Users"
 
 CRONJOBS = [
     ('0 6-22 * * 1-5', 'supply_room.cron.clear_expired_requests', '>> /tmp/cron_stdout.log 2>&1'),
+    ('* * * * *', 'supply_room.outbox.send_outbox', '>> /tmp/cron_stdout.log 2>&1'),
 ]
 
 CRONTAB_COMMAND_PREFIX = 'SHELL=/bin/bash'
 
-# For email sending through SMTP
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# For email sending through SMTP, the emails are queued in OutboundEmail
+# and sent by the send_emails command (or the cron job)
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = 'smtp.ucr.ac.cr'
 EMAIL_HOST_USER = 'sebastian.vargasquesada@ucr.ac.cr'
 EMAIL_HOST_PASSWORD = '****'
 EMAIL_SUBJECT_PREFIX = '[EIEInfo]'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+# Seconds before a stuck connection to the mail server is dropped
+EMAIL_TIMEOUT = 30
+
+# Slow query watchdog (supply_room.slow_queries): the SQL statements slower
+# than this many milliseconds are saved in SlowQuery, browsable in the admin.
+# Disabled when unset. SLOW_QUERY_EXPLAIN also saves their EXPLAIN (ANALYZE,
+# BUFFERS) plan, which runs the query a second time.
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", default=None)
+SLOW_QUERY_EXPLAIN = env.bool("SLOW_QUERY_EXPLAIN", default=False)
@@ -24,6 +24,7 @@ from . import views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("health", views.health_view, name="health"),
     path(
         "login/",
         LoginView.as_view(template_name="registration/login.html"),
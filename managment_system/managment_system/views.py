@@ -1,5 +1,13 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 
 
 def home_view(request):
     return render(request, "page/home.html", {})
+
+
+def health_view(request):
+    """
+    Liveness check for the load balancer, public and without database queries
+    """
+    return HttpResponse("ok", content_type="text/plain")
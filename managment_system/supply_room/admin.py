@@ -4,6 +4,9 @@ This allows each model to appear on the django admin console.
 """
 
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 
 from .models import *
 
@@ -12,6 +15,11 @@ class ItemAdmin(admin.ModelAdmin):
     pass
 
 
+class ItemStockAdmin(admin.ModelAdmin):
+    list_display = ("name", "total", "available", "on_loan", "requested")
+    search_fields = ("name",)
+
+
 class UserAdmin(admin.ModelAdmin):
     pass
 
@@ -28,8 +36,14 @@ class OrderAdmin(admin.ModelAdmin):
     pass
 
 
+class ItemOrderUnitInline(admin.TabularInline):
+    model = ItemOrderUnit
+    raw_id_fields = ("item",)
+    extra = 0
+
+
 class ItemOrderAdmin(admin.ModelAdmin):
-    pass
+    inlines = [ItemOrderUnitInline]
 
 
 class UserOrderAdmin(admin.ModelAdmin):
@@ -40,7 +54,61 @@ class StudentGroupsAdmin(admin.ModelAdmin):
     pass
 
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "next_attempt", "created", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "from_email")
+    readonly_fields = ("attempts", "last_error", "created", "sent_at")
+    actions = ["retry"]
+
+    @admin.action(description="Reintentar el envío")
+    def retry(self, request, queryset):
+        queryset.exclude(status="enviado").update(
+            status="pendiente", attempts=0, next_attempt=timezone.now(), last_error=""
+        )
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ("created", "duration", "view", "caller", "template", "short_statement")
+    list_filter = ("view",)
+    search_fields = ("statement", "fingerprint", "caller", "template")
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+    change_list_template = "admin/supply_room/slowquery/change_list.html"
+
+    @admin.display(description="Consulta")
+    def short_statement(self, obj):
+        return obj.statement[:120]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "huellas/",
+                self.admin_site.admin_view(self.fingerprints_view),
+                name="supply_room_slowquery_fingerprints",
+            ),
+        ] + super().get_urls()
+
+    def fingerprints_view(self, request):
+        """
+        The slow queries grouped by fingerprint, the most expensive first
+        """
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Consultas lentas por huella",
+            "fingerprints": SlowQuery.objects.by_fingerprint(),
+        }
+        return TemplateResponse(request, "admin/supply_room/slowquery/fingerprints.html", context)
+
+
 admin.site.register(Item, ItemAdmin)
+admin.site.register(ItemStock, ItemStockAdmin)
 admin.site.register(Users, UserAdmin)
 admin.site.register(Class, ClassAdmin)
 admin.site.register(ClassGroups, GroupsAdmin)
@@ -48,3 +116,5 @@ admin.site.register(Order, OrderAdmin)
 admin.site.register(ItemOrder, ItemOrderAdmin)
 admin.site.register(UserOrder, UserOrderAdmin)
 admin.site.register(StudentGroups, StudentGroupsAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
+admin.site.register(SlowQuery, SlowQueryAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SupplyRoomConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "supply_room"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,60 @@
+"""
+Cache of the memberships used by the permission checks of the views
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Seconds the memberships of a user are cached, the signals of the app
+# invalidate them before when they change
+AUTHZ_CACHE_TIMEOUT = 300
+
+
+def authz_cache_key(user_id):
+    return f"authz:{user_id}"
+
+
+def get_authorization(request):
+    """
+    Role, group ids and order ids of the user of the request, used by the
+    permission checks of the views.
+    Kept on the request and in the cache, the database is only queried when
+    the cache was invalidated (see invalidate_authorization) or the role changed.
+    """
+    authz = getattr(request, "_authz", None)
+    if authz is None:
+        user = request.user
+        authz = cache.get(authz_cache_key(user.pk))
+        if authz is None or authz["role"] != user.role:
+            authz = build_authorization(user)
+            cache.set(authz_cache_key(user.pk), authz, AUTHZ_CACHE_TIMEOUT)
+        request._authz = authz
+    return authz
+
+
+def build_authorization(user):
+    """
+    Loads the groups (as student or professor) and the orders of a user
+    """
+    # The models invalidate the cache, they can't be imported at the top
+    from .models import ClassGroups, StudentGroups, UserOrder
+
+    groups = set(StudentGroups.objects.filter(student=user).values_list("group_id", flat=True))
+    groups.update(ClassGroups.objects.filter(professor=user).values_list("id", flat=True))
+    return {
+        "role": user.role,
+        "groups": frozenset(groups),
+        "orders": frozenset(UserOrder.objects.filter(user=user).values_list("order_id", flat=True)),
+    }
+
+
+def invalidate_authorization(user_ids):
+    """
+    Drops the cached memberships of the given users, now and again when the
+    current transaction commits, so a request running meanwhile can't cache
+    the memberships from before the change
+    """
+    keys = [authz_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
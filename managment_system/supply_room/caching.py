@@ -0,0 +1,149 @@
+"""
+Versioned cache of the rendered lists of the app.
+
+Every cached fragment key includes the generation of the models it shows.
+The signals of the app and the methods that write without signals bump the
+generation of a model when its rows change, so the old fragments are never
+read again and expire on their own.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Seconds a rendered fragment is kept, the generations invalidate it before
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# Names of the cached fragments, for the hit and miss counters
+FRAGMENT_NAMES = set()
+
+
+def generation_key(model):
+    return f"generation:{model}"
+
+
+def get_generations(models):
+    """
+    Current generation of each model, in one round trip to the cache
+    """
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # A new or evicted counter starts from the clock, so it never
+            # repeats a generation used by fragments that are still cached
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(*models, now=True):
+    """
+    Invalidates the fragments of the given models, now and again when the
+    current transaction commits, so a request running meanwhile can't cache
+    a fragment with the data from before the change.
+
+    With now=False only at the commit: for the writes that hold row locks,
+    a slow cache doesn't keep them locked longer.
+    """
+    def bump():
+        for model in models:
+            try:
+                cache.incr(generation_key(model))
+            except ValueError:
+                cache.add(generation_key(model), time.time_ns(), None)
+
+    if now:
+        bump()
+    transaction.on_commit(bump)
+
+
+def count(name, outcome):
+    """
+    Adds a hit or a miss to the counters of a fragment, shared by all the processes
+    """
+    key = f"fragment-stats:{name}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def fragment_cache_stats():
+    """
+    Hits and misses of every cached fragment
+    """
+    keys = {
+        (name, outcome): f"fragment-stats:{name}:{outcome}"
+        for name in sorted(FRAGMENT_NAMES) for outcome in ("hits", "misses")
+    }
+    values = cache.get_many(keys.values())
+    return {
+        name: {outcome: values.get(keys[name, outcome], 0) for outcome in ("hits", "misses")}
+        for name in sorted(FRAGMENT_NAMES)
+    }
+
+
+class CachedListMixin:
+    """
+    ListView mixin that caches the rendered list of a page.
+
+    `fragment_template_name` renders the list and its pagination, it's cached
+    per role, URL kwargs and `cache_params` of the query string and the
+    generations of `cache_models`. The page template shows it as `fragment`
+    with the context of get_page_context_data, which is rendered on every
+    request. Fragments must not include forms: a CSRF token would be served
+    to other users, those fragments are rendered but not cached.
+    """
+
+    fragment_name = None
+    fragment_template_name = None
+    cache_models = ()
+    cache_params = ("q", "page")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.fragment_name:
+            FRAGMENT_NAMES.add(cls.fragment_name)
+
+    def get_fragment_key(self):
+        params = [self.request.GET.get(param, "") for param in self.cache_params]
+        params.append(sorted(self.kwargs.items()))
+        digest = hashlib.md5(json.dumps(params, default=str).encode()).hexdigest()
+        generations = ".".join(str(generation) for generation in get_generations(self.cache_models))
+        role = getattr(self.request.user, "role", "")
+        return f"fragment:{self.fragment_name}:{role}:{generations}:{digest}"
+
+    def get_page_context_data(self, **kwargs):
+        """
+        Context of the page around the fragment
+        """
+        kwargs.setdefault("view", self)
+        return kwargs
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_fragment_key()
+        fragment = cache.get(key)
+
+        if fragment is None:
+            count(self.fragment_name, "misses")
+            self.object_list = self.get_queryset()
+            fragment = render_to_string(self.fragment_template_name, self.get_context_data(), request)
+            if "csrfmiddlewaretoken" in fragment:
+                logger.warning(f"El fragmento {self.fragment_name} incluye un token CSRF, no se guarda en caché.")
+            else:
+                cache.set(key, fragment, FRAGMENT_CACHE_TIMEOUT)
+        else:
+            count(self.fragment_name, "hits")
+            # Only used to pick the template, the list is in the fragment
+            self.object_list = self.model._default_manager.none()
+
+        return self.render_to_response(self.get_page_context_data(fragment=mark_safe(fragment)))
@@ -1,36 +1,76 @@
 import logging
+import time
+from collections import Counter
 from django.utils import timezone
 from datetime import timedelta
-from supply_room.models import ItemOrder
+from django.db import transaction
+from supply_room.models import Item, ItemOrder, ItemStock, Order
 
 logger = logging.getLogger(__name__)
 
+# Expired requests processed per transaction
+EXPIRY_BATCH_SIZE = 500
 
-def clear_expired_requests():
-    """Función para eliminar solicitudes vencidas (se llama desde django-crontab)"""
+
+def clear_expired_requests(batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Función para eliminar solicitudes vencidas (se llama desde django-crontab)
+
+    Procesa las solicitudes en lotes de `batch_size`, cada uno en su propia
+    transacción: libera todas las unidades reservadas con un solo UPDATE,
+    elimina las solicitudes y ajusta los contadores de inventario y el estado
+    de las órdenes.
+    Retorna un resumen con las solicitudes procesadas, unidades liberadas y duración.
+    """
     try:
         logger.info("Ejecutando clear_expired_requests...")
-        now = timezone.now()
-        expiration_time = now - timedelta(hours=24)
+        start = time.monotonic()
+        expiration_time = timezone.now() - timedelta(hours=24)
+        processed = released_units = 0
+
+        while True:
+            with transaction.atomic():
+                # Filtrar solicitudes vencidas (usa el índice status, request_date)
+                batch = list(
+                    ItemOrder.objects.select_for_update(skip_locked=True, of=("self",)).filter(
+                        status='Solicitado',
+                        request_date__lt=expiration_time
+                    ).order_by('request_date').values_list('id', 'quantity', 'item__name', 'order_id')[:batch_size]
+                )
+                if not batch:
+                    break
+
+                ids = [item_order_id for item_order_id, _, _, _ in batch]
+                requested = Counter()
+                orders = Counter()
+                for _, quantity, name, order_id in batch:
+                    requested[name] += quantity
+                    orders[order_id] += 1
 
-        # Filtrar solicitudes vencidas
-        expired_requests = ItemOrder.objects.filter(
-            status='Solicitado',
-            request_date__lt=expiration_time
-        ).select_related('item')
+                # Liberar artículos y eliminar solicitudes
+                released = Item.objects.release(ids)
+                ItemOrder.objects.purge(ids)
 
-        count = expired_requests.count()
+                # Los contadores de inventario al final, como en ItemForm.save
+                for order_id, count in orders.items():
+                    Order.objects.move_items(order_id, 'Solicitado', None, count=count)
+                for name, quantity in sorted(requested.items()):
+                    ItemStock.objects.move(name, quantity, 'Solicitado', None, available=released[name])
 
-        # Liberar artículos y eliminar solicitudes
-        for item_order in expired_requests:
-            item = item_order.item
-            item.is_available = True
-            item.save()
-            item_order.delete()
+            processed += len(ids)
+            released_units += sum(released.values())
 
-        logger.info(f"Éxito: {count} solicitudes eliminadas y artículos liberados.")
-        return True
+        summary = {
+            "processed": processed,
+            "released": released_units,
+            "seconds": round(time.monotonic() - start, 3),
+        }
+        logger.info(
+            f"Éxito: {processed} solicitudes eliminadas y {released_units} artículos liberados "
+            f"en {summary['seconds']}s."
+        )
+        return summary
 
     except Exception as e:
         logger.error(f"Error en clear_expired_requests: {str(e)}")
-        return False
\ No newline at end of file
+        return False
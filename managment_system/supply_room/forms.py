@@ -6,11 +6,10 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
-from django.utils import timezone
 from django.db.models import Q
 from django.core.validators import RegexValidator
 
-from .models import ClassGroups, ItemOrder, Order, StudentGroups, Users, Item
+from .models import TERM_CHOICES, Class, ClassGroups, ItemOrder, ItemStock, Order, Users, Item, get_current_year
 
 
 class ItemCreateForm(forms.ModelForm):
@@ -170,17 +169,31 @@ class StudentGroupForm(forms.Form):
 
         students = self.cleaned_data.get('student', [])
 
-        StudentGroups.objects.filter(group=self.group).delete()
+        return self.group.set_students(students)
 
-        created = []
-        for student in students:
-            rel = StudentGroups.objects.create(
-                student=student,
-                group=self.group
-            )
-            created.append(rel)
 
-        return created
+class RosterImportForm(forms.Form):
+    """
+    Form to upload a course roster (CSV or XLSX).
+    The class, year and term apply to the rows that don't include them.
+    """
+    file = forms.FileField(
+        label="Archivo",
+        help_text="Columnas: student_id, email, name, group (opcionales: class_code, year, term)",
+    )
+    class_id = forms.ModelChoiceField(
+        queryset=Class.objects.order_by("name"),
+        required=False,
+        label="Curso",
+    )
+    year = forms.IntegerField(initial=get_current_year, label="Año")
+    term = forms.ChoiceField(choices=TERM_CHOICES, label="Semestre")
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith((".csv", ".xlsx")):
+            raise ValidationError("El archivo debe ser CSV o XLSX.")
+        return file
 
 
 class OrderForm(forms.ModelForm):
@@ -282,7 +295,7 @@ class ItemForm(forms.ModelForm):
                             "No puede solicitar más de una unidad de artículos que tienen código único."
                         )
                 else:
-                    available = Item.objects.filter(name=item.name, is_available=True).count()
+                    available = ItemStock.objects.available(item.name)
                     if quantity > available:
                         raise forms.ValidationError(
                             f"¡Stock insuficiente! Solo hay {available} unidad(es) disponible(s) de {item.name}"
@@ -297,37 +310,27 @@ class ItemForm(forms.ModelForm):
         code = self.cleaned_data.get("code")
 
         with transaction.atomic():
-            if code:
-                specific_item = Item.objects.select_for_update().get(name=item_name, code=code, is_available=True)
-                specific_item.is_available = False
-                specific_item.save()
-                instance.item = specific_item
-                instance.code = specific_item.code
-            else:
-                items_to_reserve = list(
-                    Item.objects.select_for_update().filter(
-                        name=item_name,
-                        is_available=True
-                    ).order_by('code')[:quantity]
+            units = Item.objects.reserve(item_name, quantity, code=code)
+            if len(units) < quantity:
+                raise ValidationError(
+                    f"Reserva fallida. Solo {len(units)} de {quantity} unidades disponibles ahora"
                 )
-                if len(items_to_reserve) < quantity:
-                    raise ValidationError(
-                        f"Reserva fallida. Solo {len(items_to_reserve)} de {quantity} unidades disponibles ahora"
-                    )
 
-                # Reservar todos los items solicitados
-                for i in items_to_reserve:
-                    i.is_available = False
-                    i.save()
-
-                # Guardar solo uno como referencia
-                selected_item = items_to_reserve[0]
-                instance.item = selected_item
-                instance.code = selected_item.code
+            # Guardar uno como referencia y todas las unidades en la orden
+            selected_item = units[0]
+            instance.item = selected_item
+            instance.code = selected_item.code
+            instance.reserved_units = units
 
             if commit:
                 instance.save()
 
+            # The counters of the name are one row shared by every request of
+            # the item: updated last, its lock is only held while committing
+            ItemStock.objects.move(
+                item_name, quantity, None, instance.status, available=-len(units)
+            )
+
         return instance
 
     class Meta:
@@ -377,51 +380,67 @@ class UpdateOrderItemForm(forms.ModelForm):
                 self.instance.status,
                 [(self.instance.status, self.instance.status)]
             )
+            # Fixed by the units reserved when the item was requested, the
+            # posted values are ignored so the stock counters can't drift
+            self.fields["quantity"].disabled = True
+            self.fields["code"].disabled = True
 
     class Meta:
         model = ItemOrder
-        fields = ["item", "quantity", "code", "status"]
+        fields = ["quantity", "code", "status"]
         widgets = {
-            "item": forms.HiddenInput(),
             "quantity": forms.NumberInput(attrs={"style": "text-align: center"}),
             "code": forms.TextInput(attrs={"style": "text-align: center"}),
         }
 
     def save(self, commit=True):
+        """
+        Saves the item order with the side effects of its status transition
+        (dates, units released and counters), see ItemOrderManager.apply_changes
+        """
         instance = super().save(commit=False)
-
-        if self.instance and self.instance.pk:
-            if self.original_status != "Devuelto" and instance.status == "Devuelto":
-                instance.return_date = timezone.now()
-                self._mark_items_as_available(instance)
-            elif self.original_status == "Solicitado" and instance.status == "Prestado":
-                instance.loan_date = timezone.now()
-            elif instance.status == "Denegado":
-                self._mark_items_as_available(instance)
-
         if commit:
-            instance.save()
+            ItemOrder.objects.apply_changes([instance])
         return instance
 
-    def _mark_items_as_available(self, item_order):
-        """
-        Mark the corresponding items as available
-        """
-        items_to_update = Item.objects.filter(
-            name=item_order.item.name,
-            is_available=False
-        )[:item_order.quantity]
-
-        updated_count = 0
-        for item in items_to_update:
-            item.is_available = True
-            item.save()
-            updated_count += 1
-
-        if updated_count < item_order.quantity:
+
+class LoadedObjectField(forms.ModelChoiceField):
+    """
+    Primary key field of a model formset that takes the object from the
+    queryset already loaded by the formset instead of querying it
+    """
+
+    def __init__(self, formset, *args, **kwargs):
+        self.formset = formset
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            obj = self.formset._existing_object(self.formset._pk_field.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None:
             raise ValidationError(
-                f"No se pudieron reactivar todos los ítems. Reactivados: {updated_count}/{item_order.quantity}"
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
             )
+        return obj
+
+
+class BaseUpdateOrderItemFormSet(forms.BaseModelFormSet):
+    """
+    Formset of the items of an order, validates every form without extra queries
+    """
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = LoadedObjectField(
+            self, field.queryset, initial=field.initial, required=False, widget=field.widget
+        )
 
 
 class CustomPasswordChangeForm(PasswordChangeForm):
@@ -0,0 +1,86 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from supply_room.cron import EXPIRY_BATCH_SIZE, clear_expired_requests
+from supply_room.models import (Class, ClassGroups, Item, ItemOrder, ItemOrderUnit,
+                                ItemStock, Order, Users)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark clear_expired_requests with a batch of expired requests. '
+        'Runs the real sweep, use it on a development database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Expired requests to create')
+        parser.add_argument('--history', type=int, default=0, help='Closed requests to create as history')
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        tag = uuid.uuid4().hex[:8]
+        name = f'__benchmark__ {tag}'
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            teacher = Users.objects.create_user(
+                email=f'benchmark-{tag}@example.com', password=None, name='Benchmark', role='teacher'
+            )
+            class_id = Class.objects.create(name='Benchmark', code=f'BENCH-{tag}')
+            group = ClassGroups.objects.create(professor=teacher, class_id=class_id)
+            order = Order.objects.create(group=group)
+
+            units = Item.objects.bulk_create(
+                [Item(name=name, is_available=False) for _ in range(rows + options['history'])],
+                batch_size=5000,
+            )
+            requested = timezone.now() - timedelta(hours=48)
+            item_orders = ItemOrder.objects.bulk_create(
+                [
+                    ItemOrder(
+                        order=order,
+                        item=unit,
+                        quantity=1,
+                        status='Solicitado' if i < rows else 'Devuelto',
+                        request_date=requested,
+                    )
+                    for i, unit in enumerate(units)
+                ],
+                batch_size=5000,
+            )
+            ItemOrderUnit.objects.bulk_create(
+                [ItemOrderUnit(item_order=item_order, item=item_order.item) for item_order in item_orders],
+                batch_size=5000,
+            )
+            ItemStock.objects.adjust(name, total=len(units), requested=rows)
+            Order.objects.filter(pk=order.pk).refresh_status()
+        self.stdout.write(f'Seeded {rows} expired requests in {time.perf_counter() - start:.1f}s')
+
+        # Refresh the planner statistics as autovacuum would on a live table
+        with connection.cursor() as cursor:
+            for model in (Item, ItemOrder, ItemOrderUnit):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        summary = clear_expired_requests(batch_size=options['batch_size'])
+        if not summary:
+            self.stderr.write(self.style.ERROR('clear_expired_requests failed, see the log.'))
+        else:
+            self.stdout.write(
+                f"Processed {summary['processed']} requests, released {summary['released']} units "
+                f"in {summary['seconds']}s ({summary['processed'] / max(summary['seconds'], 0.001):.0f} rows/s)"
+            )
+
+        with transaction.atomic():
+            ItemOrder.objects.filter(order=order).delete()
+            order.delete()
+            group.delete()
+            class_id.delete()
+            teacher.delete()
+            Item.objects.filter(name=name).delete()
+            ItemStock.objects.filter(pk=name).delete()
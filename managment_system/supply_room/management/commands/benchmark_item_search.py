@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from supply_room.models import Item, ItemStock, normalize_search
+from supply_room.views import ItemSearchView
+
+WORDS = [
+    'Resistencia', 'Capacitor', 'Multímetro', 'Osciloscopio', 'Protoboard',
+    'Transistor', 'Diodo', 'Fuente', 'Cable', 'Sensor', 'Motor', 'Relé',
+    'Potenciómetro', 'Inductor', 'Batería', 'Generador', 'Pinza', 'Cautín',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the latency of the item search on a seeded catalogue. '
+        'Seeds and deletes its own items, use it on a development database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', type=int, default=200000, help='Units to create')
+        parser.add_argument('--names', type=int, default=20000, help='Distinct item names')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs of every query')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        names = [
+            f'{WORDS[i % len(WORDS)]} {i} {tag}' for i in range(options['names'])
+        ]
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            units = [
+                Item(name=names[i % len(names)], is_available=random.random() < 0.8)
+                for i in range(options['units'])
+            ]
+            Item.objects.bulk_create(units, batch_size=5000)
+            stock = {}
+            for unit in units:
+                row = stock.setdefault(unit.name, ItemStock(name=unit.name))
+                row.total += 1
+                row.available += int(unit.is_available)
+            ItemStock.objects.bulk_create(stock.values(), batch_size=5000)
+        self.stdout.write(
+            f"Seeded {options['units']} units of {len(names)} names in {time.perf_counter() - start:.1f}s"
+        )
+
+        # Refresh the planner statistics as autovacuum would on a live table
+        with connection.cursor() as cursor:
+            for model in (Item, ItemStock):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        try:
+            queries = ['re', 'cap', 'mult', 'multim', 'potenciometro', 'bateria 12', 'cable 1', 'xyz']
+            view = ItemSearchView()
+            self.report('search', queries, options['repeat'], lambda q: view.search(normalize_search(q), None))
+            self.report('previous', queries, options['repeat'], self.previous_search)
+        finally:
+            with transaction.atomic():
+                Item.objects.filter(name__endswith=f' {tag}').delete()
+                ItemStock.objects.filter(name__endswith=f' {tag}').delete()
+
+    def report(self, label, queries, repeat, search):
+        self.stdout.write(f'{label}:')
+        for query in queries:
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                search(query)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            self.stdout.write(
+                f'  {query!r:18} p50: {statistics.median(latencies) * 1000:7.2f}ms  '
+                f'p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f}ms'
+            )
+
+    def previous_search(self, query):
+        """
+        Search before the trigram index, icontains and DISTINCT ON over every unit
+        """
+        return list(
+            Item.objects.filter(name__icontains=query, is_available=True)
+            .order_by('name', 'id')
+            .distinct('name')[:20]
+        )
@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from managment_system.middleware import LoginRequiredMiddleware
+
+
+def previous_middleware(request):
+    """
+    The previous LoginRequiredMiddleware, that resolved the exempt URLs on every request
+    """
+    exempt_urls = [reverse("login"), reverse("register")]
+    if not request.user.is_authenticated and request.path not in exempt_urls:
+        return redirect("login")
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the per-request overhead of LoginRequiredMiddleware, without the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000, help='Requests per path')
+
+    def handle(self, *args, **options):
+        middleware = LoginRequiredMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        paths = ['/accounts/login/', '/static/css/output.css', '/health', '/ordenes']
+
+        for label, handler in (('middleware', middleware), ('previous', previous_middleware)):
+            self.stdout.write(f'{label}:')
+            for path in paths:
+                request = factory.get(path)
+                # Anonymous user behind a lazy object, as AuthenticationMiddleware sets it
+                request.user = SimpleLazyObject(AnonymousUser)
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    handler(request)
+                seconds = time.perf_counter() - start
+                self.stdout.write(f"  {path:24} {seconds / options['requests'] * 1e6:6.2f}µs/request")
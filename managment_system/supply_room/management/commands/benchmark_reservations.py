@@ -0,0 +1,108 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from supply_room.models import Item, ItemStock
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent reservations of units of the same item name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requesters', type=int, default=50, help='Parallel requesters')
+        parser.add_argument('--requests', type=int, default=20, help='Reservations per requester')
+        parser.add_argument('--quantity', type=int, default=2, help='Units per reservation')
+        parser.add_argument(
+            '--strategy',
+            choices=['update', 'select_for_update'],
+            default='update',
+            help='update: single UPDATE ... RETURNING, select_for_update: lock and save each unit',
+        )
+
+    def handle(self, *args, **options):
+        requesters = options['requesters']
+        requests = options['requests']
+        quantity = options['quantity']
+        reserve = getattr(self, f"reserve_{options['strategy']}")
+
+        # Unique name so the benchmark never touches real inventory
+        name = f'__benchmark__ {uuid.uuid4().hex[:8]}'
+        units = requesters * requests * quantity
+        Item.objects.bulk_create(
+            [Item(name=name, code=str(i)) for i in range(units)], batch_size=5000
+        )
+        ItemStock.objects.adjust(name, total=units, available=units)
+
+        latencies = []
+        failures = []
+        barrier = threading.Barrier(requesters)
+
+        def requester():
+            try:
+                barrier.wait()
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    if not reserve(name, quantity):
+                        failures.append(1)
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=requester) for _ in range(requesters)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        reserved = Item.objects.filter(name=name, is_available=False).count()
+        Item.objects.filter(name=name).delete()
+        ItemStock.objects.filter(pk=name).delete()
+
+        latencies.sort()
+        self.stdout.write(f"Strategy: {options['strategy']}")
+        self.stdout.write(f'Requesters: {requesters}, reservations: {len(latencies)}, units each: {quantity}')
+        self.stdout.write(f'Failed reservations: {len(failures)}, units reserved: {reserved}/{units}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s, throughput: {len(latencies) / elapsed:.1f} reservations/s')
+        self.stdout.write(
+            f'Latency p50: {statistics.median(latencies) * 1000:.1f}ms, '
+            f'p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms, '
+            f'max: {latencies[-1] * 1000:.1f}ms'
+        )
+
+    def reserve_update(self, name, quantity):
+        """
+        Same critical section as ItemForm.save
+        """
+        with transaction.atomic():
+            units = Item.objects.reserve(name, quantity)
+            if len(units) < quantity:
+                transaction.set_rollback(True)
+                return False
+            ItemStock.objects.move(name, quantity, None, 'Solicitado', available=-len(units))
+        return True
+
+    def reserve_select_for_update(self, name, quantity):
+        """
+        Previous implementation, locks the units and saves them one by one
+        """
+        with transaction.atomic():
+            units = list(
+                Item.objects.select_for_update().filter(
+                    name=name,
+                    is_available=True
+                ).order_by('code')[:quantity]
+            )
+            if len(units) < quantity:
+                transaction.set_rollback(True)
+                return False
+            for unit in units:
+                unit.is_available = False
+                unit.save()
+            ItemStock.objects.move(name, quantity, None, 'Solicitado')
+        return True
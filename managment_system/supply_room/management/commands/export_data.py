@@ -1,43 +1,184 @@
-from django.core.management.base import BaseCommand
-from django.apps import apps
-import json
-from django.utils.dateformat import DateFormat
+import csv
 import datetime
+import gzip
+import json
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Models exported, in an order that respects the foreign keys
+MODELS = [
+    'item',
+    'users',
+    'class',
+    'classgroups',
+    'order',
+    'itemorder',
+    'itemorderunit',
+    'userorder',
+    'studentgroups',
+]
+
+# Date fields that tell if a row was created or changed since a date.
+# Models without them are always exported whole.
+SINCE_FIELDS = {
+    'users': ('date_joined', 'last_login'),
+    'itemorder': ('request_date', 'loan_date', 'return_date'),
+}
+
+DEFAULT_OUTPUT = {
+    'json': 'seeds.json',
+    'ndjson': 'seeds.ndjson',
+    'csv': 'seeds',
+}
+
+# Rows between progress messages (verbosity 2)
+PROGRESS_EVERY = 100000
+
+
+def parse_since(value):
+    """
+    Parses the --since date or datetime (ISO 8601), naive values use the current timezone
+    """
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(value)
+        since = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
 
 
 class Command(BaseCommand):
-    help = 'Export data for multiple models to a JSON file'
-
-    def handle(self, *args, **kwargs):
-        # Definir todos los modelos a exportar
-        models_to_export = [
-            'item',
-            'users',
-            'class',
-            'classgroups',
-            'order',
-            'itemorder',
-            'userorder',
-            'studentgroups'
-        ]
-
-        data = {}
-
-        # Exportar cada modelo
-        for model_name in models_to_export:
-            model = apps.get_model('supply_room', model_name)  # Usamos la app y el nombre del modelo
-            model_data = list(model.objects.all().values())  # Exportamos todos los registros
-            
-            # Convertir campos datetime a formato ISO 8601
-            for record in model_data:
-                for key, value in record.items():
-                    if isinstance(value, (datetime.date, datetime.datetime)):
-                        record[key] = DateFormat(value).format('Y-m-d H:i:s')  # Convertir a formato ISO
-
-            data[model_name] = model_data  # Guardamos los datos de cada modelo en el diccionario
-
-        # Guardamos los datos en un archivo JSON
-        with open('seeds.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-
-        self.stdout.write(self.style.SUCCESS(f'Data for models exported successfully.'))
+    help = (
+        'Export data for multiple models to JSON, NDJSON or CSV files. '
+        'The rows are streamed from server-side cursors, memory use does not grow with the tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(DEFAULT_OUTPUT), default='json')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output files with gzip')
+        parser.add_argument(
+            '--output',
+            help='Output file, or directory for csv (default: seeds.json, seeds.ndjson or seeds/)',
+        )
+        parser.add_argument('--models', nargs='+', choices=MODELS, default=MODELS)
+        parser.add_argument(
+            '--since',
+            type=parse_since,
+            help=f'Only rows created or changed since this date, for {", ".join(SINCE_FIELDS)}',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        self.options = options
+        output = options['output'] or DEFAULT_OUTPUT[options['format']]
+        # Keep the order of MODELS whatever the order of --models
+        models = [name for name in MODELS if name in options['models']]
+
+        start = time.monotonic()
+        total = getattr(self, f"export_{options['format']}")(models, output)
+        seconds = time.monotonic() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {total} rows to {output} in {seconds:.1f}s ({total / max(seconds, 0.001):.0f} rows/s)'
+        ))
+
+    def open(self, path):
+        if self.options['gzip']:
+            return gzip.open(f'{path}.gz', 'wt', encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def rows(self, name):
+        """
+        Yields the columns of the model and then its rows as dicts, reporting the progress
+        """
+        model = apps.get_model('supply_room', name)
+        columns = [field.attname for field in model._meta.concrete_fields]
+        queryset = model.objects.order_by('pk').values(*columns)
+
+        since = self.options['since']
+        if since and name in SINCE_FIELDS:
+            query = Q()
+            for field in SINCE_FIELDS[name]:
+                query |= Q(**{f'{field}__gte': since})
+            queryset = queryset.filter(query)
+
+        yield columns
+
+        start = time.monotonic()
+        count = 0
+        for row in queryset.iterator(chunk_size=self.options['chunk_size']):
+            yield row
+            count += 1
+            if self.options['verbosity'] > 1 and count % PROGRESS_EVERY == 0:
+                self.stderr.write(f'{name}: {count} rows...')
+
+        seconds = time.monotonic() - start
+        full = ' (full)' if since and name not in SINCE_FIELDS else ''
+        self.stdout.write(f'{name}: {count} rows{full} in {seconds:.1f}s ({count / max(seconds, 0.001):.0f} rows/s)')
+        self.exported += count
+
+    def export_json(self, models, output):
+        """
+        Single JSON object with a list of rows per model, the format read by the seed command
+        """
+        self.exported = 0
+        with self.open(output) as f:
+            f.write('{')
+            for i, name in enumerate(models):
+                f.write(f'{"," if i else ""}\n    {json.dumps(name)}: [')
+                rows = self.rows(name)
+                next(rows)
+                for j, row in enumerate(rows):
+                    f.write(f'{"," if j else ""}\n        ')
+                    f.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                f.write('\n    ]')
+            f.write('\n}\n')
+        return self.exported
+
+    def export_ndjson(self, models, output):
+        """
+        One JSON object per line: {"model": ..., "fields": {...}}
+        """
+        self.exported = 0
+        with self.open(output) as f:
+            for name in models:
+                rows = self.rows(name)
+                next(rows)
+                for row in rows:
+                    f.write(json.dumps({'model': name, 'fields': row}, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    f.write('\n')
+        return self.exported
+
+    def export_csv(self, models, output):
+        """
+        One CSV file per model in the output directory, NULL values are written as empty cells
+        """
+        self.exported = 0
+        try:
+            os.makedirs(output, exist_ok=True)
+        except OSError as e:
+            raise CommandError(e)
+
+        encoder = DjangoJSONEncoder()
+        for name in models:
+            rows = self.rows(name)
+            columns = next(rows)
+            with self.open(os.path.join(output, f'{name}.csv')) as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow([
+                        '' if value is None else value if isinstance(value, (str, int, float)) else encoder.default(value)
+                        for value in row.values()
+                    ])
+        return self.exported
@@ -0,0 +1,45 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from supply_room.roster import ROSTER_BATCH_SIZE, RosterImport, read_roster
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a course roster (CSV or XLSX with the columns student_id, email, name and group) '
+        'into the students of the groups'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file, .csv or .xlsx')
+        parser.add_argument('--class-code', help='Class code of the rows without a class_code column')
+        parser.add_argument('--year', type=int, help='Year of the rows without a year column')
+        parser.add_argument('--term', help='Term of the rows without a term column')
+        parser.add_argument('--batch-size', type=int, default=ROSTER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        roster = RosterImport(
+            class_code=options['class_code'],
+            year=options['year'],
+            term=options['term'],
+            batch_size=options['batch_size'],
+        )
+        try:
+            with open(options['path'], 'rb') as file:
+                report = roster.run(read_roster(file, options['path']))
+        except (OSError, ValidationError) as e:
+            raise CommandError(e)
+
+        for line, message in report['errors']:
+            self.stdout.write(self.style.WARNING(f'Line {line}: {message}'))
+        if report['error_count'] > len(report['errors']):
+            self.stdout.write(self.style.WARNING(
+                f"... and {report['error_count'] - len(report['errors'])} more errors"
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows'] - report['error_count']}/{report['rows']} rows: "
+            f"{report['users_created']} users created, {report['users_updated']} updated, "
+            f"{report['links_created']} students added to groups "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from supply_room.models import ItemStock, STOCK_COUNTERS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ItemStock counters from Item and ItemOrder and report the names out of sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the table, fail if any name is out of sync',
+        )
+
+    def handle(self, *args, **options):
+        stale = ItemStock.objects.rebuild(commit=not options['check'])
+
+        for name, (current, expected) in sorted(stale.items()):
+            changes = ', '.join(
+                f'{counter} {current[counter]} -> {expected[counter]}'
+                for counter in STOCK_COUNTERS
+                if current[counter] != expected[counter]
+            )
+            self.stdout.write(self.style.WARNING(f'{name}: {changes}'))
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('Stock counters are in sync.'))
+        elif options['check']:
+            raise CommandError(f'{len(stale)} item names are out of sync.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Stock counters rebuilt for {len(stale)} item names.'))
@@ -1,71 +1,304 @@
-from django.core.management.base import BaseCommand
-from django.apps import apps
+import csv
+import gzip
+import io
 import json
-from django.utils.dateparse import parse_datetime
-from django.db import IntegrityError
-from django.utils import timezone
+import os
+import time
 from datetime import timezone as dt_timezone
-import warnings
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from supply_room.management.commands.export_data import MODELS
+from supply_room.models import ClassGroups, ItemOrder, ItemOrderUnit, ItemStock, Order, Users
+from supply_room.authz import invalidate_authorization
+from supply_room.caching import bump_generation
+
+# Bytes read from the file each time the JSON parser needs more input
+READ_SIZE = 1 << 16
+
+
+def iter_json(f):
+    """
+    Yields (model name, record) from a {"model": [records]} JSON file,
+    decoding one record at a time instead of loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def more():
+        nonlocal buffer, pos, eof
+        chunk = f.read(READ_SIZE)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def skip(chars=' \t\r\n'):
+        """
+        Moves past the given characters and returns the next one ('' at the end)
+        """
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            more()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                return value
+            except json.JSONDecodeError:
+                # The value may continue in the next chunk
+                if eof:
+                    raise
+                more()
+
+    def expect(char):
+        nonlocal pos
+        if skip() != char:
+            raise ValueError(f"Invalid seed file, expected '{char}' at '{buffer[pos:pos + 20]}'")
+        pos += 1
+
+    more()
+    expect('{')
+    while skip(' \t\r\n,') not in ('}', ''):
+        name = decode()
+        expect(':')
+        expect('[')
+        while skip(' \t\r\n,') != ']':
+            yield name, decode()
+        pos += 1
+
+
+def copy_value(value):
+    """
+    Writes a value in the text format of COPY
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def iter_ndjson(f):
+    """
+    Yields (model name, record) from a file with one {"model", "fields"} object per line
+    """
+    for line in f:
+        if line.strip():
+            row = json.loads(line)
+            yield row['model'], row['fields']
+
 
 class Command(BaseCommand):
-    help = 'Import data from a JSON file into multiple models'
+    help = (
+        'Import data from a seed file (JSON, NDJSON or a directory of CSV files, optionally gzipped) '
+        'into multiple models. Rows are copied in batches inside a single transaction: rows with an id '
+        'are upserted on it, rows without one are only added if they are not there yet.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='seeds.json', help='Seed file or CSV directory')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'The file {path} was not found.')
 
-    def handle(self, *args, **kwargs):
-        # Suprimir los warnings específicos sobre datetime naive
-        warnings.filterwarnings("ignore", category=RuntimeWarning, message="DateTimeField .* received a naive datetime.*")
+        self.batch_size = options['batch_size']
+        self.stats = {}
+        # Ids given to the rows without one: their position in the file, per model
+        self.positions = {}
+        start = time.monotonic()
 
-        # Cargar el archivo JSON
         try:
-            with open('seeds.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR('The file seeds.json was not found.'))
-            return
+            # Foreign keys are DEFERRABLE INITIALLY DEFERRED in PostgreSQL,
+            # they are checked once at the commit of this transaction
+            with transaction.atomic():
+                seen = self.load(self.records(path))
+                self.reset_sequences(seen)
+                self.rebuild(seen)
+        except (DatabaseError, ValidationError, ValueError) as e:
+            raise CommandError(f'Import failed, nothing was saved: {e}')
+
+        total = sum(count for count, _ in self.stats.values())
+        for name in MODELS:
+            if name not in self.stats:
+                self.stdout.write(self.style.WARNING(f'No data found for {name}'))
+        seconds = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Data imported successfully with {total} records in {seconds:.1f}s '
+            f'({total / max(seconds, 0.001):.0f} rows/s).'
+        ))
 
-        models_to_import = [
-            'item',
-            'users',
-            'class',
-            'classgroups',
-            'order',
-            'itemorder',
-            'userorder',
-            'studentgroups'
-        ]
-
-        # Contador de registros creados
-        records_created = 0
-        records_failed = 0
-
-        for model_name in models_to_import:
-            model = apps.get_model('supply_room', model_name)  # Obtener el modelo desde la app
-            
-            if model_name in data:
-                model_data = data[model_name]
-                for record in model_data:
-                    # Convertir las fechas a formato datetime (aware, en UTC)
-                    for key, value in record.items():
-                        if isinstance(value, str) and 'T' in value:  # Formato ISO 8601
-                            parsed_date = parse_datetime(value)
-                            if parsed_date:
-                                # Convertir la fecha naive a aware (en UTC)
-                                record[key] = timezone.make_aware(parsed_date, dt_timezone.utc)
-                    
-                    try:
-                        # Crear el objeto con todos los campos disponibles en record
-                        model.objects.create(**record)
-                        records_created += 1  # Contabilizar los registros creados
-                    except IntegrityError as e:
-                        records_failed += 1  # Contabilizar errores de integridad
-                        self.stderr.write(f'Error saving {model_name} record with id {record.get("id", "N/A")}: {e}')
-                    except Exception as e:
-                        records_failed += 1  # Contabilizar otros errores
-                        self.stderr.write(f'Unexpected error: {e}')
-            else:
-                self.stdout.write(self.style.WARNING(f'No data found for {model_name}'))
-
-        # Mensaje final
-        if records_failed > 0:
-            self.stdout.write(self.style.ERROR(f'Finished with {records_failed} errors.'))
+    def open(self, path):
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, 'r', encoding='utf-8', newline='')
+
+    def records(self, path):
+        """
+        Yields (model name, record) from the seed file in the order of the file
+        """
+        if os.path.isdir(path):
+            for name in MODELS:
+                for extension in ('.csv', '.csv.gz'):
+                    csv_path = os.path.join(path, f'{name}{extension}')
+                    if os.path.exists(csv_path):
+                        with self.open(csv_path) as f:
+                            for row in csv.DictReader(f):
+                                yield name, row
         else:
-            self.stdout.write(self.style.SUCCESS(f'Data imported successfully with {records_created} records created.'))
+            with self.open(path) as f:
+                if '.ndjson' in os.path.basename(path):
+                    yield from iter_ndjson(f)
+                else:
+                    yield from iter_json(f)
+
+    def load(self, records):
+        """
+        Inserts the records in batches of the same model, returns the models imported
+        """
+        batch, current = [], None
+        for name, record in records:
+            if name not in MODELS:
+                raise ValueError(f'Unknown model {name}')
+            if name != current or len(batch) >= self.batch_size:
+                self.flush(current, batch)
+                if name != current:
+                    self.report(current)
+                batch, current = [], name
+            batch.append(record)
+        self.flush(current, batch)
+        self.report(current)
+        return [name for name in MODELS if name in self.stats]
+
+    def report(self, name):
+        if name in self.stats:
+            count, seconds = self.stats[name]
+            self.stdout.write(f'{name}: {count} rows in {seconds:.1f}s ({count / max(seconds, 0.001):.0f} rows/s)')
+
+    def to_python(self, field, value):
+        """
+        Converts a value of the file to the type of the field
+        """
+        if value == '' and field.null and not isinstance(field, models.BooleanField):
+            # Empty CSV cells are NULL
+            return None
+        value = field.to_python(value)
+        if isinstance(field, models.DateTimeField) and value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value, dt_timezone.utc)
+        return value
+
+    def flush(self, name, records):
+        """
+        Inserts a batch of records of a model: the rows are copied to a
+        temporary table with COPY and moved with a single INSERT ... ON CONFLICT.
+        Rows with their id in the file are upserted on it, rows without one
+        never overwrite an existing row
+        """
+        if not records:
+            return
+
+        start = time.monotonic()
+        model = apps.get_model('supply_room', name)
+        fields = model._meta.concrete_fields
+        pk = model._meta.pk.attname
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        staging = quote(f'seed_{model._meta.db_table}')
+
+        explicit, positional = io.StringIO(), io.StringIO()
+        position = self.positions.get(name, 0)
+        for record in records:
+            position += 1
+            row = []
+            for field in fields:
+                if field.attname in record:
+                    value = self.to_python(field, record[field.attname])
+                elif field.attname == pk:
+                    # Seed files without ids rely on the rows getting consecutive ids
+                    value = position
+                else:
+                    value = field.get_default()
+                row.append(copy_value(field.get_db_prep_save(value, connection)))
+            data = explicit if pk in record else positional
+            data.write('\t'.join(row))
+            data.write('\n')
+        self.positions[name] = position
+
+        keys = {key for record in records for key in record}
+        columns = ', '.join(quote(field.column) for field in fields)
+        update = ', '.join(
+            f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+            for field in fields
+            if field.attname in keys and field.attname != pk
+        )
+        conflicts = (
+            (explicit, f'ON CONFLICT ({quote(model._meta.pk.column)}) '
+             + (f'DO UPDATE SET {update}' if update else 'DO NOTHING')),
+            # The position is not the id of the row in this database, a
+            # row already there (with that id or the same unique values) is kept
+            (positional, 'ON CONFLICT DO NOTHING'),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {staging} (LIKE {table}) ON COMMIT DROP'
+            )
+            for data, conflict in conflicts:
+                if not data.tell():
+                    continue
+                data.seek(0)
+                cursor.copy_expert(f'COPY {staging} ({columns}) FROM STDIN', data)
+                cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} {conflict}')
+                cursor.execute(f'TRUNCATE {staging}')
+
+        count, seconds = self.stats.get(name, (0, 0))
+        self.stats[name] = (count + len(records), seconds + time.monotonic() - start)
+
+    def reset_sequences(self, names):
+        """
+        Moves the id sequences past the imported ids
+        """
+        sql = connection.ops.sequence_reset_sql(
+            no_style(), [apps.get_model('supply_room', name) for name in names]
+        )
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+
+    def rebuild(self, names):
+        """
+        Recomputes the data kept by the model methods and signals, that bulk_create skips
+        """
+        if 'itemorder' in names and 'itemorderunit' not in names:
+            # Older seed files have no unit lines, the referenced item is the only unit
+            lines = (
+                ItemOrderUnit(item_order_id=item_order_id, item_id=item_id)
+                for item_order_id, item_id in ItemOrder.objects.filter(units=None)
+                .values_list('id', 'item_id').iterator()
+            )
+            while batch := [line for _, line in zip(range(self.batch_size), lines)]:
+                ItemOrderUnit.objects.bulk_create(batch, ignore_conflicts=True)
+
+        groups = ClassGroups.objects.filter(pk=OuterRef('group_id'))
+        Order.objects.update(year=Subquery(groups.values('year')), term=Subquery(groups.values('term')))
+        Order.objects.refresh_status()
+        Order.objects.refresh_search()
+        ItemStock.objects.rebuild()
+        if {'users', 'classgroups', 'userorder', 'studentgroups'} & set(names):
+            invalidate_authorization(Users.objects.values_list('id', flat=True))
+        bump_generation(*names)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from supply_room.outbox import OUTBOX_BATCH_SIZE, send_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Send the emails waiting in the outbox. '
+        'With --loop it keeps polling the outbox as a worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE, help='Emails claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new emails')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            summary = send_outbox(batch_size=options['batch_size'])
+            if summary['sent'] or summary['retried'] or summary['failed'] or not options['loop']:
+                self.stdout.write(
+                    f"Sent {summary['sent']} emails, {summary['retried']} to retry and "
+                    f"{summary['failed']} failed in {summary['seconds']}s"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from supply_room.outbox import send_outbox
+from supply_room.reminders import REMINDER_BATCH_SIZE, ReminderCampaign
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue the pending items letter for every student with items on loan. '
+        'With --dry-run the letters are written to a directory instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-email', help='Sender of the letters (default: EMAIL_HOST_USER)')
+        parser.add_argument('--dry-run', metavar='DIR', help='Write the letters as .eml files to this directory')
+        parser.add_argument('--send', action='store_true', help='Send the queued emails right away')
+        parser.add_argument('--batch-size', type=int, default=REMINDER_BATCH_SIZE, help='Students per batch')
+
+    def handle(self, *args, **options):
+        campaign = ReminderCampaign(
+            from_email=options['from_email'],
+            dry_run_dir=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+        report = campaign.run()
+
+        action = f"wrote {report['written']} letters to {options['dry_run']}" if options['dry_run'] \
+            else f"queued {report['queued']} letters"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['students']} students with {report['items']} items on loan, {action} "
+            f"in {report['seconds']}s (queries {report['query_seconds']}s, "
+            f"rendering {report['render_seconds']}s, {report['emails_per_second']} letters/s)"
+        ))
+
+        if options['send'] and not options['dry_run']:
+            summary = send_outbox()
+            self.stdout.write(
+                f"Sent {summary['sent']} emails, {summary['retried']} to retry and "
+                f"{summary['failed']} failed in {summary['seconds']}s"
+            )
@@ -0,0 +1,279 @@
+"""
+Per-view request metrics of the process, exposed at /metrics.
+
+MetricsMiddleware measures every request: latency, SQL queries and time
+(connection.execute_wrapper), time rendering templates and cache hits and
+misses, and adds them to the counters of the URL name of the view.
+
+The counters live in the memory of each process (every worker has its own)
+and are updated without locks: with a threaded server an increment may
+rarely be lost, which is fine for metrics. Their size is fixed: one series
+per view name, at most METRICS_MAX_VIEWS, the rest are added to "other".
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+# Upper bounds in seconds of the buckets of the latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Views with their own series, the rest are added to OTHER_VIEW
+METRICS_MAX_VIEWS = 100
+OTHER_VIEW = "other"
+UNRESOLVED_VIEW = "unresolved"
+
+_local = threading.local()
+_missing = object()
+
+
+class RequestStats:
+    """
+    Counters of the request in progress in the current thread
+    """
+
+    __slots__ = ("queries", "sql_seconds", "template_seconds", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+class ViewMetrics:
+    """
+    Accumulated counters of a view
+    """
+
+    __slots__ = (
+        "buckets", "requests", "seconds", "responses", "queries", "sql_seconds",
+        "template_seconds", "cache_hits", "cache_misses",
+    )
+
+    def __init__(self):
+        # One more bucket for the requests slower than the last bound (+Inf)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.seconds = 0.0
+        # Responses per status class, 1xx to 5xx
+        self.responses = [0] * 5
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+_views = {}
+
+
+def current_stats():
+    return getattr(_local, "stats", None)
+
+
+def record(view, stats, seconds, status):
+    """
+    Adds a finished request to the counters of its view
+    """
+    metrics = _views.get(view)
+    if metrics is None:
+        if len(_views) >= METRICS_MAX_VIEWS:
+            view = OTHER_VIEW
+        metrics = _views.setdefault(view, ViewMetrics())
+
+    metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    metrics.requests += 1
+    metrics.seconds += seconds
+    if 100 <= status < 600:
+        metrics.responses[status // 100 - 1] += 1
+    metrics.queries += stats.queries
+    metrics.sql_seconds += stats.sql_seconds
+    metrics.template_seconds += stats.template_seconds
+    metrics.cache_hits += stats.cache_hits
+    metrics.cache_misses += stats.cache_misses
+
+
+def reset_metrics():
+    _views.clear()
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics():
+    """
+    Counters of all the views in the Prometheus text exposition format
+    """
+    views = sorted(_views.items())
+    lines = [
+        "# HELP supply_room_request_duration_seconds Latency of the requests per view.",
+        "# TYPE supply_room_request_duration_seconds histogram",
+    ]
+    for view, metrics in views:
+        view = _label(view)
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), metrics.buckets):
+            cumulative += count
+            lines.append(f'supply_room_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+        lines.append(f'supply_room_request_duration_seconds_sum{{view="{view}"}} {metrics.seconds:.6f}')
+        lines.append(f'supply_room_request_duration_seconds_count{{view="{view}"}} {metrics.requests}')
+
+    lines += [
+        "# HELP supply_room_responses_total Responses per view and status class.",
+        "# TYPE supply_room_responses_total counter",
+    ]
+    for view, metrics in views:
+        for status, count in enumerate(metrics.responses, start=1):
+            if count:
+                lines.append(f'supply_room_responses_total{{view="{_label(view)}",status="{status}xx"}} {count}')
+
+    counters = [
+        ("sql_queries_total", "SQL queries run by the requests per view.", "queries", "{}"),
+        ("sql_duration_seconds_total", "Time running SQL queries per view.", "sql_seconds", "{:.6f}"),
+        ("template_duration_seconds_total", "Time rendering templates per view.", "template_seconds", "{:.6f}"),
+    ]
+    for name, description, attr, number in counters:
+        lines += [f"# HELP supply_room_{name} {description}", f"# TYPE supply_room_{name} counter"]
+        for view, metrics in views:
+            lines.append(f'supply_room_{name}{{view="{_label(view)}"}} {number.format(getattr(metrics, attr))}')
+
+    lines += [
+        "# HELP supply_room_cache_requests_total Cache reads per view and result.",
+        "# TYPE supply_room_cache_requests_total counter",
+    ]
+    for view, metrics in views:
+        lines.append(f'supply_room_cache_requests_total{{view="{_label(view)}",result="hit"}} {metrics.cache_hits}')
+        lines.append(f'supply_room_cache_requests_total{{view="{_label(view)}",result="miss"}} {metrics.cache_misses}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _measure_template(render):
+    def measured_render(self, *args, **kwargs):
+        stats = current_stats()
+        # Templates rendered inside another one are already measured
+        if stats is None or getattr(_local, "rendering", False):
+            return render(self, *args, **kwargs)
+        _local.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+            _local.rendering = False
+
+    measured_render.measured = True
+    return measured_render
+
+
+def _measure_cache(cache):
+    """
+    Wraps get and get_many of a cache instance (not of its backend class),
+    passing through the extra arguments of the backend, like the client=
+    of django_redis
+    """
+    get, get_many = cache.get, cache.get_many
+
+    def measured_get(key, *args, **kwargs):
+        stats = current_stats()
+        if stats is None or getattr(_local, "reading_cache", False):
+            return get(key, *args, **kwargs)
+        if args:
+            default, args = args[0], args[1:]
+        else:
+            default = kwargs.pop("default", None)
+        _local.reading_cache = True
+        try:
+            value = get(key, _missing, *args, **kwargs)
+        finally:
+            _local.reading_cache = False
+        if value is _missing:
+            stats.cache_misses += 1
+            return default
+        stats.cache_hits += 1
+        return value
+
+    def measured_get_many(keys, *args, **kwargs):
+        stats = current_stats()
+        if stats is None or getattr(_local, "reading_cache", False):
+            return get_many(keys, *args, **kwargs)
+        keys = list(keys)
+        # Some backends read the keys one by one with get()
+        _local.reading_cache = True
+        try:
+            values = get_many(keys, *args, **kwargs)
+        finally:
+            _local.reading_cache = False
+        stats.cache_hits += len(values)
+        stats.cache_misses += len(keys) - len(values)
+        return values
+
+    cache.get, cache.get_many = measured_get, measured_get_many
+    cache.measured = True
+
+
+def install():
+    """
+    Wraps the rendering of the Django templates, the wrapper only counts
+    while a request is measured. Can be called more than once.
+    """
+    if not getattr(Template.render, "measured", False):
+        Template.render = _measure_template(Template.render)
+
+
+def measure_caches():
+    """
+    Wraps the reads of the cache instances of the current thread. Django
+    creates them per thread and again when CACHES changes, so it runs on
+    every request; the instances already wrapped are skipped.
+    """
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if not cache.__dict__.get("measured", False):
+            _measure_cache(cache)
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of every request under the URL name of its view.
+    Must be the first middleware so the latency includes the others.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        measure_caches()
+        stats = RequestStats()
+        _local.stats = stats
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match and match.view_name else UNRESOLVED_VIEW
+        record(view, stats, time.perf_counter() - start, response.status_code)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0011_alter_classgroups_year"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["name", "is_available"], name="item_name_available_idx"
+            ),
+        ),
+    ]
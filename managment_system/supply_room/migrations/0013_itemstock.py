@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+STATUS_STOCK_COUNTERS = {
+    "Solicitado": "requested",
+    "Prestado": "on_loan",
+}
+
+
+def populate_stock(apps, schema_editor):
+    Item = apps.get_model("supply_room", "Item")
+    ItemOrder = apps.get_model("supply_room", "ItemOrder")
+    ItemStock = apps.get_model("supply_room", "ItemStock")
+
+    stock = {}
+    units = Item.objects.values("name").annotate(
+        total=Count("id"),
+        available=Count("id", filter=Q(is_available=True)),
+    ).order_by()
+    for row in units:
+        stock[row["name"]] = ItemStock(name=row["name"], total=row["total"], available=row["available"])
+
+    orders = ItemOrder.objects.filter(
+        status__in=STATUS_STOCK_COUNTERS
+    ).values("item__name", "status").annotate(quantity=Sum("quantity")).order_by()
+    for row in orders:
+        counter = STATUS_STOCK_COUNTERS[row["status"]]
+        entry = stock.setdefault(row["item__name"], ItemStock(name=row["item__name"]))
+        setattr(entry, counter, getattr(entry, counter) + row["quantity"])
+
+    ItemStock.objects.bulk_create(stock.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0012_item_name_available_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemStock",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=200, primary_key=True, serialize=False),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("available", models.IntegerField(default=0)),
+                ("on_loan", models.IntegerField(default=0)),
+                ("requested", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_stock, migrations.RunPython.noop),
+    ]
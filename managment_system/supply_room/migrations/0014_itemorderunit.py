@@ -0,0 +1,91 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_units(apps, schema_editor):
+    """
+    Assigns units to the open ItemOrders. The referenced item is always one of
+    them, the rest of the quantity is taken from the unavailable units of the
+    same name that no other order holds yet.
+    """
+    Item = apps.get_model("supply_room", "Item")
+    ItemOrder = apps.get_model("supply_room", "ItemOrder")
+    ItemOrderUnit = apps.get_model("supply_room", "ItemOrderUnit")
+
+    open_orders = list(
+        ItemOrder.objects.filter(status__in=["Solicitado", "Prestado"])
+        .select_related("item")
+        .order_by("id")
+    )
+    claimed = {item_order.item_id for item_order in open_orders}
+
+    free_units = defaultdict(list)
+    names = {item_order.item.name for item_order in open_orders}
+    for unit_id, name in Item.objects.filter(
+        name__in=names, is_available=False
+    ).exclude(id__in=claimed).order_by("code", "id").values_list("id", "name"):
+        free_units[name].append(unit_id)
+
+    lines = []
+    for item_order in open_orders:
+        unit_ids = [item_order.item_id]
+        extra = free_units[item_order.item.name]
+        while extra and len(unit_ids) < item_order.quantity:
+            unit_ids.append(extra.pop(0))
+        lines.extend(
+            ItemOrderUnit(item_order_id=item_order.id, item_id=unit_id) for unit_id in unit_ids
+        )
+
+    ItemOrderUnit.objects.bulk_create(lines, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0013_itemstock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemOrderUnit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="supply_room.item",
+                        verbose_name="Artículo",
+                    ),
+                ),
+                (
+                    "item_order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="units",
+                        to="supply_room.itemorder",
+                        verbose_name="Orden de artículo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Unidad reservada",
+                "verbose_name_plural": "Unidades reservadas",
+                "unique_together": {("item_order", "item")},
+            },
+        ),
+        migrations.RunPython(backfill_units, migrations.RunPython.noop),
+    ]
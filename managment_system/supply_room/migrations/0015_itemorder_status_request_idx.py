@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0014_itemorderunit"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="itemorder",
+            index=models.Index(
+                fields=["status", "request_date"], name="itemorder_status_request_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:30
+
+import supply_room.models
+from django.db import migrations, models
+from django.db.models import Case, Count, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_status(apps, schema_editor):
+    """
+    Copies the semester of the group and computes the status of the existing orders
+    """
+    ClassGroups = apps.get_model("supply_room", "ClassGroups")
+    ItemOrder = apps.get_model("supply_room", "ItemOrder")
+    Order = apps.get_model("supply_room", "Order")
+
+    groups = ClassGroups.objects.filter(pk=OuterRef("group_id"))
+    items = ItemOrder.objects.filter(order=OuterRef("pk")).order_by().values("order")
+
+    def count(status):
+        return Coalesce(
+            Subquery(items.filter(status=status).annotate(total=Count("id")).values("total")), 0
+        )
+
+    Order.objects.update(
+        year=Subquery(groups.values("year")),
+        term=Subquery(groups.values("term")),
+        requested_items=count("Solicitado"),
+        loaned_items=count("Prestado"),
+    )
+    Order.objects.update(
+        status=Case(
+            When(requested_items__gt=0, then=Value("pendiente")),
+            When(loaned_items__gt=0, then=Value("prestado")),
+            default=Value("completado"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0015_itemorder_status_request_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="loaned_items",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Artículos prestados"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="requested_items",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Artículos solicitados"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pendiente", "Pendiente"),
+                    ("prestado", "Prestado"),
+                    ("completado", "Completado"),
+                ],
+                default="completado",
+                max_length=20,
+                verbose_name="Estado",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="term",
+            field=models.CharField(
+                choices=[("I", "I"), ("II", "II"), ("III", "III")],
+                default="I",
+                max_length=3,
+                verbose_name="Semestre",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="year",
+            field=models.PositiveIntegerField(
+                default=supply_room.models.get_current_year, verbose_name="Año"
+            ),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "-year", "-term", "id"],
+                name="order_status_semester_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["-year", "-term", "id"], name="order_semester_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+import django.db.models.functions.text
+import supply_room.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0016_order_status"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        # unaccent() is only STABLE, the wrapper fixes the dictionary so it can be indexed
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS
+            $$ SELECT public.unaccent('public.unaccent', $1) $$
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            """,
+            "DROP FUNCTION IF EXISTS immutable_unaccent(text)",
+        ),
+        migrations.AddIndex(
+            model_name="itemstock",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    supply_room.models.ImmutableUnaccent(
+                        django.db.models.functions.text.Lower("name")
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="itemstock_name_trgm_idx",
+            ),
+        ),
+    ]
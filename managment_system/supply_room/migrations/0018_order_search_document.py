@@ -0,0 +1,64 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:37
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+from supply_room.models import ImmutableUnaccent
+
+
+def backfill_search(apps, schema_editor):
+    """
+    Builds the search document of the existing orders, as OrderQuerySet.refresh_search
+    """
+    Class = apps.get_model("supply_room", "Class")
+    Order = apps.get_model("supply_room", "Order")
+    UserOrder = apps.get_model("supply_room", "UserOrder")
+
+    members = (
+        UserOrder.objects.filter(order=OuterRef("pk")).order_by().values("order")
+        .annotate(text=StringAgg(
+            Concat(
+                "user__name", Value(" "), "user__email", Value(" "),
+                Coalesce("user__student_id", Value("")),
+                output_field=models.TextField(),
+            ),
+            delimiter=" ",
+        ))
+        .values("text")
+    )
+    classes = Class.objects.filter(classgroups__order_group=OuterRef("pk")).annotate(
+        text=Concat("name", Value(" "), "code", output_field=models.TextField())
+    ).values("text")
+
+    document = Concat(
+        Coalesce(Subquery(classes), Value("")), Value(" "), Coalesce(Subquery(members), Value("")),
+        output_field=models.TextField(),
+    )
+    Order.objects.update(search_document=ImmutableUnaccent(Lower(document)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0017_itemstock_name_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(backfill_search, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    "search_document", name="gin_trgm_ops"
+                ),
+                name="order_search_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:41
+
+from django.db import migrations
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keeps the oldest link of every student and group
+    """
+    StudentGroups = apps.get_model("supply_room", "StudentGroups")
+    keep = StudentGroups.objects.values("student", "group").annotate(keep=Min("id")).values("keep")
+    StudentGroups.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0018_order_search_document"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="studentgroups",
+            unique_together={("student", "group")},
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:03
+
+import django.contrib.postgres.fields
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0019_studentgroups_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=255, verbose_name="Asunto")),
+                ("message", models.TextField(blank=True, verbose_name="Mensaje")),
+                (
+                    "html_message",
+                    models.TextField(blank=True, verbose_name="Mensaje HTML"),
+                ),
+                (
+                    "from_email",
+                    models.CharField(max_length=254, verbose_name="Remitente"),
+                ),
+                (
+                    "recipients",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.EmailField(max_length=254),
+                        size=None,
+                        verbose_name="Destinatarios",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("enviando", "Enviando"),
+                            ("enviado", "Enviado"),
+                            ("fallido", "Fallido"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Intentos"),
+                ),
+                (
+                    "next_attempt",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Próximo intento",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Último error"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creado"),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Enviado"),
+                ),
+            ],
+            options={
+                "verbose_name": "Correo saliente",
+                "verbose_name_plural": "Correos salientes",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt"], name="outbox_due_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+def free_code(code, class_id, taken, max_length=200):
+    """
+    Code of a repeated class: the code with its id, plus a counter while that
+    one is also taken, cut so it fits in the field
+    """
+    suffix = f"-{class_id}"
+    counter = 1
+    while True:
+        candidate = f"{code[:max_length - len(suffix)]}{suffix}"
+        if candidate not in taken:
+            return candidate
+        counter += 1
+        suffix = f"-{class_id}-{counter}"
+
+
+def deduplicate_codes(apps, schema_editor):
+    """
+    Renames the repeated classes with free_code, keeping the oldest one
+    with its code, so the unique index can be created
+    """
+    Class = apps.get_model("supply_room", "Class")
+    taken = set(Class.objects.values_list("code", flat=True))
+    seen = set()
+    for class_id in Class.objects.order_by("code", "id"):
+        if class_id.code in seen:
+            class_id.code = free_code(class_id.code, class_id.id, taken)
+            class_id.save(update_fields=["code"])
+            taken.add(class_id.code)
+        seen.add(class_id.code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0020_outboundemail"),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="class",
+            name="code",
+            field=models.CharField(max_length=200, unique=True),
+        ),
+    ]
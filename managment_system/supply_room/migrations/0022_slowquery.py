@@ -0,0 +1,65 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0021_class_code_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        db_index=True, max_length=32, verbose_name="Huella"
+                    ),
+                ),
+                ("statement", models.TextField(verbose_name="Consulta")),
+                (
+                    "params",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Parámetros"
+                    ),
+                ),
+                ("duration", models.FloatField(verbose_name="Duración (ms)")),
+                (
+                    "view",
+                    models.CharField(blank=True, max_length=200, verbose_name="Vista"),
+                ),
+                (
+                    "caller",
+                    models.CharField(blank=True, max_length=500, verbose_name="Origen"),
+                ),
+                (
+                    "template",
+                    models.CharField(
+                        blank=True, max_length=300, verbose_name="Plantilla"
+                    ),
+                ),
+                ("explain", models.TextField(blank=True, verbose_name="Plan")),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Fecha"),
+                ),
+            ],
+            options={
+                "verbose_name": "Consulta lenta",
+                "verbose_name_plural": "Consultas lentas",
+                "ordering": ["-id"],
+            },
+        ),
+    ]
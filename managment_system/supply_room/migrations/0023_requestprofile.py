@@ -0,0 +1,83 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0022_slowquery"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("method", models.CharField(max_length=10, verbose_name="Método")),
+                ("path", models.CharField(max_length=500, verbose_name="Ruta")),
+                (
+                    "view",
+                    models.CharField(blank=True, max_length=200, verbose_name="Vista"),
+                ),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(verbose_name="Estado"),
+                ),
+                ("duration", models.FloatField(verbose_name="Duración (ms)")),
+                (
+                    "sql_queries",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Consultas SQL"
+                    ),
+                ),
+                (
+                    "sql_duration",
+                    models.FloatField(default=0, verbose_name="Tiempo SQL (ms)"),
+                ),
+                (
+                    "peak_memory",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Memoria máxima (bytes)"
+                    ),
+                ),
+                ("functions", models.JSONField(default=list, verbose_name="Funciones")),
+                ("queries", models.JSONField(default=list, verbose_name="Consultas")),
+                (
+                    "allocations",
+                    models.JSONField(
+                        default=list, verbose_name="Asignaciones de memoria"
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Fecha"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Perfil de solicitud",
+                "verbose_name_plural": "Perfiles de solicitudes",
+                "ordering": ["-id"],
+            },
+        ),
+    ]
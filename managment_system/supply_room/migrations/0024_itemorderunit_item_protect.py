@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0023_requestprofile"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="itemorderunit",
+            name="item",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="reservations",
+                to="supply_room.item",
+                verbose_name="Artículo",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_room", "0024_itemorderunit_item_protect"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("requested_items__gt", 0)),
+                fields=["-year", "-term", "id"],
+                name="order_requested_semester_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("loaned_items__gt", 0)),
+                fields=["-year", "-term", "id"],
+                name="order_loaned_semester_idx",
+            ),
+        ),
+    ]
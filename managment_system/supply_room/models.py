@@ -1,9 +1,25 @@
 from django.apps import apps
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMultiAlternatives
 from django.core.validators import MinValueValidator
-from django.db import models
-from datetime import datetime
+from django.db import connections, models, transaction
+from django.db.models import Avg, Case, Count, F, Func, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Lower
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+import unicodedata
+
+from .authz import invalidate_authorization
+from .caching import FRAGMENT_CACHE_TIMEOUT, bump_generation, get_generations
 
 # ALL CHOICES DEFINITIONS
 STATUS_CHOICES = (
@@ -25,6 +41,45 @@ ROLE_CHOICES = (
     ("admin", "Administrador"),
 )
 
+OUTBOX_STATUS_CHOICES = (
+    ("pendiente", "Pendiente"),
+    ("enviando", "Enviando"),
+    ("enviado", "Enviado"),
+    ("fallido", "Fallido"),
+)
+
+# Stock counter that holds the units of an ItemOrder in each status
+STATUS_STOCK_COUNTERS = {
+    "Solicitado": "requested",
+    "Prestado": "on_loan",
+}
+
+STOCK_COUNTERS = ("total", "available", "on_loan", "requested")
+
+# Item names returned per page by the item search
+ITEM_SEARCH_PAGE_SIZE = 20
+
+ORDER_STATUS_CHOICES = (
+    ("pendiente", "Pendiente"),
+    ("prestado", "Prestado"),
+    ("completado", "Completado"),
+)
+
+# Order counter that holds the ItemOrders in each status
+STATUS_ORDER_COUNTERS = {
+    "Solicitado": "requested_items",
+    "Prestado": "loaned_items",
+}
+
+# Orders of each status filter of the admin list: an order with items
+# requested and on loan is under pendiente and under prestado, completado
+# has neither
+ORDER_STATUS_FILTERS = {
+    "pendiente": Q(requested_items__gt=0),
+    "prestado": Q(loaned_items__gt=0),
+    "completado": Q(status="completado"),
+}
+
 
 class CustomUserManager(UserManager):
     """
@@ -66,11 +121,301 @@ class CustomUserManager(UserManager):
         return user
 
 
+def normalize_search(text):
+    """
+    Lowercases the text and removes its accents, as the item search compares names
+    """
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+class ImmutableUnaccent(Func):
+    """
+    unaccent() wrapper declared IMMUTABLE (migration 0017) so it can be indexed
+    """
+
+    function = "immutable_unaccent"
+    output_field = models.CharField()
+
+
+class ItemStockManager(models.Manager):
+    """
+    Keeps the per-name stock counters up to date
+    """
+
+    def available(self, name):
+        """
+        Gets the number of available units of an item name
+        """
+        return self.filter(pk=name).values_list("available", flat=True).first() or 0
+
+    def adjust(self, name, **deltas):
+        """
+        Adds the given deltas to the counters of an item name
+        """
+        deltas = {counter: delta for counter, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        updates = {counter: F(counter) + delta for counter, delta in deltas.items()}
+        if not self.filter(pk=name).update(**updates):
+            self.get_or_create(name=name)
+            self.filter(pk=name).update(**updates)
+        # The counters are updated without signals, the cached lists of items
+        # are invalidated here (at the commit, the row stays locked until then)
+        bump_generation("item", now=False)
+
+    def adjust_many(self, deltas_by_name):
+        """
+        Adds the deltas of several item names ({name: {counter: delta}})
+        with one insert of the missing names and one UPDATE
+        """
+        deltas_by_name = {
+            name: {counter: delta for counter, delta in deltas.items() if delta}
+            for name, deltas in deltas_by_name.items()
+        }
+        deltas_by_name = {name: deltas for name, deltas in deltas_by_name.items() if deltas}
+        if not deltas_by_name:
+            return
+
+        self.bulk_create([self.model(name=name) for name in deltas_by_name], ignore_conflicts=True)
+        counters = {counter for deltas in deltas_by_name.values() for counter in deltas}
+        updates = {
+            counter: F(counter) + Case(
+                *[
+                    When(pk=name, then=Value(deltas[counter]))
+                    for name, deltas in deltas_by_name.items() if counter in deltas
+                ],
+                default=Value(0),
+            )
+            for counter in counters
+        }
+        self.filter(pk__in=deltas_by_name).update(**updates)
+        bump_generation("item", now=False)
+
+    def move(self, name, quantity, source_status, target_status, **extra):
+        """
+        Moves the units of an ItemOrder between the counters of its statuses.
+        Extra deltas are applied in the same update.
+        """
+        deltas = defaultdict(int, extra)
+        if source_status in STATUS_STOCK_COUNTERS:
+            deltas[STATUS_STOCK_COUNTERS[source_status]] -= quantity
+        if target_status in STATUS_STOCK_COUNTERS:
+            deltas[STATUS_STOCK_COUNTERS[target_status]] += quantity
+        self.adjust(name, **deltas)
+
+    def compute(self):
+        """
+        Computes the expected counters of every item name from Item and ItemOrder
+        """
+        expected = defaultdict(lambda: dict.fromkeys(STOCK_COUNTERS, 0))
+
+        units = Item.objects.values("name").annotate(
+            total=Count("id"),
+            available=Count("id", filter=Q(is_available=True)),
+        ).order_by()
+        for row in units:
+            expected[row["name"]].update(total=row["total"], available=row["available"])
+
+        orders = ItemOrder.objects.filter(
+            status__in=STATUS_STOCK_COUNTERS
+        ).values("item__name", "status").annotate(quantity=Sum("quantity")).order_by()
+        for row in orders:
+            expected[row["item__name"]][STATUS_STOCK_COUNTERS[row["status"]]] += row["quantity"]
+
+        return expected
+
+    def rebuild(self, commit=True):
+        """
+        Compares the table with the expected counters and rewrites the rows
+        that are out of sync.
+        Returns a dict with the stale names and their (current, expected) counters
+        """
+        expected = self.compute()
+        current = {
+            stock.name: {counter: getattr(stock, counter) for counter in STOCK_COUNTERS}
+            for stock in self.all()
+        }
+
+        empty = dict.fromkeys(STOCK_COUNTERS, 0)
+        stale = {
+            name: (current.get(name, empty), expected.get(name, empty))
+            for name in expected.keys() | current.keys()
+            if current.get(name) != expected.get(name)
+        }
+
+        if commit and stale:
+            with transaction.atomic():
+                self.filter(pk__in=[name for name in stale if name not in expected]).delete()
+                self.bulk_create(
+                    [self.model(name=name, **expected[name]) for name in stale if name in expected],
+                    update_conflicts=True,
+                    unique_fields=["name"],
+                    update_fields=list(STOCK_COUNTERS),
+                )
+            bump_generation("item")
+
+        return stale
+
+    def search(self, query, after=None, limit=ITEM_SEARCH_PAGE_SIZE):
+        """
+        Searches the available item names containing `query`, ignoring case and
+        accents, ranked by trigram similarity.
+
+        `after` is the (rank, name) of the last row of the previous page, the
+        first page is returned if it isn't such a pair (a tampered cursor).
+        Returns the rows (name, rank) of the page and whether there are more.
+        The filter uses the trigram index on the normalized name, so the cost
+        depends on the matches and not on the size of the catalogue.
+        """
+        term = normalize_search(query)
+        document = ImmutableUnaccent(Lower("name"))
+        # similarity() is a real, as double precision the rank survives the
+        # round trip through the cursor and compares equal
+        queryset = self.filter(available__gt=0).alias(document=document).annotate(
+            rank=Cast(TrigramSimilarity(document, Value(term)), models.FloatField())
+        )
+        if term:
+            queryset = queryset.filter(document__contains=term)
+        if not (
+            isinstance(after, (list, tuple)) and len(after) == 2
+            and isinstance(after[0], (int, float)) and not isinstance(after[0], bool)
+            and isinstance(after[1], str)
+        ):
+            after = None
+        if after:
+            rank, name = after
+            queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, name__gt=name))
+
+        rows = list(queryset.order_by("-rank", "name").values_list("name", "rank")[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+
+class ItemManager(models.Manager):
+    """
+    Manager for the physical units of the inventory
+    """
+
+    def reserve(self, name, quantity, code=None):
+        """
+        Marks up to `quantity` available units of an item name as unavailable
+        in a single statement and returns them.
+
+        Units locked by another reservation in progress are skipped instead of
+        waited on, so concurrent requests for the same item don't block each other.
+        The caller must check that enough units were returned and roll back otherwise.
+        """
+        opts = self.model._meta
+        columns = [field.column for field in opts.concrete_fields]
+        filters = "name = %s AND is_available"
+        params = [name]
+        if code:
+            filters += " AND code = %s"
+            params.append(code)
+
+        sql = f"""
+            UPDATE {opts.db_table} SET is_available = false
+            WHERE is_available AND id IN (
+                SELECT id FROM {opts.db_table}
+                WHERE {filters}
+                ORDER BY code, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {", ".join(columns)}
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [*params, quantity])
+            rows = cursor.fetchall()
+        if rows:
+            # At the commit, not while the units are locked
+            bump_generation("item", now=False)
+
+        units = [
+            self.model.from_db(self.db, [field.attname for field in opts.concrete_fields], row)
+            for row in rows
+        ]
+        return sorted(units, key=lambda unit: (unit.code, unit.id))
+
+    def release(self, item_order_ids):
+        """
+        Marks the units reserved by the given ItemOrders as available again
+        in a single statement.
+        Returns a Counter with the number of units released per item name
+        """
+        if not item_order_ids:
+            return Counter()
+
+        sql = f"""
+            UPDATE {self.model._meta.db_table} SET is_available = true
+            WHERE NOT is_available AND id IN (
+                SELECT item_id FROM {ItemOrderUnit._meta.db_table}
+                WHERE item_order_id = ANY(%s)
+            )
+            RETURNING name
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [list(item_order_ids)])
+            released = Counter(name for name, in cursor.fetchall())
+        if released:
+            bump_generation("item", now=False)
+        return released
+
+
 class Item(models.Model):
     name = models.CharField(max_length=200)
     is_available = models.BooleanField(default=True)
     code = models.CharField(max_length=200, blank=True, verbose_name="Código")
 
+    objects = ItemManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "is_available"], name="item_name_available_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stock_state = (instance.name, instance.is_available)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the unit and updates the stock counters of its name
+        """
+        previous = getattr(self, "_stock_state", None)
+        current = (self.name, self.is_available)
+
+        with transaction.atomic():
+            if previous is None and self.pk is not None:
+                # Not loaded from the database, like Item(pk=...): the stored
+                # row, if there is one, is the state counted in the stock
+                previous = (
+                    Item._base_manager.select_for_update().filter(pk=self.pk)
+                    .values_list("name", "is_available").first()
+                )
+            super().save(*args, **kwargs)
+            if previous is None:
+                ItemStock.objects.adjust(self.name, total=1, available=int(self.is_available))
+            elif previous[0] != self.name:
+                ItemStock.objects.adjust(previous[0], total=-1, available=-int(previous[1]))
+                ItemStock.objects.adjust(self.name, total=1, available=int(self.is_available))
+            elif previous[1] != self.is_available:
+                ItemStock.objects.adjust(self.name, available=int(self.is_available) - int(previous[1]))
+
+        self._stock_state = current
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the unit and updates the stock counters of its name
+        """
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            ItemStock.objects.adjust(self.name, total=-1, available=-int(self.is_available))
+        return result
+
     def __str__(self):
         return f"{self.name}"
 
@@ -79,6 +424,34 @@ class Item(models.Model):
         return not ItemOrder.objects.filter(item=self).exists()
 
 
+class ItemStock(models.Model):
+    """
+    Stock counters of every item name.
+
+    total and available follow the Item rows, requested and on_loan follow
+    the status of the ItemOrders. Rebuild it with the reconcile_stock command.
+    """
+
+    name = models.CharField(max_length=200, primary_key=True)
+    total = models.IntegerField(default=0)
+    available = models.IntegerField(default=0)
+    on_loan = models.IntegerField(default=0)
+    requested = models.IntegerField(default=0)
+
+    objects = ItemStockManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                OpClass(ImmutableUnaccent(Lower("name")), name="gin_trgm_ops"),
+                name="itemstock_name_trgm_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.available}/{self.total})"
+
+
 class Users(AbstractUser):
     """
     Expands the basic django user definition with custom fields
@@ -111,14 +484,66 @@ class Users(AbstractUser):
         return f"{self.email}"
 
 
+# Cache key of the code -> id mapping of the classes, dropped by the signals
+# of Class (signals.py) when a class is created, renamed or deleted
+CLASS_CODES_CACHE_KEY = "class-codes"
+
+
+class ClassManager(models.Manager):
+    def id_for_code(self, code):
+        """
+        Id of the class with the given code, or None if there isn't one.
+        The mapping of all the codes is loaded with one query and cached
+        """
+        codes = cache.get(CLASS_CODES_CACHE_KEY)
+        if codes is None:
+            codes = dict(self.values_list("code", "id"))
+            cache.set(CLASS_CODES_CACHE_KEY, codes, None)
+        return codes.get(code)
+
+
 class Class(models.Model):
     name = models.CharField(max_length=200)
-    code = models.CharField(max_length=200)
+    code = models.CharField(max_length=200, unique=True)
+
+    objects = ClassManager()
 
     def __str__(self):
         return f"{self.name} ({self.code})"
 
 
+def sync_members(link_model, owner_field, member_field, owner, users, remove=True):
+    """
+    Makes the given users the members of `owner` in `link_model`.
+    Reads the current members in one query, creates the missing links with one
+    bulk_create and, if `remove` is set, deletes the other links with one delete.
+    Returns the ids of the users added and removed and the number of unchanged members.
+    """
+    if not hasattr(users, '__iter__') or isinstance(users, str):
+        users = [users]
+    wanted = {getattr(user, "pk", user) for user in users}
+
+    member_id = f"{member_field}_id"
+    links = link_model.objects.filter(**{owner_field: owner})
+    current = links if remove else links.filter(**{f"{member_id}__in": wanted})
+    current = set(current.values_list(member_id, flat=True))
+
+    added = sorted(wanted - current)
+    removed = sorted(current - wanted) if remove else []
+    with transaction.atomic():
+        link_model.objects.bulk_create(
+            [link_model(**{owner_field: owner, member_id: user_id}) for user_id in added],
+            ignore_conflicts=True,
+        )
+        if removed:
+            links.filter(**{f"{member_id}__in": removed}).delete()
+        if added:
+            # bulk_create doesn't send the signals that invalidate the memberships
+            invalidate_authorization(added)
+
+    return {"added": added, "removed": removed, "unchanged": len(wanted & current)}
+
+
 def get_current_year():
     return datetime.now().year
 
@@ -156,16 +581,15 @@ class ClassGroups(models.Model):
 
     def add_students(self, users):
         """
-        Add multiple students to the group
+        Add multiple students to the group, returns the changes as sync_members
         """
-        if not hasattr(users, '__iter__') or isinstance(users, str):
-            users = [users]
+        return sync_members(StudentGroups, "group", "student", self, users, remove=False)
 
-        StudentGroups.objects.bulk_create([
-            StudentGroups(student=user, group=self)
-            for user in users
-            if not StudentGroups.objects.filter(student=user, group=self).exists()
-        ])
+    def set_students(self, users):
+        """
+        Makes the given users the students of the group, returns the changes as sync_members
+        """
+        return sync_members(StudentGroups, "group", "student", self, users)
 
     def remove_students(self, users):
         """
@@ -173,6 +597,154 @@ class ClassGroups(models.Model):
         """
         StudentGroups.objects.filter(student__in=users, group=self).delete()
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the group and copies its semester to the orders, which keep it
+        as their sort key
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.order_group.exclude(year=self.year, term=self.term).update(
+                year=self.year, term=self.term
+            )
+
+
+def order_status_expression(requested_items, loaned_items):
+    """
+    Status of an order from the number of its items requested and on loan
+    """
+    return Case(
+        When(GreaterThan(requested_items, 0), then=Value("pendiente")),
+        When(GreaterThan(loaned_items, 0), then=Value("prestado")),
+        default=Value("completado"),
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    """
+    QuerySet for orders with the data needed by the order lists
+    """
+
+    def move_items(self, order_id, source_status, target_status, count=1):
+        """
+        Moves `count` items of an order from `source_status` to `target_status`
+        (None when they are created or deleted) and updates the stored status
+        of the order in the same UPDATE
+        """
+        deltas = defaultdict(int)
+        if source_status in STATUS_ORDER_COUNTERS:
+            deltas[STATUS_ORDER_COUNTERS[source_status]] -= count
+        if target_status in STATUS_ORDER_COUNTERS:
+            deltas[STATUS_ORDER_COUNTERS[target_status]] += count
+        if not any(deltas.values()):
+            return 0
+
+        requested_items = F("requested_items") + deltas["requested_items"]
+        loaned_items = F("loaned_items") + deltas["loaned_items"]
+        updated = self.filter(pk=order_id).update(
+            requested_items=requested_items,
+            loaned_items=loaned_items,
+            status=order_status_expression(requested_items, loaned_items),
+        )
+        bump_generation("order", now=False)
+        return updated
+
+    def refresh_status(self):
+        """
+        Recomputes the item counters and the status of the orders from their items
+        """
+        items = ItemOrder.objects.filter(order=OuterRef("pk")).order_by().values("order")
+
+        def count(status):
+            return Coalesce(
+                Subquery(items.filter(status=status).annotate(total=Count("id")).values("total")),
+                0,
+            )
+
+        updated = self.update(
+            requested_items=count("Solicitado"),
+            loaned_items=count("Prestado"),
+            status=order_status_expression(count("Solicitado"), count("Prestado")),
+        )
+        bump_generation("order")
+        return updated
+
+    def refresh_search(self):
+        """
+        Rebuilds the search document of the orders: name and code of the class
+        and name, email and student id of the members, normalized as the item search
+        """
+        members = (
+            UserOrder.objects.filter(order=OuterRef("pk")).order_by().values("order")
+            .annotate(text=StringAgg(
+                Concat(
+                    "user__name", Value(" "), "user__email", Value(" "),
+                    Coalesce("user__student_id", Value("")),
+                    output_field=models.TextField(),
+                ),
+                delimiter=" ",
+            ))
+            .values("text")
+        )
+        classes = Class.objects.filter(classgroups__order_group=OuterRef("pk")).annotate(
+            text=Concat("name", Value(" "), "code", output_field=models.TextField())
+        ).values("text")
+
+        document = Concat(
+            Coalesce(Subquery(classes), Value("")), Value(" "), Coalesce(Subquery(members), Value("")),
+            output_field=models.TextField(),
+        )
+        return self.update(search_document=ImmutableUnaccent(Lower(document)))
+
+    def search(self, text):
+        """
+        Filters the orders whose class or members contain `text`, uses the
+        trigram index of the search document
+        """
+        return self.filter(search_document__contains=normalize_search(text))
+
+    def with_status(self, status):
+        """
+        Orders under a status filter of the admin list (ORDER_STATUS_FILTERS)
+        """
+        return self.filter(ORDER_STATUS_FILTERS[status])
+
+    def status_totals(self):
+        """
+        Number of orders under each status filter and of all of them ("todas"),
+        in a single query
+        """
+        return self.order_by().aggregate(
+            **{status: Count("id", filter=condition) for status, condition in ORDER_STATUS_FILTERS.items()},
+            todas=Count("id"),
+        )
+
+    def cached_status_totals(self):
+        """
+        status_totals of all the orders, cached until an order is created,
+        deleted or changes status (generation "order")
+        """
+        generation, = get_generations(["order"])
+        key = f"order-status-totals:v2:{generation}"
+        totals = cache.get(key)
+        if totals is None:
+            totals = self.model._default_manager.status_totals()
+            cache.set(key, totals, FRAGMENT_CACHE_TIMEOUT)
+        return totals
+
+    def with_members(self):
+        """
+        Prefetches the users of each order in a single query
+        """
+        return self.prefetch_related(
+            Prefetch("userorder_set", queryset=UserOrder.objects.select_related("user").order_by("id"))
+        )
+
+
+# Sort of the order lists (newest semester first), backed by the indexes
+# order_semester_idx and the indexes of each status filter for keyset pagination
+ORDER_LIST_ORDERING = ("-year", "-term", "id")
+
 
 class Order(models.Model):
     group = models.ForeignKey(
@@ -181,21 +753,52 @@ class Order(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Grupo",
     )
+    # Denormalized from the items and the group, kept by ItemOrder.save/delete
+    # and ClassGroups.save so the lists filter and sort on an index
+    status = models.CharField(
+        max_length=20,
+        choices=ORDER_STATUS_CHOICES,
+        default="completado",
+        verbose_name="Estado",
+    )
+    requested_items = models.PositiveIntegerField(default=0, verbose_name="Artículos solicitados")
+    loaned_items = models.PositiveIntegerField(default=0, verbose_name="Artículos prestados")
+    year = models.PositiveIntegerField(default=get_current_year, verbose_name="Año")
+    term = models.CharField(max_length=3, choices=TERM_CHOICES, default="I", verbose_name="Semestre")
+    # Normalized text of the class and the members, kept by the signals of the app
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-year", "-term", "id"], name="order_status_semester_idx"),
+            models.Index(
+                fields=["-year", "-term", "id"], condition=Q(requested_items__gt=0), name="order_requested_semester_idx"
+            ),
+            models.Index(
+                fields=["-year", "-term", "id"], condition=Q(loaned_items__gt=0), name="order_loaned_semester_idx"
+            ),
+            models.Index(fields=["-year", "-term", "id"], name="order_semester_idx"),
+            GinIndex(OpClass("search_document", name="gin_trgm_ops"), name="order_search_trgm_idx"),
+        ]
 
     def __str__(self):
         return f"{self.group.id}"
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the order with the semester of its group
+        """
+        self.year, self.term = self.group.year, self.group.term
+        super().save(*args, **kwargs)
+
     @property
     def needs_attention(self):
         """
-        Computed property base on items in the order
+        Status of the order based on its items (pendiente, prestado or completado)
         """
-        order_items = ItemOrder.objects.filter(order=self)
-        if any([item.status == "Solicitado" for item in order_items]):
-            return "pendiente"
-        if any([item.status == "Prestado" for item in order_items]):
-            return "prestado"
-        return "completado"
+        return self.status
 
     @property
     def students(self):
@@ -204,18 +807,34 @@ class Order(models.Model):
         """
         return Users.objects.filter(userorder__order=self)
 
+    @property
+    def members(self):
+        """
+        Gets the users of the order as a list, using the ones prefetched
+        by with_members() when available
+        """
+        if "userorder_set" in getattr(self, "_prefetched_objects_cache", {}):
+            return [user_order.user for user_order in self.userorder_set.all()]
+        return list(self.students.order_by("userorder__id"))
+
     def add_students(self, users):
         """
-        Add multiple students to the order
+        Add multiple students to the order, returns the changes as sync_members
         """
-        if not hasattr(users, '__iter__') or isinstance(users, str):
-            users = [users]
+        return self._sync_students(users, remove=False)
 
-        UserOrder.objects.bulk_create([
-            UserOrder(user=user, order=self)
-            for user in users
-            if not UserOrder.objects.filter(user=user, order=self).exists()
-        ])
+    def set_students(self, users):
+        """
+        Makes the given users the members of the order, returns the changes as sync_members
+        """
+        return self._sync_students(users, remove=True)
+
+    def _sync_students(self, users, remove):
+        changes = sync_members(UserOrder, "order", "user", self, users, remove=remove)
+        if changes["added"]:
+            # bulk_create doesn't send the signals that keep the search document
+            Order.objects.filter(pk=self.pk).refresh_search()
+        return changes
 
     def remove_students(self, users):
         """
@@ -224,6 +843,90 @@ class Order(models.Model):
         UserOrder.objects.filter(user__in=users, order=self).delete()
 
 
+class ItemOrderManager(models.Manager):
+    """
+    Manager for the items requested in the orders
+    """
+
+    def purge(self, item_order_ids):
+        """
+        Deletes the given ItemOrders and their unit lines in a single statement,
+        without loading them. Doesn't release the units.
+        """
+        if not item_order_ids:
+            return 0
+
+        sql = f"""
+            WITH lines AS (
+                DELETE FROM {ItemOrderUnit._meta.db_table} WHERE item_order_id = ANY(%s)
+            )
+            DELETE FROM {self.model._meta.db_table} WHERE id = ANY(%s)
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [list(item_order_ids), list(item_order_ids)])
+            return cursor.rowcount
+
+    def apply_changes(self, item_orders):
+        """
+        Saves ItemOrders edited by the admin and applies their status
+        transitions in a fixed number of queries: one bulk update of the rows,
+        one release of the units returned or denied, one update of the order
+        counters per transition and one update of the stock counters.
+        The ItemOrders must be loaded from the db, their previous status and
+        their quantity are the ones they were loaded with: the quantity is
+        fixed by the reserved units, so it is never changed here.
+        Raises ValidationError if the units of the released items can't be reactivated.
+        """
+        if not item_orders:
+            return
+
+        now = timezone.now()
+        stock = defaultdict(lambda: defaultdict(int))
+        transitions = Counter()
+        released_ids = []
+        released_quantity = 0
+
+        for item_order in item_orders:
+            _, previous, quantity = item_order._order_state
+            item_order.quantity = quantity
+            if previous == item_order.status:
+                continue
+            if item_order.status == "Devuelto":
+                item_order.return_date = now
+            elif previous == "Solicitado" and item_order.status == "Prestado":
+                item_order.loan_date = now
+            if item_order.status in ("Devuelto", "Denegado"):
+                released_ids.append(item_order.pk)
+                released_quantity += quantity
+
+            deltas = stock[item_order.item.name]
+            if previous in STATUS_STOCK_COUNTERS:
+                deltas[STATUS_STOCK_COUNTERS[previous]] -= quantity
+            if item_order.status in STATUS_STOCK_COUNTERS:
+                deltas[STATUS_STOCK_COUNTERS[item_order.status]] += quantity
+            transitions[item_order.order_id, previous, item_order.status] += 1
+
+        with transaction.atomic():
+            self.bulk_update(item_orders, ["code", "status", "loan_date", "return_date"])
+
+            released = Item.objects.release(released_ids)
+            if sum(released.values()) < released_quantity:
+                raise ValidationError(
+                    f"No se pudieron reactivar todos los ítems. "
+                    f"Reactivados: {sum(released.values())}/{released_quantity}"
+                )
+            for (order_id, previous, status), count in transitions.items():
+                Order.objects.move_items(order_id, previous, status, count)
+
+            # Stock counters last, as in every transaction (see ItemForm.save)
+            for name, count in released.items():
+                stock[name]["available"] += count
+            ItemStock.objects.adjust_many(stock)
+
+        for item_order in item_orders:
+            item_order._order_state = (item_order.order_id, item_order.status, item_order.quantity)
+
+
 class ItemOrder(models.Model):
     status = models.CharField(
         max_length=20,
@@ -247,10 +950,82 @@ class ItemOrder(models.Model):
         null=True, blank=True, verbose_name="Fecha de préstamo"
     )
 
+    objects = ItemOrderManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "request_date"], name="itemorder_status_request_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._order_state = (instance.order_id, instance.status, instance.quantity)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the ItemOrder and updates the status of its order.
+        When it is created, records the units it holds: they come from
+        `reserved_units` if the caller reserved them, otherwise the
+        referenced item is the only unit.
+        """
+        adding = self._state.adding
+        previous = getattr(self, "_order_state", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                units = getattr(self, "reserved_units", None) or [self.item]
+                ItemOrderUnit.objects.bulk_create(
+                    [ItemOrderUnit(item_order=self, item=unit) for unit in units]
+                )
+
+            if previous is None:
+                Order.objects.move_items(self.order_id, None, self.status)
+            elif previous[0] != self.order_id:
+                Order.objects.move_items(previous[0], previous[1], None)
+                Order.objects.move_items(self.order_id, None, self.status)
+            elif previous[1] != self.status:
+                Order.objects.move_items(self.order_id, previous[1], self.status)
+
+        self._order_state = (self.order_id, self.status, self.quantity)
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the ItemOrder and updates the status of its order
+        """
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Order.objects.move_items(self.order_id, self.status, None)
+        return result
+
     def __str__(self):
         return f"{self.order.id}, {self.item.id}"
 
 
+class ItemOrderUnit(models.Model):
+    """
+    Physical unit held by an ItemOrder.
+    The rows are kept after the units are released as the loan history, so
+    an item that was ever reserved can't be deleted (PROTECT).
+    """
+
+    item_order = models.ForeignKey(
+        ItemOrder, related_name="units", on_delete=models.CASCADE, verbose_name="Orden de artículo"
+    )
+    item = models.ForeignKey(
+        Item, related_name="reservations", on_delete=models.PROTECT, verbose_name="Artículo"
+    )
+
+    class Meta:
+        unique_together = [['item_order', 'item']]
+        verbose_name = 'Unidad reservada'
+        verbose_name_plural = 'Unidades reservadas'
+
+    def __str__(self):
+        return f"{self.item_order.id}, {self.item.id}"
+
+
 class UserOrder(models.Model):
     user = models.ForeignKey(Users, on_delete=models.RESTRICT)
     order = models.ForeignKey(Order, on_delete=models.RESTRICT)
@@ -268,5 +1043,195 @@ class StudentGroups(models.Model):
     student = models.ForeignKey(Users, on_delete=models.RESTRICT)
     group = models.ForeignKey(ClassGroups, on_delete=models.RESTRICT)
 
+    class Meta:
+        unique_together = [['student', 'group']]
+
     def __str__(self):
         return f"{self.student.id}, {self.group.id}"
+
+
+class OutboundEmailQuerySet(models.QuerySet):
+    def enqueue(self, subject, from_email, recipients, message="", html_message=""):
+        """
+        Saves an email to be sent by the outbox worker
+        """
+        return self.create(
+            subject=subject,
+            from_email=from_email,
+            recipients=list(recipients),
+            message=message,
+            html_message=html_message,
+        )
+
+    def due(self, max_attempts=None):
+        """
+        Emails waiting to be sent, including the ones claimed by a worker
+        whose lease expired if they have less than max_attempts
+        """
+        expired_claims = Q(status="enviando")
+        if max_attempts is not None:
+            expired_claims &= Q(attempts__lt=max_attempts)
+        return self.filter(Q(status="pendiente") | expired_claims, next_attempt__lte=timezone.now())
+
+    def fail_abandoned(self, max_attempts):
+        """
+        Marks as failed the emails whose lease expired after max_attempts:
+        the worker died every time it sent them, so they are not retried.
+        Returns the number of emails.
+        """
+        return self.filter(
+            status="enviando", attempts__gte=max_attempts, next_attempt__lte=timezone.now()
+        ).update(
+            status="fallido",
+            last_error=f"El envío se interrumpió {max_attempts} veces sin terminar.",
+        )
+
+    def claim(self, batch_size, lease, max_attempts=None):
+        """
+        Marks up to batch_size due emails as being sent for `lease` seconds and
+        returns them. Rows locked by another worker are skipped, so several
+        workers never send the same email.
+        """
+        with transaction.atomic():
+            ids = list(
+                self.due(max_attempts).select_for_update(skip_locked=True)
+                .order_by("next_attempt").values_list("id", flat=True)[:batch_size]
+            )
+            self.filter(id__in=ids).update(
+                status="enviando",
+                attempts=F("attempts") + 1,
+                next_attempt=timezone.now() + timedelta(seconds=lease),
+            )
+        return list(self.filter(id__in=ids).order_by("next_attempt", "id"))
+
+
+class OutboundEmail(models.Model):
+    """
+    Email waiting to be sent (outbox). The views only save the message and
+    the send_emails command delivers it, retrying the failures.
+    """
+
+    subject = models.CharField(max_length=255, verbose_name="Asunto")
+    message = models.TextField(blank=True, verbose_name="Mensaje")
+    html_message = models.TextField(blank=True, verbose_name="Mensaje HTML")
+    from_email = models.CharField(max_length=254, verbose_name="Remitente")
+    recipients = ArrayField(models.EmailField(max_length=254), verbose_name="Destinatarios")
+    status = models.CharField(
+        max_length=20, choices=OUTBOX_STATUS_CHOICES, default="pendiente", verbose_name="Estado"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    next_attempt = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviado")
+
+    objects = OutboundEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt"], name="outbox_due_idx"),
+        ]
+        verbose_name = "Correo saliente"
+        verbose_name_plural = "Correos salientes"
+
+    def __str__(self):
+        return f"{self.subject} ({', '.join(self.recipients)})"
+
+    def to_message(self, connection=None):
+        """
+        Builds the EmailMessage to send through the given connection
+        """
+        email = EmailMultiAlternatives(
+            self.subject, self.message, self.from_email, self.recipients, connection=connection
+        )
+        if self.html_message:
+            email.attach_alternative(self.html_message, "text/html")
+        return email
+
+
+class SlowQueryQuerySet(models.QuerySet):
+    def record(self, entries, max_rows):
+        """
+        Saves the captured slow queries and deletes the oldest ones, so the
+        table keeps at most max_rows (ring buffer)
+        """
+        saved = self.bulk_create(entries)
+        if saved:
+            self.filter(id__lte=max(entry.id for entry in saved) - max_rows).delete()
+        return saved
+
+    def by_fingerprint(self):
+        """
+        Slow queries grouped by fingerprint, the most expensive ones first
+        """
+        return (
+            self.values("fingerprint", "statement")
+            .annotate(
+                calls=Count("id"),
+                total=Sum("duration"),
+                average=Avg("duration"),
+                slowest=Max("duration"),
+                last_seen=Max("created"),
+                views=StringAgg("view", ", ", distinct=True),
+            )
+            .order_by("-total")
+        )
+
+
+class SlowQuery(models.Model):
+    """
+    SQL statement slower than SLOW_QUERY_THRESHOLD_MS captured by the
+    slow query watchdog (supply_room.slow_queries), with its origin.
+    """
+
+    fingerprint = models.CharField(max_length=32, db_index=True, verbose_name="Huella")
+    statement = models.TextField(verbose_name="Consulta")
+    params = models.JSONField(default=list, blank=True, verbose_name="Parámetros")
+    duration = models.FloatField(verbose_name="Duración (ms)")
+    view = models.CharField(max_length=200, blank=True, verbose_name="Vista")
+    caller = models.CharField(max_length=500, blank=True, verbose_name="Origen")
+    template = models.CharField(max_length=300, blank=True, verbose_name="Plantilla")
+    explain = models.TextField(blank=True, verbose_name="Plan")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+
+    objects = SlowQueryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name = "Consulta lenta"
+        verbose_name_plural = "Consultas lentas"
+
+    def __str__(self):
+        return f"{self.duration:.1f} ms {self.statement[:80]}"
+
+
+class RequestProfile(models.Model):
+    """
+    Profile of a single request asked by an admin with ?perfilar (see
+    supply_room.profiling): the functions that took the most time, the SQL
+    grouped by fingerprint and the memory allocated.
+    """
+
+    user = models.ForeignKey(
+        "Users", on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario"
+    )
+    method = models.CharField(max_length=10, verbose_name="Método")
+    path = models.CharField(max_length=500, verbose_name="Ruta")
+    view = models.CharField(max_length=200, blank=True, verbose_name="Vista")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Estado")
+    duration = models.FloatField(verbose_name="Duración (ms)")
+    sql_queries = models.PositiveIntegerField(default=0, verbose_name="Consultas SQL")
+    sql_duration = models.FloatField(default=0, verbose_name="Tiempo SQL (ms)")
+    peak_memory = models.PositiveBigIntegerField(default=0, verbose_name="Memoria máxima (bytes)")
+    functions = models.JSONField(default=list, verbose_name="Funciones")
+    queries = models.JSONField(default=list, verbose_name="Consultas")
+    allocations = models.JSONField(default=list, verbose_name="Asignaciones de memoria")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name = "Perfil de solicitud"
+        verbose_name_plural = "Perfiles de solicitudes"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration:.0f} ms)"
@@ -0,0 +1,96 @@
+"""
+Delivery of the emails saved in the outbox (OutboundEmail)
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Emails claimed per batch
+OUTBOX_BATCH_SIZE = 50
+
+# Attempts before an email is marked as failed
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Seconds before the first retry, doubled after each failed attempt
+OUTBOX_RETRY_DELAY = 60
+
+# Seconds a claimed email waits before another worker may send it,
+# in case the worker that claimed it died while sending
+OUTBOX_LEASE = 600
+
+
+def retry_delay(attempts):
+    """
+    Time to wait after the given number of failed attempts
+    """
+    return timedelta(seconds=OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def send_outbox(batch_size=OUTBOX_BATCH_SIZE, max_batches=None):
+    """
+    Sends the due emails of the outbox (se llama desde django-crontab y send_emails)
+
+    The emails are claimed in batches and sent over a single connection to
+    the mail server, reopened only after an error. A failed email is retried
+    later with exponential backoff, after OUTBOX_MAX_ATTEMPTS it is marked as
+    failed with the last error. An email whose lease expired that many times
+    (the worker died while sending it) is also marked as failed.
+    Returns a summary with the emails sent, retried and failed and the duration.
+    """
+    start = time.monotonic()
+    summary = {"sent": 0, "retried": 0, "failed": OutboundEmail.objects.fail_abandoned(OUTBOX_MAX_ATTEMPTS)}
+    connection = get_connection()
+    batches = 0
+
+    try:
+        while max_batches is None or batches < max_batches:
+            emails = OutboundEmail.objects.claim(batch_size, OUTBOX_LEASE, OUTBOX_MAX_ATTEMPTS)
+            if not emails:
+                break
+            batches += 1
+
+            sent, failures = [], []
+            for email in emails:
+                try:
+                    # No-op while the connection is open
+                    connection.open()
+                    if not connection.send_messages([email.to_message(connection)]):
+                        raise ValueError("El correo no tiene destinatarios válidos.")
+                    sent.append(email.id)
+                except Exception as e:
+                    logger.warning(f"Error enviando el correo {email.id}: {e}")
+                    # The connection may be broken, the next email opens a new one
+                    connection.close()
+                    email.last_error = str(e) or e.__class__.__name__
+                    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+                        email.status = "fallido"
+                        summary["failed"] += 1
+                    else:
+                        email.status = "pendiente"
+                        email.next_attempt = timezone.now() + retry_delay(email.attempts)
+                        summary["retried"] += 1
+                    failures.append(email)
+
+            OutboundEmail.objects.filter(id__in=sent).update(
+                status="enviado", sent_at=timezone.now(), last_error=""
+            )
+            OutboundEmail.objects.bulk_update(failures, ["status", "next_attempt", "last_error"])
+            summary["sent"] += len(sent)
+    finally:
+        connection.close()
+
+    summary["seconds"] = round(time.monotonic() - start, 3)
+    if any(summary[key] for key in ("sent", "retried", "failed")):
+        logger.info(
+            f"Correos: {summary['sent']} enviados, {summary['retried']} por reintentar y "
+            f"{summary['failed']} fallidos en {summary['seconds']}s."
+        )
+    return summary
@@ -0,0 +1,221 @@
+"""
+On-demand profiler of single requests for the admins.
+
+An admin adds ?perfilar to any page and ProfilerMiddleware runs that
+request under cProfile and tracemalloc, groups its SQL by fingerprint and
+saves the result in RequestProfile, shown at /perfiles. For everybody else
+the middleware only checks the query string.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from .models import RequestProfile
+from .slow_queries import fingerprint, normalize
+
+# Query string parameter that asks for the profile of the request
+PROFILE_PARAM = "perfilar"
+
+# Profiles kept, the oldest ones are deleted
+PROFILE_MAX_ROWS = 200
+
+# Rows saved of each part of the profile
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_QUERIES = 20
+PROFILE_TOP_ALLOCATIONS = 20
+
+# One profiled request at a time: tracemalloc is global to the process and
+# Python 3.12+ does not allow two cProfile profilers at once
+_lock = threading.Lock()
+
+
+def short_path(filename):
+    """
+    Path of the file relative to the project or to the installed packages
+    """
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        return os.path.relpath(filename, base_dir)
+    for packages in ("site-packages", "dist-packages", f"python{sys.version_info.major}.{sys.version_info.minor}"):
+        marker = f"{os.sep}{packages}{os.sep}"
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+class QueryBreakdown:
+    """
+    Execute wrapper that adds up the SQL of the request per fingerprint
+    """
+
+    def __init__(self):
+        self.queries = defaultdict(lambda: {"calls": 0, "duration": 0.0})
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            query = self.queries[normalize(sql)]
+            query["calls"] += 1
+            query["duration"] += time.perf_counter() - start
+
+    def rows(self):
+        rows = [
+            {
+                "statement": statement,
+                "fingerprint": fingerprint(statement),
+                "calls": query["calls"],
+                "duration": round(query["duration"] * 1000, 3),
+            }
+            for statement, query in self.queries.items()
+        ]
+        return sorted(rows, key=lambda row: row["duration"], reverse=True)
+
+
+def function_rows(profiler):
+    """
+    The functions with the most own time, the most cumulative time and the
+    functions of the project with the most cumulative time
+    """
+    base_dir = str(settings.BASE_DIR)
+    rows = [
+        {
+            "function": name,
+            "location": f"{short_path(filename)}:{line}" if line else short_path(filename),
+            "project": filename.startswith(base_dir),
+            "calls": calls,
+            "own": round(own * 1000, 3),
+            "cumulative": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in pstats.Stats(profiler).stats.items()
+    ]
+    hottest = sorted(rows, key=lambda row: row["own"], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    widest = sorted(rows, key=lambda row: row["cumulative"], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    project = sorted(
+        (row for row in rows if row["project"]), key=lambda row: row["cumulative"], reverse=True
+    )[:PROFILE_TOP_FUNCTIONS]
+    return list({row["function"] + row["location"]: row for row in hottest + widest + project}.values())
+
+
+def allocation_rows(snapshot):
+    """
+    The lines that allocated the most memory still alive at the end of the request
+    """
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    return [
+        {
+            "location": f"{short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+            "size": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+    ]
+
+
+def profile_request(request, get_response):
+    """
+    Runs the request under the profilers and saves its RequestProfile.
+    Returns the response and the profile.
+    """
+    breakdown = QueryBreakdown()
+    profiler = cProfile.Profile()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(breakdown))
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    queries = breakdown.rows()
+    match = getattr(request, "resolver_match", None)
+    profile = RequestProfile.objects.create(
+        user=request.user,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view=match.view_name if match and match.view_name else "",
+        status_code=response.status_code,
+        duration=round(duration * 1000, 3),
+        sql_queries=sum(query["calls"] for query in queries),
+        sql_duration=round(sum(query["duration"] for query in queries), 3),
+        peak_memory=peak_memory,
+        functions=function_rows(profiler),
+        queries=queries[:PROFILE_TOP_QUERIES],
+        allocations=allocation_rows(snapshot),
+    )
+    RequestProfile.objects.filter(id__lte=profile.id - PROFILE_MAX_ROWS).delete()
+    return response, profile
+
+
+def link_profile(response, url):
+    """
+    Adds the link to the profile to the response: in the X-Profile-Url
+    header and, for the HTML pages, at the end of the body
+    """
+    response["X-Profile-Url"] = url
+    if response.streaming or not response.get("Content-Type", "").startswith("text/html"):
+        return
+    link = (
+        f'<a href="{url}" style="position:fixed;bottom:1rem;right:1rem;z-index:9999;'
+        f'padding:.5rem 1rem;background:#1d4ed8;color:#fff;border-radius:.5rem">Ver perfil</a>'
+    ).encode()
+    content = response.content
+    position = content.rfind(b"</body>")
+    if position == -1:
+        return
+    response.content = content[:position] + link + content[position:]
+    if response.has_header("Content-Length"):
+        response["Content-Length"] = str(len(response.content))
+
+
+class ProfilerMiddleware:
+    """
+    Profiles the requests of the admins that carry ?perfilar.
+    Must go after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_PARAM not in request.GET or getattr(request.user, "role", None) != "admin":
+            return self.get_response(request)
+        # Another request is being profiled, this one runs without the profilers
+        if not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            response, profile = profile_request(request, self.get_response)
+        finally:
+            _lock.release()
+        link_profile(response, reverse("perfil-solicitud", args=[profile.id]))
+        return response
@@ -0,0 +1,234 @@
+"""
+Import of course rosters (CSV or XLSX) into the groups of the app
+"""
+
+import csv
+import io
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+
+from .models import TERM_CHOICES, ClassGroups, Order, StudentGroups, Users
+from .authz import invalidate_authorization
+
+ROSTER_COLUMNS = ("student_id", "email", "name", "group")
+
+# Rows imported per transaction
+ROSTER_BATCH_SIZE = 500
+
+# Errors kept in the report, the rest are only counted
+ROSTER_MAX_ERRORS = 100
+
+
+def read_roster(file, filename):
+    """
+    Yields the rows of a roster file as dicts without loading the whole file.
+    The first row holds the column names. XLSX files need openpyxl.
+    """
+    if filename.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValidationError("Se requiere openpyxl para importar archivos XLSX.")
+
+        rows = load_workbook(file, read_only=True, data_only=True).active.iter_rows(values_only=True)
+        header = [_cell(value).lower() for value in next(rows, ())]
+        _check_header(header)
+        for values in rows:
+            yield dict(zip(header, (_cell(value) for value in values)))
+    else:
+        reader = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        header = [value.strip().lower() for value in next(reader, [])]
+        _check_header(header)
+        for values in reader:
+            yield dict(zip(header, (value.strip() for value in values)))
+
+
+def _cell(value):
+    """
+    Text of a spreadsheet cell, whole numbers without decimals
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _check_header(header):
+    missing = [column for column in ROSTER_COLUMNS if column not in header]
+    if missing:
+        raise ValidationError(f"Faltan columnas en el archivo: {', '.join(missing)}.")
+
+
+class RosterImport:
+    """
+    Imports roster rows into Users and StudentGroups in batches of `batch_size`.
+
+    Each batch is one transaction: the users are upserted by email with one
+    bulk_create, the groups are resolved by class code, number, term and year
+    and the memberships are linked with another bulk_create. The rows may set
+    class_code, year and term, otherwise the import defaults are used.
+    """
+
+    def __init__(self, class_code=None, year=None, term=None, batch_size=ROSTER_BATCH_SIZE):
+        self.defaults = {"class_code": class_code, "year": year, "term": term}
+        self.batch_size = batch_size
+        # Group id of every (class code, number, term, year) seen, None if it doesn't exist
+        self.groups = {}
+        self.report = {
+            "rows": 0,
+            "users_created": 0,
+            "users_updated": 0,
+            "links_created": 0,
+            "errors": [],
+            "error_count": 0,
+        }
+
+    def run(self, rows):
+        """
+        Imports the rows and returns the report
+        """
+        start = time.monotonic()
+        # The header is line 1 of the file
+        lines = enumerate(rows, start=2)
+        while batch := list(islice(lines, self.batch_size)):
+            with transaction.atomic():
+                self._import_batch(batch)
+            self.report["rows"] += len(batch)
+
+        seconds = time.monotonic() - start
+        self.report["seconds"] = round(seconds, 3)
+        self.report["rows_per_second"] = round(self.report["rows"] / max(seconds, 0.001))
+        return self.report
+
+    def _error(self, line, message):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < ROSTER_MAX_ERRORS:
+            self.report["errors"].append((line, message))
+
+    def _clean(self, row):
+        """
+        Validates a row and returns its values
+        """
+        values = {key: row.get(key) or default for key, default in self.defaults.items()}
+        email = Users.objects.normalize_email(row.get("email", ""))
+        validate_email(email)
+        if not row.get("name"):
+            raise ValidationError("El nombre es obligatorio.")
+        if not values["class_code"]:
+            raise ValidationError("No se indicó el código del curso.")
+        if values["term"] not in dict(TERM_CHOICES):
+            raise ValidationError(f"Semestre inválido: {values['term']}.")
+        try:
+            number, year = int(row.get("group", "")), int(values["year"])
+        except (TypeError, ValueError):
+            raise ValidationError("El grupo y el año deben ser números.")
+
+        return {
+            "email": email,
+            "name": row["name"],
+            "student_id": row.get("student_id") or None,
+            "group": (values["class_code"], number, values["term"], year),
+        }
+
+    def _resolve_groups(self, keys):
+        """
+        Loads the ids of the groups not seen yet in one query
+        """
+        keys = set(keys) - self.groups.keys()
+        if not keys:
+            return
+
+        query = Q()
+        for code, number, term, year in keys:
+            query |= Q(class_id__code=code, number=number, term=term, year=year)
+        self.groups.update(dict.fromkeys(keys))
+        found = ClassGroups.objects.filter(query).order_by("-id").values_list(
+            "id", "class_id__code", "number", "term", "year"
+        )
+        for group_id, *key in found:
+            self.groups[tuple(key)] = group_id
+
+    def _import_batch(self, batch):
+        entries = []
+        for line, row in batch:
+            try:
+                entries.append((line, self._clean(row)))
+            except ValidationError as e:
+                self._error(line, e.messages[0])
+
+        self._resolve_groups(entry["group"] for _, entry in entries)
+        valid = []
+        for line, entry in entries:
+            if self.groups[entry["group"]] is None:
+                code, number, term, year = entry["group"]
+                self._error(line, f"No existe el grupo {number} de {code} ({term} Semestre {year}).")
+            else:
+                valid.append(entry)
+        if not valid:
+            return
+
+        # The last row of a student has its current data
+        students = {entry["email"]: entry for entry in valid}
+
+        # Upsert the users that are new or whose data changed
+        existing = {
+            email: (user_id, name, student_id)
+            for user_id, email, name, student_id in Users.objects.filter(
+                email__in=students
+            ).values_list("id", "email", "name", "student_id")
+        }
+        changed = [
+            entry for email, entry in students.items()
+            if email not in existing or existing[email][1:] != (entry["name"], entry["student_id"])
+        ]
+        # Imported users log in after resetting their password
+        password = make_password(None)
+        users = Users.objects.bulk_create(
+            [
+                Users(
+                    email=entry["email"],
+                    username=entry["email"].split("@")[0],
+                    name=entry["name"],
+                    student_id=entry["student_id"],
+                    role="student",
+                    password=password,
+                )
+                for entry in changed
+            ],
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=["name", "student_id"],
+        )
+        user_ids = {email: user_id for email, (user_id, _, _) in existing.items()}
+        user_ids.update((user.email, user.pk) for user in users)
+
+        updated = [user_ids[entry["email"]] for entry in changed if entry["email"] in existing]
+        self.report["users_created"] += len(changed) - len(updated)
+        self.report["users_updated"] += len(updated)
+        if updated:
+            # bulk_create doesn't send the signals that keep the search document
+            Order.objects.filter(userorder__user__in=updated).refresh_search()
+
+        # Link the users to their groups
+        links = {(user_ids[entry["email"]], self.groups[entry["group"]]) for entry in valid}
+        linked = set(
+            StudentGroups.objects.filter(
+                student_id__in={student for student, _ in links},
+                group_id__in={group for _, group in links},
+            ).values_list("student_id", "group_id")
+        )
+        new_links = links - linked
+        StudentGroups.objects.bulk_create(
+            [StudentGroups(student_id=student, group_id=group) for student, group in new_links],
+            ignore_conflicts=True,
+        )
+        # bulk_create doesn't send the signals that invalidate the memberships
+        invalidate_authorization({student for student, _ in new_links})
+        self.report["links_created"] += len(new_links)
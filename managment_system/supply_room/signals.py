@@ -0,0 +1,142 @@
+"""
+Signal receivers that keep the denormalized data and the caches of the app in sync
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CLASS_CODES_CACHE_KEY, Class, ClassGroups, Item, Order, StudentGroups, UserOrder, Users
+from .authz import invalidate_authorization
+from .caching import bump_generation
+
+# Fields of the users included in the search document of their orders
+SEARCH_USER_FIELDS = {"name", "email", "student_id"}
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Builds the search document of a new order or of one moved to another group
+    """
+    if update_fields is None or "group" in update_fields:
+        Order.objects.filter(pk=instance.pk).refresh_search()
+
+
+@receiver(post_save, sender=UserOrder)
+@receiver(post_delete, sender=UserOrder)
+def order_members_changed(sender, instance, **kwargs):
+    """
+    Updates the search document when a member joins or leaves an order
+    """
+    Order.objects.filter(pk=instance.order_id).refresh_search()
+
+
+@receiver(post_save, sender=Users)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Updates the search document of the orders of a user whose data changed
+    """
+    if created or (update_fields is not None and not SEARCH_USER_FIELDS & set(update_fields)):
+        return
+    Order.objects.filter(userorder__user=instance).refresh_search()
+
+
+@receiver(post_save, sender=Class)
+def class_saved(sender, instance, created, **kwargs):
+    """
+    Updates the search document of the orders of a renamed class
+    """
+    if not created:
+        Order.objects.filter(group__class_id=instance).refresh_search()
+
+
+@receiver(post_save, sender=ClassGroups)
+def group_saved(sender, instance, created, **kwargs):
+    """
+    Updates the search document of the orders of a group moved to another class
+    """
+    if not created:
+        Order.objects.filter(group=instance).refresh_search()
+
+
+@receiver(post_save, sender=StudentGroups)
+@receiver(post_delete, sender=StudentGroups)
+def group_members_changed(sender, instance, **kwargs):
+    """
+    Drops the cached groups of a student who joins or leaves a group
+    """
+    invalidate_authorization([instance.student_id])
+
+
+@receiver(post_save, sender=UserOrder)
+@receiver(post_delete, sender=UserOrder)
+def order_authorization_changed(sender, instance, **kwargs):
+    """
+    Drops the cached orders of a user who joins or leaves an order
+    """
+    invalidate_authorization([instance.user_id])
+
+
+@receiver(post_save, sender=Users)
+def user_role_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Drops the cached authorization of a user whose role may have changed
+    """
+    if not created and (update_fields is None or "role" in update_fields):
+        invalidate_authorization([instance.pk])
+
+
+@receiver(pre_save, sender=ClassGroups)
+def group_professor_changing(sender, instance, **kwargs):
+    """
+    Remembers the professor of a group before it is saved
+    """
+    instance._previous_professor_id = (
+        None if instance._state.adding
+        else ClassGroups.objects.filter(pk=instance.pk).values_list("professor_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=ClassGroups)
+@receiver(post_delete, sender=ClassGroups)
+def group_professor_changed(sender, instance, **kwargs):
+    """
+    Drops the cached groups of the professors of a group
+    """
+    invalidate_authorization({instance.professor_id, getattr(instance, "_previous_professor_id", None)} - {None})
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=ClassGroups)
+@receiver(post_delete, sender=ClassGroups)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def cached_model_changed(sender, **kwargs):
+    """
+    Invalidates the cached lists that show the changed model
+    """
+    bump_generation(sender._meta.model_name)
+
+
+@receiver(post_save, sender=Users)
+def cached_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalidates the cached lists that show the name of a user (the professors of the groups)
+    """
+    if not created and (update_fields is None or "name" in update_fields):
+        bump_generation("users")
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def class_codes_changed(sender, **kwargs):
+    """
+    Drops the cached code -> id mapping of the classes, now and when the transaction commits
+    """
+    cache.delete(CLASS_CODES_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(CLASS_CODES_CACHE_KEY))
@@ -0,0 +1,216 @@
+"""
+Slow query watchdog, opt-in with SLOW_QUERY_THRESHOLD_MS.
+
+SlowQueryMiddleware wraps the SQL of every request (connection.execute_wrapper)
+and captures the statements slower than the threshold: their fingerprint
+(the SQL with the literals replaced), the redacted parameters, the code and
+the template that ran them and, with SLOW_QUERY_EXPLAIN, the plan of
+EXPLAIN (ANALYZE, BUFFERS). They are saved in SlowQuery at the end of the
+request and can be browsed and grouped by fingerprint in the Django admin.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack
+from datetime import date, datetime, time as datetime_time
+from decimal import Decimal
+from uuid import UUID
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Node
+
+from . import metrics
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+# Rows kept in SlowQuery, the oldest ones are deleted
+SLOW_QUERY_MAX_ROWS = 5000
+
+# Statements captured per request, the rest are ignored
+SLOW_QUERY_MAX_PER_REQUEST = 200
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_VALUES = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+_DJANGO_DIR = os.path.dirname(sys.modules["django"].__file__)
+_RENDER_ANNOTATED = Node.render_annotated.__code__
+_EXECUTE_WITH_WRAPPERS = CursorWrapper._execute_with_wrappers.__code__
+# Instrumentation that wraps the project code, never the origin of a query
+_SKIPPED_FILES = {__file__, metrics.__file__}
+
+
+def normalize(sql):
+    """
+    SQL with the literals and placeholders replaced by ?, the lists of
+    values collapsed to (...) and the whitespace collapsed, so the same
+    query with other values gives the same text
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _VALUES.sub("(...)", sql)
+    sql = _VALUES_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(statement):
+    return hashlib.md5(statement.encode()).hexdigest()
+
+
+def redact(value):
+    """
+    Parameter safe to save: numbers, booleans, nulls and dates are kept,
+    the text (names, emails, passwords) only shows its length
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (Decimal, UUID, date, datetime, datetime_time)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (str, bytes, memoryview)):
+        return f"<{type(value).__name__} {len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def find_origin(frame):
+    """
+    The first frame of the project code (outside Django, the installed
+    packages and the instrumentation) and the innermost template node that ran the query
+    """
+    caller = template = ""
+    base_dir = str(settings.BASE_DIR)
+    # Skips the execute wrappers (this one and the others, like the metrics)
+    while frame is not None and frame.f_code is not _EXECUTE_WITH_WRAPPERS:
+        frame = frame.f_back
+    while frame is not None and not (caller and template):
+        code = frame.f_code
+        if not template and code is _RENDER_ANNOTATED:
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None:
+                template = f"{origin.template_name or origin.name}:{getattr(token, 'lineno', '?')}"
+        elif (
+            not caller
+            and code.co_filename.startswith(base_dir)
+            and code.co_filename not in _SKIPPED_FILES
+            and not code.co_filename.startswith(_DJANGO_DIR)
+            and "site-packages" not in code.co_filename
+        ):
+            path = os.path.relpath(code.co_filename, base_dir)
+            caller = f"{path}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return caller, template
+
+
+class SlowQueryWatchdog:
+    """
+    Captures the slow statements of the request in progress
+    """
+
+    def __init__(self, threshold_ms, alias):
+        self.threshold = threshold_ms / 1000
+        self.alias = alias
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold and len(self.captured) < SLOW_QUERY_MAX_PER_REQUEST:
+                self.capture(sql, params, many, duration)
+
+    def capture(self, sql, params, many, duration):
+        statement = normalize(sql)
+        caller, template = find_origin(sys._getframe())
+        self.captured.append({
+            "sql": sql,
+            # executemany() may consume its parameters, they are not kept
+            "params": None if many else params,
+            "many": many,
+            "entry": SlowQuery(
+                fingerprint=fingerprint(statement),
+                statement=statement,
+                params=[] if many or params is None else redact(params),
+                duration=round(duration * 1000, 3),
+                caller=caller[:500],
+                template=template[:300],
+            ),
+        })
+
+    def explain(self, sql, params):
+        """
+        Plan of a SELECT with EXPLAIN (ANALYZE, BUFFERS), which runs it again.
+        It runs inside a savepoint that is rolled back.
+        """
+        connection = connections[self.alias]
+        if connection.vendor != "postgresql" or not sql.lstrip().upper().startswith("SELECT"):
+            return ""
+        try:
+            with transaction.atomic(using=self.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                transaction.set_rollback(True, using=self.alias)
+            return plan
+        except DatabaseError as e:
+            return f"EXPLAIN falló: {e}"
+
+    def entries(self, view, explain=False):
+        explained = set()
+        for captured in self.captured:
+            entry = captured["entry"]
+            entry.view = view[:200]
+            # One plan per fingerprint and request is enough
+            if explain and not captured["many"] and entry.fingerprint not in explained:
+                explained.add(entry.fingerprint)
+                entry.explain = self.explain(captured["sql"], captured["params"])
+            yield entry
+
+
+class SlowQueryMiddleware:
+    """
+    Saves the statements of the request slower than SLOW_QUERY_THRESHOLD_MS.
+    Without the setting it is removed from the middleware chain.
+    """
+
+    def __init__(self, get_response):
+        self.threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+        if self.threshold is None:
+            raise MiddlewareNotUsed
+        self.explain = getattr(settings, "SLOW_QUERY_EXPLAIN", False)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        watchdogs = [SlowQueryWatchdog(self.threshold, alias) for alias in connections]
+        with ExitStack() as stack:
+            for watchdog in watchdogs:
+                stack.enter_context(connections[watchdog.alias].execute_wrapper(watchdog))
+            response = self.get_response(request)
+
+        if any(watchdog.captured for watchdog in watchdogs):
+            match = getattr(request, "resolver_match", None)
+            view = match.view_name if match and match.view_name else request.path
+            entries = [entry for watchdog in watchdogs for entry in watchdog.entries(view, self.explain)]
+            try:
+                SlowQuery.objects.record(entries, SLOW_QUERY_MAX_ROWS)
+            except DatabaseError:
+                logger.exception("No se pudieron guardar las consultas lentas")
+        return response
@@ -2,12 +2,13 @@ from django.contrib.auth import views as auth_views
 from django.urls import path
 from django.views.generic.base import TemplateView
 
-from .views import (AdminOrderDetails, AdminOrderList, ClassCreate, ClassDelete,
+from .views import (AdminOrderDetails, AdminOrderList, CacheStatsView, ClassCreate, ClassDelete,
                     ClassGroupsCreate, ClassGroupsDelete, ClassGroupsList,
                     ClassGroupStudentList, ClassGroupsUpdate, ClassList, GenerateLetter,
-                    ItemCreate, ItemDelete, ItemList, AvailableItemList, ItemOrderCreate, ItemSearchView,
+                    ItemCreate, ItemDelete, ItemDetailList, ItemList, AvailableItemList, ItemOrderCreate, ItemSearchView,
+                    MetricsView,
                     MyProfileView, OrderCreate, OrderDetails, OrderGroupList,
-                    OrderList, StudentList, CustomPasswordChangeView, RegisterView, UserDetailView,
+                    OrderList, ProfileDetail, ProfileList, ReminderCampaignView, RosterImportView, StudentList, CustomPasswordChangeView, RegisterView, UserDetailView,
                     UserListView)
 
 urlpatterns = [
@@ -17,6 +18,7 @@ urlpatterns = [
         ItemList.as_view(template_name="page/articulos.html"),
         name="articulos",
     ),
+    path("articulos/detalle", ItemDetailList.as_view(), name="articulos-detalle"),
     path(
         "articulos-disponibles",
         AvailableItemList.as_view(template_name="page/articulos-disponibles.html"),
@@ -71,6 +73,11 @@ urlpatterns = [
         StudentList.as_view(template_name="page/estudiantes.html"),
         name="estudiantes",
     ),
+    path(
+        "estudiantes/importar",
+        RosterImportView.as_view(),
+        name="importar-estudiantes",
+    ),
     # ------------- Profile -----------
     path(
         "cambiar-contrasena/",
@@ -143,6 +150,18 @@ urlpatterns = [
         GenerateLetter.as_view(template_name="page/generar-carta.html"),
         name="generar-carta",
     ),
+    path(
+        "generar-carta/recordatorios",
+        ReminderCampaignView.as_view(),
+        name="recordatorios",
+    ),
+    # ------------- Metrics ---------
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    # ------------- Profiles ---------
+    path("perfiles", ProfileList.as_view(), name="perfiles"),
+    path("perfiles/<int:pk>", ProfileDetail.as_view(), name="perfil-solicitud"),
+    # ------------- Cache ---------
+    path("cache/estadisticas", CacheStatsView.as_view(), name="estadisticas-cache"),
     path(
         "accounts/register/",
         RegisterView.as_view(template_name="registration/register.html"),
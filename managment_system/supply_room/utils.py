@@ -2,7 +2,297 @@
 This file contains utilitarian functions that can be used in the rest of the app
 """
 
+import base64
+import binascii
+import hashlib
+import json
+from math import ceil
+
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Seconds the count of a list is cached
+COUNT_CACHE_TIMEOUT = 60
+
+# Lists with at least this many rows estimated show the estimate instead of counting them
+ESTIMATED_COUNT_THRESHOLD = 1000
+
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of the last row of a page as an opaque cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor, returns None if it isn't valid
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """
+    Page of a KeysetPaginator, iterable like a Django Page.
+    `next_cursor` and `previous_cursor` are None on the last and first page.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def last_cursor(self):
+        return self.paginator.last_cursor
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination of a queryset sorted by `ordering`, a list of
+    fields that ends in a unique one, like ("-year", "-term", "id").
+
+    Instead of an OFFSET, a page filters the rows after (or before) the sort
+    key of the last (or first) row of the page it comes from, so with an
+    index on `ordering` every page costs the same at any depth. The cursors
+    are opaque strings made by encode_cursor. `count` is an optional total
+    known by the caller, the paginator never counts the rows.
+    """
+
+    def __init__(self, queryset, per_page, ordering, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.count = count
+        self.last_cursor = encode_cursor(["prev"])
+
+    def get_page(self, cursor=None):
+        """
+        Page that starts after (or ends before) the given cursor,
+        the first page if the cursor is missing or not valid
+        """
+        values = decode_cursor(cursor) if cursor else None
+        if not values or values[0] not in ("next", "prev") or len(values) not in (1, len(self.ordering) + 1):
+            values = ["next"]
+        forward, key = values[0] == "next", values[1:]
+
+        queryset = self.queryset
+        if key:
+            try:
+                queryset = queryset.filter(self.key_filter(self.parse_key(key), forward))
+            except (ValidationError, TypeError, ValueError):
+                # A tampered cursor, its values don't fit the fields
+                return self.get_page()
+        ordering = self.ordering if forward else [self.reverse(field) for field in self.ordering]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        if key and not rows:
+            # The rows around the cursor were deleted
+            return self.get_page()
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        has_next = more if forward else bool(key)
+        has_previous = bool(key) if forward else more
+        return KeysetPage(
+            rows,
+            self,
+            encode_cursor(["next", *self.key(rows[-1])]) if has_next and rows else None,
+            encode_cursor(["prev", *self.key(rows[0])]) if has_previous and rows else None,
+        )
+
+    def key(self, obj):
+        return [getattr(obj, field.lstrip("-")) for field in self.ordering]
+
+    def parse_key(self, key):
+        """
+        Sort key of a cursor converted by the ordering fields, raises
+        ValidationError if a value isn't valid for its field
+        """
+        opts = self.queryset.model._meta
+        return [opts.get_field(field.lstrip("-")).to_python(value) for field, value in zip(self.ordering, key)]
+
+    def key_filter(self, key, forward):
+        """
+        Rows after (forward) or before the given sort key. The redundant
+        bound on the first field lets the database seek the index to it.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, key):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") == forward else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        first = self.ordering[0]
+        bound = "lte" if first.startswith("-") == forward else "gte"
+        return Q(**{f"{first.lstrip('-')}__{bound}": key[0]}) & condition
+
+    @staticmethod
+    def reverse(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class EstimatedCountPage(Page):
+    """
+    Page of an EstimatedCountPaginator, when the count is estimated it knows
+    if there is a next page from the rows it loaded
+    """
+
+    more = False
+
+    def has_next(self):
+        if self.paginator.estimated:
+            return self.more
+        return super().has_next()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids the COUNT(*) of every request.
+
+    The count of a queryset is cached for COUNT_CACHE_TIMEOUT seconds. When
+    it isn't cached, the rows are estimated from pg_class.reltuples (queryset
+    without filters) or from the plan of the query (EXPLAIN); lists of at
+    least ESTIMATED_COUNT_THRESHOLD rows use the estimate (`estimated` is
+    True) and smaller ones are counted. With an estimated count, pages past
+    the estimate are still served and has_next() comes from the rows of the
+    page, the templates show the number of pages as approximate.
+    """
+
+    estimate_threshold = ESTIMATED_COUNT_THRESHOLD
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedCountPage(*args, **kwargs)
+
+    @cached_property
+    def count_cache_key(self):
+        queryset = self.object_list
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{queryset.db}:{sql}:{params}".encode()).hexdigest()
+        return f"list-count:{digest}"
+
+    @cached_property
+    def count_and_estimated(self):
+        """
+        Count of the list and whether it is estimated
+        """
+        if not hasattr(self.object_list, "query"):
+            return len(self.object_list), False
+
+        cached = cache.get(self.count_cache_key)
+        if cached is not None:
+            return cached
+
+        estimate = self.estimate()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            result = (estimate, True)
+        else:
+            result = (self.object_list.count(), False)
+        cache.set(self.count_cache_key, result, COUNT_CACHE_TIMEOUT)
+        return result
+
+    @property
+    def count(self):
+        return self.count_and_estimated[0]
+
+    @property
+    def estimated(self):
+        return self.count_and_estimated[1]
+
+    def estimate(self):
+        """
+        Rows estimated by PostgreSQL, None if there isn't an estimate
+        """
+        queryset = self.object_list
+        query = queryset.query
+        if connections[queryset.db].vendor != "postgresql":
+            return None
+
+        if not query.where and query.group_by is None and not query.distinct and not query.combinator:
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 if the table was never analyzed
+            if row and row[0] >= 0:
+                return int(row[0])
+
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def validate_number(self, number):
+        if not self.estimated:
+            return super().validate_number(number)
+        # The estimate may be short, the pages after it are not checked
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("Esa página no es un número entero")
+        if number < 1:
+            raise EmptyPage("Esa página es menor que 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage("Esa página no contiene resultados")
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.more = len(rows) > self.per_page
+        return page
+
+    def get_page(self, number):
+        """
+        Like Paginator.get_page: the first page if the number isn't an
+        integer and the last one if it is out of range. With an estimated
+        count the last page may be past the rows, then the rows are counted
+        to find it (only for these out of range numbers)
+        """
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            pass
+        try:
+            return self.page(self.num_pages)
+        except EmptyPage:
+            return self.page(max(1, ceil(self.object_list.count() / self.per_page)))
 
 
 class StudentRoleCheck(UserPassesTestMixin):
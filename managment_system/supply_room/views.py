@@ -1,94 +1,128 @@
+import hashlib
 import json
-from django.db.models import ProtectedError
+from django.db.models import ProtectedError, RestrictedError
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.forms import ValidationError, modelformset_factory
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views import View
-from django.views.generic import CreateView, DeleteView, UpdateView
+from django.views.generic import CreateView, DeleteView, DetailView, UpdateView
 # Create your views here.
 from django.views.generic.list import ListView
 
-from .forms import (GroupForm, ItemForm, OrderForm, StudentGroupForm,
-                    UpdateOrderItemForm, ItemCreateForm, CustomPasswordChangeForm,
+from .forms import (BaseUpdateOrderItemFormSet, GroupForm, ItemForm, OrderForm, RosterImportForm,
+                    StudentGroupForm, UpdateOrderItemForm, ItemCreateForm, CustomPasswordChangeForm,
                     UsersRegistrationForm)
-from .models import Class, ClassGroups, Item, ItemOrder, Order, StudentGroups, UserOrder, Users
-from .utils import (AdminOrTeacherRoleCheck, AdminRoleCheck,
-                    TeacherOrStudentRoleCheck, TeacherRoleCheck)
-from collections import defaultdict
+from .models import (ORDER_LIST_ORDERING, ORDER_STATUS_FILTERS, Class, ClassGroups, Item, ItemOrder, ItemStock,
+                     Order, OutboundEmail, RequestProfile, StudentGroups, Users, normalize_search)
+from .reminders import ReminderCampaign, pending_students
+from .roster import RosterImport, read_roster
+from .authz import get_authorization
+from .caching import CachedListMixin, fragment_cache_stats
+from .metrics import render_metrics
+from .profiling import PROFILE_TOP_FUNCTIONS
+from .utils import (AdminOrTeacherRoleCheck, AdminRoleCheck, EstimatedCountPaginator,
+                    KeysetPaginator, TeacherOrStudentRoleCheck, TeacherRoleCheck,
+                    decode_cursor, encode_cursor)
 from django.contrib.auth.views import PasswordChangeView
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q, Exists, OuterRef
+from django.core.cache import cache
+from django.db.models import Count, F, Q
 from django.http import JsonResponse
 from django.db import transaction
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.views.generic import TemplateView
 
 
-class ItemList(ListView):
+class ItemList(CachedListMixin, ListView):
+    """
+    ListView for Item model grouped by name
+
+    Requests Methods:
+    Get: Renders the catalogue with one row per item name, counting all the
+    units and the available ones. Grouping and pagination run in the database,
+    the rendered list is cached until the items change.
+    """
     model = Item
     paginate_by = 10
+    paginator_class = EstimatedCountPaginator
+    fragment_name = "articulos"
+    fragment_template_name = "page/fragmentos/articulos.html"
+    cache_models = ("item",)
 
     def get_queryset(self, *args, **kwargs):
-        queryset = super().get_queryset(*args, **kwargs).order_by("name")
+        queryset = super().get_queryset(*args, **kwargs)
 
         query = self.request.GET.get('q')
         if query:
             queryset = queryset.filter(name__icontains=query)
 
-        item_counts = defaultdict(lambda: {"name": "", "count": 0, "detalles": []})
+        return queryset.values("name").annotate(
+            count=Count("id"),
+            available=Count("id", filter=Q(is_available=True)),
+        ).order_by("name")
 
-        for item in queryset:
-            item_counts[item.name]["name"] = item.name
-            item_counts[item.name]["count"] += 1
-            item_counts[item.name]["detalles"].append({
-                "id": item.id,
-                "code": item.code,
-                "is_available": item.is_available
-            })
 
-        items = list(item_counts.values())
+class ItemDetailList(View):
+    """
+    Returns the physical units of one item name as a JSON
 
-        for item in items:
-            item["detalles"] = json.dumps(item["detalles"])
+    Requests Methods:
+    Get: Paginated list of units for the modal in the articulos page
 
-        return items
+    Params (GET)
+    :name: name of the item
+    :page: page of units to return
+    """
+    paginate_by = 5
 
+    def get(self, request, *args, **kwargs):
+        units = Item.objects.filter(
+            name=request.GET.get('name', '')
+        ).order_by('code', 'id').values('id', 'code', 'is_available')
 
-class AvailableItemList(ListView):
+        paginator = Paginator(units, self.paginate_by)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+        return JsonResponse({
+            'results': list(page_obj.object_list),
+            'page': page_obj.number,
+            'num_pages': paginator.num_pages,
+        })
+
+
+class AvailableItemList(CachedListMixin, ListView):
     """
     ListView for Item model
 
     Requests Methods:
-    Get: Renders list of all items, counting only available ones
+    Get: Renders list of all items, counting only available ones.
+    The rendered list is cached until the stock changes.
     """
     model = Item
     paginate_by = 10
+    paginator_class = EstimatedCountPaginator
+    fragment_name = "articulos-disponibles"
+    fragment_template_name = "page/fragmentos/articulos-disponibles.html"
+    cache_models = ("item",)
 
     def get_queryset(self, *args, **kwargs):
         """
         Overrides internal queryset to return unique available items
-        with their count.
+        with their count, read from the stock counters.
         """
-        queryset = super().get_queryset(*args, **kwargs).filter(is_available=True).order_by("name")
+        queryset = ItemStock.objects.filter(available__gt=0).order_by("name")
 
         query = self.request.GET.get('q')
         if query:
             queryset = queryset.filter(name__icontains=query)
 
-        item_counts = defaultdict(lambda: {"name": "", "count": 0})
-
-        for item in queryset:
-            item_counts[item.name]["name"] = item.name
-            item_counts[item.name]["count"] += 1
-
-        return list(item_counts.values())
+        return queryset.annotate(count=F("available")).values("name", "count")
 
 
 class ItemCreate(AdminRoleCheck, CreateView):
@@ -102,17 +136,18 @@ class ItemCreate(AdminRoleCheck, CreateView):
         start_code = form.cleaned_data.get('start_code')
         name = form.cleaned_data.get('name')
 
-        self.object = form.save()
+        if has_code:
+            form.instance.code = start_code
 
-        for i in range(1, quantity):
-            item_data = {'name': name}
-            if has_code:
-                item_data['code'] = start_code + i
-            Item.objects.create(**item_data)
+        with transaction.atomic():
+            self.object = form.save()
 
-        if has_code:
-            self.object.code = start_code
-            self.object.save()
+            units = [
+                Item(name=name, code=start_code + i if has_code else "")
+                for i in range(1, quantity)
+            ]
+            Item.objects.bulk_create(units, batch_size=1000)
+            ItemStock.objects.adjust(name, total=len(units), available=len(units))
 
         return redirect(self.success_url)
 
@@ -149,18 +184,29 @@ class ItemDelete(AdminRoleCheck, DeleteView):
 
         return super().delete(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+
+        except (ProtectedError, RestrictedError):
+            messages.error(self.request, "Este artículo no se puede eliminar porque tiene préstamos registrados.")
+            return redirect(self.success_url)
+
 
-class ClassList(AdminOrTeacherRoleCheck, ListView):
+class ClassList(AdminOrTeacherRoleCheck, CachedListMixin, ListView):
     """
     ListView for Class model
 
     Requests Methods:
-    Get: Renders a List of all classes
+    Get: Renders a List of all classes, cached until the classes change
     """
 
     # specify the model for list view
     model = Class
     paginate_by = 10
+    fragment_name = "cursos"
+    fragment_template_name = "page/fragmentos/cursos.html"
+    cache_models = ("class",)
 
     def get_queryset(self, *args, **kwargs):
         """
@@ -187,19 +233,15 @@ class ClassCreate(TeacherRoleCheck, CreateView):
     # specify the fields to be displayed
     fields = ["name", "code"]
 
-    def form_valid(self, form):
+    def form_invalid(self, form):
         """
-        Validates that the class name and code are unique before saving.
+        Redirects to the form with a message if the class code already exists.
         """
-        name = form.cleaned_data.get("name")
-        code = form.cleaned_data.get("code")
-
-        # Check if a class with the same name and code already exists
-        if Class.objects.filter(name=name, code=code).exists():
+        if form.has_error("code", "unique"):
             messages.error(self.request, 'Este curso ya existe.')
             return redirect("crear-curso")  # Redirect to the class creation form
 
-        return super().form_valid(form)
+        return super().form_invalid(form)
 
 
 class ClassDelete(TeacherRoleCheck, DeleteView):
@@ -233,12 +275,33 @@ class ClassDelete(TeacherRoleCheck, DeleteView):
             return redirect(self.success_url)
 
 
-class ClassGroupsList(AdminOrTeacherRoleCheck, ListView):
+class ClassByCodeMixin:
+    """
+    Resolves the Class of the `code` URL kwarg once per request.
+    The id comes from the cached code -> id mapping, so views that only
+    filter by the class don't query it, unknown codes raise a 404
+    """
+
+    def get_class_id(self):
+        if not hasattr(self, "_class_id"):
+            self._class_id = Class.objects.id_for_code(self.kwargs.get("code"))
+            if self._class_id is None:
+                raise Http404("No existe un curso con este código.")
+        return self._class_id
+
+    def get_class(self):
+        if not hasattr(self, "_class"):
+            self._class = get_object_or_404(Class, pk=self.get_class_id())
+        return self._class
+
+
+class ClassGroupsList(AdminOrTeacherRoleCheck, ClassByCodeMixin, CachedListMixin, ListView):
     """
     ListView for ClassGroups
 
     Requests Methods:
-    Get: Renders list of all ClassGroups in a specific Class
+    Get: Renders list of all ClassGroups in a specific Class, cached until
+    the classes, the groups or the professors change
 
     Params (kwargs)
     :code: code of the specific class
@@ -247,15 +310,17 @@ class ClassGroupsList(AdminOrTeacherRoleCheck, ListView):
     # specify the model for list view
     model = ClassGroups
     paginate_by = 10
+    fragment_name = "grupos"
+    fragment_template_name = "page/fragmentos/grupos.html"
+    cache_models = ("class", "classgroups", "users")
 
     def get_queryset(self, *args, **kwargs):
         """
         Overrides internal queryset to only return the ClassGroups associated
         with the specific Class and add ordering by semester (term and year)
         """
-        class_id = Class.objects.filter(code=self.kwargs.get("code"))
         qs = super(ClassGroupsList, self).get_queryset(*args, **kwargs)
-        qs = qs.filter(class_id=class_id[0])
+        qs = qs.filter(class_id=self.get_class_id()).select_related("professor")
         qs = qs.order_by("-year", "-term")
         return qs
 
@@ -266,13 +331,22 @@ class ClassGroupsList(AdminOrTeacherRoleCheck, ListView):
         Extra Context Data
         :class: specific Class
         """
-        class_id = Class.objects.filter(code=self.kwargs.get("code"))
         context = super().get_context_data(**kwargs)
-        context["class"] = class_id[0]
+        context["class"] = self.get_class()
         return context
 
+    def get_page_context_data(self, **kwargs):
+        """
+        Expands data send to the page around the cached list
+
+        Extra Context Data
+        :class: specific Class
+        """
+        kwargs["class"] = self.get_class()
+        return super().get_page_context_data(**kwargs)
+
 
-class ClassGroupsCreate(TeacherRoleCheck, CreateView):
+class ClassGroupsCreate(TeacherRoleCheck, ClassByCodeMixin, CreateView):
     """
     CreateView for ClassGroup model
 
@@ -293,7 +367,7 @@ class ClassGroupsCreate(TeacherRoleCheck, CreateView):
         """
         Sets the specific class of the ClassGroup before saving and checks for duplicate group numbers
         """
-        class_id = Class.objects.filter(code=self.kwargs.get("code")).first()
+        class_id = self.get_class_id()
         group_number = form.cleaned_data.get('number')
         group_year = form.cleaned_data.get('year')
         group_term = form.cleaned_data.get('term')
@@ -302,7 +376,7 @@ class ClassGroupsCreate(TeacherRoleCheck, CreateView):
             messages.error(self.request, 'Ya existe un grupo con estas características.')
             return redirect('crear-grupo', code=self.kwargs.get("code"))
 
-        form.instance.class_id = class_id
+        form.instance.class_id_id = class_id
 
         return super(ClassGroupsCreate, self).form_valid(form)
 
@@ -437,6 +511,7 @@ class StudentList(AdminOrTeacherRoleCheck, ListView):
     # specify the model for list view
     model = Users
     paginate_by = 10
+    paginator_class = EstimatedCountPaginator
 
     def get_queryset(self, *args, **kwargs):
         """
@@ -449,6 +524,39 @@ class StudentList(AdminOrTeacherRoleCheck, ListView):
         return qs
 
 
+class RosterImportView(AdminRoleCheck, View):
+    """
+    View to import the students of the groups from a roster file
+
+    Requests Methods:
+    Get: Renders the upload form
+    Post: Imports the file and renders the report with the errors per row
+    """
+    template_name = "page/importar-estudiantes.html"
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, {"form": RosterImportForm()})
+
+    def post(self, request, *args, **kwargs):
+        form = RosterImportForm(request.POST, request.FILES)
+        report = None
+
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            class_id = form.cleaned_data["class_id"]
+            roster = RosterImport(
+                class_code=class_id.code if class_id else None,
+                year=form.cleaned_data["year"],
+                term=form.cleaned_data["term"],
+            )
+            try:
+                report = roster.run(read_roster(upload.file, upload.name))
+            except ValidationError as e:
+                form.add_error("file", e)
+
+        return render(request, self.template_name, {"form": form, "report": report})
+
+
 class CustomPasswordChangeView(PasswordChangeView):
     form_class = CustomPasswordChangeForm
     success_url = reverse_lazy("password_change_done")
@@ -524,10 +632,10 @@ class OrderCreate(TeacherOrStudentRoleCheck, CreateView):
     form_class = OrderForm
 
     def dispatch(self, request, *args, **kwargs):
-        group = get_object_or_404(ClassGroups, pk=self.kwargs["pk"])
-
-        if not (request.user == group.professor or
-                StudentGroups.objects.filter(group=group, student=request.user).exists()):
+        # The professor and the students of the group, from the cached memberships
+        group_pk = str(self.kwargs["pk"])
+        if not group_pk.isdigit() or int(group_pk) not in get_authorization(request)["groups"]:
+            get_object_or_404(ClassGroups, pk=group_pk)
             raise PermissionDenied()
 
         return super().dispatch(request, *args, **kwargs)
@@ -585,21 +693,19 @@ class OrderList(TeacherOrStudentRoleCheck, View):
     OrderList for Order model
 
     Requests Methods:
-    Get: List of all requests from a user (student) or a group (teacher).
+    Get: List of all requests from a user (student) or a group (teacher),
+    paginated with the cursor of the `cursor` parameter.
     """
 
     def get(self, request, *args, **kwargs):
         # Students
         if request.user.role == "student":
-            user_orders = UserOrder.objects.filter(
-                user=request.user
+            querySet = Order.objects.filter(
+                userorder__user=request.user
             ).select_related(
-                'order__group',
-                'order__group__class_id'
-            ).order_by("-order__group__year", "-order__group__term")
-
-            orders_list = [uo.order for uo in user_orders]
-            querySet = orders_list
+                'group',
+                'group__class_id'
+            )
 
         # Teachers
         elif request.user.role == "teacher":
@@ -608,13 +714,10 @@ class OrderList(TeacherOrStudentRoleCheck, View):
             ).select_related(
                 'group',
                 'group__class_id'
-            ).prefetch_related(
-                'userorder_set__user'
-            ).order_by("-group__year", "-group__term")
+            ).with_members()
 
-        paginator = Paginator(querySet, 10)
-        page = request.GET.get("page")
-        page_obj = paginator.get_page(page)
+        paginator = KeysetPaginator(querySet, 10, ORDER_LIST_ORDERING)
+        page_obj = paginator.get_page(request.GET.get("cursor"))
 
         return render(
             request,
@@ -626,7 +729,9 @@ class OrderList(TeacherOrStudentRoleCheck, View):
 class AdminOrderList(AdminRoleCheck, ListView):
     """
     View for listing orders with filtering by status,
-    search and filtering by user
+    search and filtering by user.
+    Paginated with the cursor of the `cursor` parameter, the semester is
+    copied to the order so the pages follow the semester indexes.
     """
 
     model = Order
@@ -635,62 +740,47 @@ class AdminOrderList(AdminRoleCheck, ListView):
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        # Base ordering
-        queryset = queryset.order_by("-group__year", "-group__term")
-
         # Filter by status
         status = self.request.GET.get('status')
-        if status in ['pendiente', 'prestado', 'completado']:
-            queryset = queryset.annotate(
-                has_pendiente=Exists(
-                    ItemOrder.objects.filter(
-                        order=OuterRef('pk'),
-                        status="Solicitado"
-                    )
-                ),
-                has_prestado=Exists(
-                    ItemOrder.objects.filter(
-                        order=OuterRef('pk'),
-                        status="Prestado"
-                    )
-                )
-            )
-
-            if status == 'pendiente':
-                queryset = queryset.filter(has_pendiente=True)
-            elif status == 'prestado':
-                queryset = queryset.filter(has_prestado=True)
-            elif status == 'completado':
-                queryset = queryset.filter(has_pendiente=False, has_prestado=False)
+        if status in ORDER_STATUS_FILTERS:
+            queryset = queryset.with_status(status)
 
         # Text search
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(group__class_id__name__icontains=search) |
-                Q(group__class_id__code__icontains=search) |
-                Q(userorder__user__name__icontains=search) |
-                Q(userorder__user__email__icontains=search) |
-                Q(userorder__user__student_id__icontains=search)
-            ).distinct()
+            queryset = queryset.search(search)
 
         # Query optimization
         queryset = queryset.select_related(
             'group',
             'group__class_id',
             'group__professor'
-        ).prefetch_related(
-            'userorder_set__user'
-        )
+        ).with_members()
 
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Keyset pagination instead of page numbers. The total of the list is
+        taken from the cached totals per status, unknown when searching
+        """
+        self.status_totals = Order.objects.cached_status_totals()
+        status = self.request.GET.get('status')
+        count = None
+        if not self.request.GET.get('search'):
+            count = self.status_totals[status if status in ORDER_STATUS_FILTERS else 'todas']
+
+        paginator = KeysetPaginator(queryset, page_size, ORDER_LIST_ORDERING, count=count)
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_next() or page.has_previous()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
             'current_search': self.request.GET.get('search', ''),
             'current_status': self.request.GET.get('status', ''),
             'current_user': self.request.GET.get('user', ''),
+            'status_totals': self.status_totals,
         })
         return context
 
@@ -714,10 +804,15 @@ class OrderDetails(TeacherOrStudentRoleCheck, View):
         :order: specific Order
         :items: items from the order
         """
-        order = get_object_or_404(Order, pk=kwargs["pk"])
+        order = get_object_or_404(
+            Order.objects.with_members().select_related(
+                'group__class_id', 'group__professor'
+            ),
+            pk=kwargs["pk"]
+        )
 
         if request.user.role == 'student':
-            if not UserOrder.objects.filter(order=order, user=request.user).exists():
+            if order.pk not in get_authorization(request)["orders"]:
                 raise PermissionDenied("No tienes permiso para ver esta orden")
 
         items = ItemOrder.objects.filter(order=order)
@@ -734,7 +829,7 @@ class AdminOrderDetails(AdminRoleCheck, View):
 
     Requests Methods:
     Get: Render the details of the current Order and a formset with all the items
-    Post: Validates the form and updates each item in the Order
+    Post: Validates the form and applies the changes of all the items of the Order together
 
     Params (kwargs)
     :pk: primary key of the specific Order
@@ -749,15 +844,14 @@ class AdminOrderDetails(AdminRoleCheck, View):
         :forms: formset containing all the individual item forms
         :data: custom object that have each item form with the item name value
         """
-        order = get_object_or_404(Order, pk=kwargs["pk"])
-        items = ItemOrder.objects.filter(order=order)
-        OrderItemFormSet = modelformset_factory(
-            ItemOrder, form=UpdateOrderItemForm, extra=0
+        order = get_object_or_404(
+            Order.objects.with_members().select_related(
+                'group__class_id', 'group__professor'
+            ),
+            pk=kwargs["pk"]
         )
-        forms = OrderItemFormSet(queryset=ItemOrder.objects.filter(order=order))
-        data = [
-            {"name": items[i].item.name, "form": forms[i]} for i in range(len(items))
-        ]
+        forms = self.get_formset(order)
+        data = [{"name": form.instance.item.name, "form": form} for form in forms]
         return render(
             request,
             "page/administrar-orden.html",
@@ -766,17 +860,12 @@ class AdminOrderDetails(AdminRoleCheck, View):
 
     def post(self, request, *args, **kwargs):
         order = get_object_or_404(Order, pk=kwargs["pk"])
-        OrderItemFormSet = modelformset_factory(
-            ItemOrder,
-            form=UpdateOrderItemForm,
-            extra=0
-        )
-        formset = OrderItemFormSet(request.POST, queryset=ItemOrder.objects.filter(order=order))
+        formset = self.get_formset(order, request.POST)
 
         if formset.is_valid():
             try:
-                with transaction.atomic():
-                    formset.save()
+                # All the transitions of the order are applied together
+                ItemOrder.objects.apply_changes(formset.save(commit=False))
             except ValidationError as e:
                 messages.error(request, str(e))
         else:
@@ -784,6 +873,18 @@ class AdminOrderDetails(AdminRoleCheck, View):
 
         return redirect("administrar-ordenes")
 
+    def get_formset(self, order, data=None):
+        """
+        Formset of the items of the order, loaded with their item and group in one query
+        """
+        OrderItemFormSet = modelformset_factory(
+            ItemOrder, form=UpdateOrderItemForm, formset=BaseUpdateOrderItemFormSet, extra=0
+        )
+        queryset = ItemOrder.objects.filter(order=order).select_related(
+            'item', 'order__group__class_id'
+        ).order_by('id')
+        return OrderItemFormSet(data, queryset=queryset)
+
 
 class ItemOrderCreate(TeacherOrStudentRoleCheck, CreateView):
     """
@@ -865,33 +966,60 @@ class MyProfileView(View):
 class ItemSearchView(View):
     '''
     Search filter items by letters and return a jason
+
+    Pages are requested with the `cursor` returned by the previous page.
+    Responses are cached for a few seconds by normalized query and cursor,
+    consecutive keystrokes and scrolls of the same prefix don't hit the database.
     '''
+    cache_timeout = 15
+
     def get(self, request, *args, **kwargs):
-        query = request.GET.get('q', '')
+        query = normalize_search(request.GET.get('q', ''))
+        cursor = request.GET.get('cursor', '')
+        after = decode_cursor(cursor) if cursor else None
+
+        key = f'{query}:{cursor if after else ""}'
+        cache_key = f'item-search:{hashlib.md5(key.encode()).hexdigest()}'
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.search(query, after)
+            cache.set(cache_key, data, self.cache_timeout)
+
+        return JsonResponse(data)
 
-        items = (
+    def search(self, query, after):
+        rows, more = ItemStock.objects.search(query, after=after)
+        names = [name for name, _ in rows]
+
+        # One available unit per name, in the order of the ranking
+        units = dict(
             Item.objects
-            .filter(name__icontains=query, is_available=True)
-            .order_by('name')
+            .filter(name__in=names, is_available=True)
+            .order_by('name', 'id')
             .distinct('name')
-        )[:20]
+            .values_list('name', 'id')
+        )
 
         results = [{
-            'id': item.id,
-            'text': item.name
-        } for item in items]
+            'id': units[name],
+            'text': name
+        } for name in names if name in units]
 
-        return JsonResponse({
+        return {
             'results': results,
-            'pagination': {'more': False}
-        })
+            'pagination': {
+                'more': more,
+                'cursor': encode_cursor([rows[-1][1], rows[-1][0]]) if more else None,
+            }
+        }
 
 
 class GenerateLetter(TemplateView):
     """
     View to generate a letter with information of items borrowed by a student.
     GET: Displays the student's data and outstanding items if the code is valid.
-    POST: Sends an email to the student (and an additional recipient) with their loan status.
+    POST: Queues an email to the student (and an additional recipient) with their loan status,
+    the send_emails worker delivers it.
     """
 
     def get(self, request, *args, **kwargs):
@@ -943,7 +1071,7 @@ class GenerateLetter(TemplateView):
 
     def post(self, request, *args, **kwargs):
         """
-        Handles POST requests to send an email to the student.
+        Handles POST requests to queue an email to the student.
         Determines which template to use in the mail depending on whether or not you have outstanding items.
         """
         try:
@@ -979,8 +1107,8 @@ class GenerateLetter(TemplateView):
             if extra_email:
                 recipient_list.append(extra_email)
 
-            # Send mail
-            send_mail(subject, '', from_email, recipient_list, html_message=message)
+            # Queue the mail, the request doesn't wait for the mail server
+            OutboundEmail.objects.enqueue(subject, from_email, recipient_list, html_message=message)
 
             return JsonResponse({'status': 'success'})
 
@@ -990,6 +1118,82 @@ class GenerateLetter(TemplateView):
             return JsonResponse({'error': str(e)}, status=500)
 
 
+class ReminderCampaignView(AdminRoleCheck, View):
+    """
+    View to send the pending items letter to every student with items on loan
+
+    Requests Methods:
+    Get: Renders the number of students and items on loan
+    Post: Queues the letters and renders the report with the counts and timing
+    """
+    template_name = "page/recordatorios.html"
+
+    def get_context_data(self, **kwargs):
+        pending = list(pending_students())
+        return {
+            "students": len(pending),
+            "items": sum(items for _, items in pending),
+            **kwargs,
+        }
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, self.get_context_data())
+
+    def post(self, request, *args, **kwargs):
+        report = ReminderCampaign(from_email=request.user.email).run()
+        return render(request, self.template_name, self.get_context_data(report=report))
+
+
+class CacheStatsView(AdminRoleCheck, View):
+    """
+    Returns the hits and misses of the cached lists as a JSON
+    """
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"fragments": fragment_cache_stats()})
+
+
+class MetricsView(AdminRoleCheck, View):
+    """
+    Returns the request metrics of this process in the Prometheus text format
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileList(AdminRoleCheck, ListView):
+    """
+    Lists the saved request profiles, the newest first
+    """
+    model = RequestProfile
+    template_name = "page/perfiles.html"
+    context_object_name = "profiles"
+    paginate_by = 20
+
+    def get_queryset(self):
+        return RequestProfile.objects.select_related("user").defer("functions", "queries", "allocations")
+
+
+class ProfileDetail(AdminRoleCheck, DetailView):
+    """
+    Shows a request profile: hot functions, SQL per query and memory
+    """
+    model = RequestProfile
+    template_name = "page/perfil-solicitud.html"
+    context_object_name = "profile"
+
+    def get_context_data(self, **kwargs):
+        functions = self.object.functions
+        by_cumulative = sorted(functions, key=lambda row: row["cumulative"], reverse=True)
+        return super().get_context_data(
+            hottest=sorted(functions, key=lambda row: row["own"], reverse=True)[:PROFILE_TOP_FUNCTIONS],
+            widest=by_cumulative[:PROFILE_TOP_FUNCTIONS],
+            project=[row for row in by_cumulative if row["project"]][:PROFILE_TOP_FUNCTIONS],
+            **kwargs,
+        )
+
+
 class RegisterView(CreateView):
     template_name = "registration/register.html"
     form_class = UsersRegistrationForm
@@ -1001,6 +1205,7 @@ class UserListView(ListView):
     template_name = "page/usuarios.html"
     context_object_name = "users"
     paginate_by = 10
+    paginator_class = EstimatedCountPaginator
 
 
 class UserDetailView(View):
@@ -0,0 +1,29 @@
+from importlib import import_module
+
+free_code = import_module("supply_room.migrations.0021_class_code_unique").free_code
+
+
+def test_codigo_libre_con_sufijo():
+    """
+    Test that a repeated code gets the id of its class as suffix.
+    """
+    assert free_code("IE-0117", 7, {"IE-0117"}) == "IE-0117-7"
+
+
+def test_codigo_libre_si_el_sufijo_existe():
+    """
+    Test that the suffix gets a counter while the code is already taken.
+    """
+    taken = {"IE-0117", "IE-0117-7", "IE-0117-7-2"}
+
+    assert free_code("IE-0117", 7, taken) == "IE-0117-7-3"
+
+
+def test_codigo_libre_cabe_en_el_campo():
+    """
+    Test that the code is cut so it fits in the field.
+    """
+    code = free_code("x" * 200, 12, {"x" * 200})
+
+    assert len(code) == 200
+    assert code.endswith("-12")
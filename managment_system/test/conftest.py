@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    """
+    Tests use an in-memory cache instead of Redis, emptied for every test
+    """
+    settings.CACHES = {
+        name: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"test-{name}",
+        }
+        for name in settings.CACHES
+    }
+    for name in settings.CACHES:
+        caches[name].clear()
@@ -0,0 +1,98 @@
+import gzip
+import json
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                UserOrder, ItemOrder, Item)
+
+
+@pytest.fixture
+def setup_test_data():
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher",
+        name="Profesora Núñez"
+    )
+
+    student1 = Users.objects.create_user(
+        username="student1",
+        email="student1@example.com",
+        password="student1pass",
+        role="student",
+        name="Sebas"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    order1 = Order.objects.create(group=group1)
+    UserOrder.objects.create(order=order1, user=student1)
+
+    item1 = Item.objects.create(name='Resistor', is_available=False)
+    item2 = Item.objects.create(name='Capacitor', is_available=False)
+    old = ItemOrder.objects.create(order=order1, item=item1, quantity=1, status="Devuelto",
+                                   request_date=timezone.now() - timedelta(days=30))
+    new = ItemOrder.objects.create(order=order1, item=item2, quantity=1,
+                                   request_date=timezone.now())
+
+    return {
+        "teacher": teacher,
+        "item_orders": [old, new],
+    }
+
+
+@pytest.mark.django_db
+def test_export_json(setup_test_data, tmp_path, capsys):
+    """
+    Test that the default format keeps the structure read by the seed command
+    """
+    path = tmp_path / "seeds.json"
+    call_command("export_data", "--output", str(path), "--chunk-size", "1")
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert list(data) == ['item', 'users', 'class', 'classgroups', 'order',
+                          'itemorder', 'itemorderunit', 'userorder', 'studentgroups']
+    assert len(data['itemorder']) == 2
+    assert data['users'][0]['name'] == "Profesora Núñez"
+    assert data['order'][0]['status'] == "pendiente"
+    assert "itemorder: 2 rows" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_export_ndjson_gzip_since(setup_test_data, tmp_path):
+    """
+    Test the incremental export of some models to compressed NDJSON
+    """
+    path = tmp_path / "seeds.ndjson"
+    since = (timezone.now() - timedelta(days=1)).date().isoformat()
+    call_command("export_data", "--format", "ndjson", "--gzip", "--output", str(path),
+                 "--models", "itemorder", "class", "--since", since)
+
+    with gzip.open(f"{path}.gz", "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+
+    assert [line['model'] for line in lines] == ['class', 'itemorder']
+    assert lines[1]['fields']['id'] == setup_test_data["item_orders"][1].id
+
+
+@pytest.mark.django_db
+def test_export_csv(setup_test_data, tmp_path):
+    """
+    Test that the csv format writes one file per model
+    """
+    call_command("export_data", "--format", "csv", "--output", str(tmp_path), "--models", "users", "itemorder")
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["itemorder.csv", "users.csv"]
+    lines = (tmp_path / "itemorder.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0].split(",")[:3] == ["id", "status", "quantity"]
+    assert len(lines) == 3
@@ -0,0 +1,94 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from supply_room.models import (Class, Users, ClassGroups, Order, UserOrder,
+                                ItemOrder, ItemOrderUnit, Item, ItemStock, StudentGroups)
+
+
+@pytest.mark.django_db
+def test_seed_repository_file(capsys):
+    """
+    Test that the seed file of the repository (rows without ids) imports
+    and that importing it again doesn't duplicate rows
+    """
+    call_command("seed", "seeds.json", "--batch-size", "7")
+    output = capsys.readouterr().out
+
+    assert "item: 23 rows" in output
+    assert "Data imported successfully with 63 records" in output
+    assert Item.objects.count() == 23
+    assert not Item.objects.get(pk=4).is_available
+
+    order = Order.objects.get()
+    assert (order.status, order.year, order.term) == ("pendiente", 2025, "I")
+    assert list(ItemOrderUnit.objects.values_list("item_id", flat=True)) == [4]
+    assert ItemStock.objects.get(pk="Protoboard").requested == 1
+    assert Order.objects.search(order.members[0].name).exists()
+
+    call_command("seed", "seeds.json")
+    assert (Item.objects.count(), Users.objects.count(), ItemOrder.objects.count()) == (23, 20, 1)
+
+    # The sequences continue after the imported ids
+    assert Class.objects.create(name="Nuevo", code="IE999").pk == 16
+
+
+@pytest.mark.django_db
+def test_seed_without_ids_keeps_existing_rows():
+    """
+    Test that the rows of a seed file without ids don't overwrite the rows
+    already in the database that have the ids of their positions
+    """
+    admin = Users.objects.create_user(id=1, username="admin", email="admin@example.com",
+                                      password="adminpass", role="admin", name="Admin")
+    item = Item.objects.create(id=1, name="Osciloscopio")
+
+    call_command("seed", "seeds.json")
+
+    admin.refresh_from_db()
+    assert (admin.email, admin.role, admin.name) == ("admin@example.com", "admin", "Admin")
+    assert admin.check_password("adminpass")
+    assert Item.objects.get(pk=item.pk).name == "Osciloscopio"
+    assert (Users.objects.count(), Item.objects.count()) == (20, 23)
+
+
+@pytest.mark.django_db
+def test_seed_export_round_trip(tmp_path):
+    """
+    Test that the files written by export_data import back in every format
+    """
+    teacher = Users.objects.create_user(email="teacher@example.com", password="pass", role="teacher")
+    student = Users.objects.create_user(email="student@example.com", password="pass",
+                                        role="student", name="Ana", student_id=None)
+    group = ClassGroups.objects.create(professor=teacher, class_id=Class.objects.create(name="Lab", code="IE1"))
+    group.add_students([student])
+    order = Order.objects.create(group=group)
+    UserOrder.objects.create(order=order, user=student)
+    item = Item.objects.create(name="Resistor\t\\ 10kΩ")
+    ItemOrder.objects.create(order=order, item=item, quantity=1, status="Prestado")
+
+    for options in (["--format", "ndjson", "--gzip"], ["--format", "csv"]):
+        output = tmp_path / f"seeds.{options[1]}"
+        call_command("export_data", *options, "--output", str(output))
+        path = f"{output}.gz" if "--gzip" in options else str(output)
+
+        Item.objects.filter(pk=item.pk).update(name="Cambiado")
+        call_command("seed", path)
+
+        assert Item.objects.get(pk=item.pk).name == "Resistor\t\\ 10kΩ"
+        assert Users.objects.get(pk=student.pk).student_id is None
+        assert StudentGroups.objects.count() == 1
+        assert Order.objects.get(pk=order.pk).status == "prestado"
+
+
+@pytest.mark.django_db
+def test_seed_rolls_back_on_error(tmp_path):
+    """
+    Test that an invalid file doesn't leave rows behind
+    """
+    path = tmp_path / "seeds.json"
+    path.write_text(json.dumps({"item": [{"name": "Resistor"}], "itemorder": [{"quantity": "uno"}]}))
+
+    with pytest.raises(CommandError):
+        call_command("seed", str(path))
+    assert not Item.objects.exists()
@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.models import Class, ClassGroups, Users
+
+
+def create_groups(class_id, count):
+    for number in range(count):
+        professor = Users.objects.create_user(
+            username=f'professor{class_id.code}{number}',
+            email=f'professor{class_id.code}{number}@example.com',
+            password='testpass',
+            role='teacher'
+        )
+        ClassGroups.objects.create(number=number + 1, year=2025, term='I', professor=professor, class_id=class_id)
+
+
+@pytest.mark.django_db
+def test_grupos_curso_inexistente(client):
+    """
+    Test that the groups of an unknown class code return a 404.
+    """
+    user = Users.objects.create_user(username='testuser', password='testpass', role='teacher')
+    client.force_login(user)
+
+    assert client.get(reverse("grupos", kwargs={"code": "NOEXISTE"})).status_code == 404
+    assert client.post(reverse("crear-grupo", kwargs={"code": "NOEXISTE"}), {
+        'number': 1, 'year': 2025, 'term': 'I', 'professor': user.id
+    }).status_code == 404
+    assert not ClassGroups.objects.exists()
+
+
+@pytest.mark.django_db
+def test_grupos_consultas_constantes(client):
+    """
+    Test that the number of queries of the group list doesn't grow with the groups.
+    """
+    user = Users.objects.create_user(username='testuser', password='testpass', role='admin')
+    client.force_login(user)
+    small = Class.objects.create(name='Lab Maquinas', code='IE001')
+    large = Class.objects.create(name='Lab Digitales', code='IE002')
+    create_groups(small, 1)
+    create_groups(large, 8)
+    # The first request loads the mapping of the class codes
+    Class.objects.id_for_code(small.code)
+
+    with CaptureQueriesContext(connection) as small_queries:
+        response = client.get(reverse("grupos", kwargs={"code": small.code}))
+    assert response.status_code == 200
+    with CaptureQueriesContext(connection) as large_queries:
+        response = client.get(reverse("grupos", kwargs={"code": large.code}))
+    assert response.status_code == 200
+
+    assert len(response.context['object_list']) == 8
+    assert len(large_queries) == len(small_queries)
+
+
+@pytest.mark.django_db
+def test_grupos_codigo_actualizado(client):
+    """
+    Test that the cached class codes are updated when a class changes its code.
+    """
+    user = Users.objects.create_user(username='testuser', password='testpass', role='admin')
+    client.force_login(user)
+    class1 = Class.objects.create(name='Lab Maquinas', code='IE001')
+    assert client.get(reverse("grupos", kwargs={"code": "IE001"})).status_code == 200
+
+    class1.code = 'IE010'
+    class1.save()
+
+    assert client.get(reverse("grupos", kwargs={"code": "IE001"})).status_code == 404
+    response = client.get(reverse("grupos", kwargs={"code": "IE010"}))
+    assert response.status_code == 200
+    assert response.context['class'] == class1
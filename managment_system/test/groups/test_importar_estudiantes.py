@@ -0,0 +1,133 @@
+import io
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from openpyxl import Workbook
+from supply_room.models import Class, ClassGroups, Order, StudentGroups, UserOrder, Users
+
+
+ROSTER = (
+    "student_id,email,name,group\n"
+    "B10001,ana@example.com,Ana,1\n"
+    "B10002,luis@example.com,Luis,2\n"
+    "B10003,correo-invalido,Marta,1\n"
+    "B10004,pedro@example.com,Pedro,9\n"
+    "B10005,sofia@example.com,Sofía,1\n"
+)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    existing = Users.objects.create_user(
+        username="sofia",
+        email="sofia@example.com",
+        password="sofiapass",
+        role="student",
+        name="Sofia"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+    groups = [
+        ClassGroups.objects.create(number=number, year=2025, term='I',
+                                   professor=teacher, class_id=class1)
+        for number in (1, 2)
+    ]
+
+    order = Order.objects.create(group=groups[0])
+    UserOrder.objects.create(order=order, user=existing)
+
+    return {
+        "client": client,
+        "admin": admin,
+        "teacher": teacher,
+        "existing": existing,
+        "class": class1,
+        "groups": groups,
+        "order": order,
+    }
+
+
+@pytest.mark.django_db
+def test_import_roster_command(setup_test_data, tmp_path, capsys):
+    """
+    Test that the command imports the valid rows and reports the others
+    """
+    group1, group2 = setup_test_data["groups"]
+    path = tmp_path / "roster.csv"
+    path.write_text(ROSTER, encoding="utf-8")
+
+    call_command("import_roster", str(path), "--class-code", "IE001",
+                 "--year", "2025", "--term", "I", "--batch-size", "2")
+    output = capsys.readouterr().out
+
+    assert "Line 4:" in output
+    assert "Line 5: No existe el grupo 9 de IE001 (I Semestre 2025)." in output
+    assert "Imported 3/5 rows: 2 users created, 1 updated, 3 students added to groups" in output
+
+    ana = Users.objects.get(email="ana@example.com")
+    assert (ana.student_id, ana.role, ana.username, ana.has_usable_password()) == ("B10001", "student", "ana", False)
+    assert set(group1.students.values_list("email", flat=True)) == {"ana@example.com", "sofia@example.com"}
+    assert list(group2.students.values_list("email", flat=True)) == ["luis@example.com"]
+
+    # The existing user keeps the password and the search document gets the new data
+    existing = setup_test_data["existing"]
+    existing.refresh_from_db()
+    assert existing.name == "Sofía"
+    assert existing.check_password("sofiapass")
+    assert list(Order.objects.search("b10005")) == [setup_test_data["order"]]
+
+    # Importing again doesn't change anything
+    call_command("import_roster", str(path), "--class-code", "IE001", "--year", "2025", "--term", "I")
+    assert "0 users created, 0 updated, 0 students added" in capsys.readouterr().out
+    assert StudentGroups.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_import_roster_view(setup_test_data):
+    """
+    Test that admins can upload a XLSX roster and that other roles can't
+    """
+    client = setup_test_data["client"]
+    url = reverse("importar-estudiantes")
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["student_id", "email", "name", "group", "class_code"])
+    sheet.append(["B10001", "ana@example.com", "Ana", 2, "IE001"])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    def upload():
+        return SimpleUploadedFile("roster.xlsx", content.getvalue())
+
+    client.force_login(setup_test_data["teacher"])
+    response = client.post(url, {"file": upload(), "year": 2025, "term": "I"})
+    assert response.status_code == 403
+
+    client.force_login(setup_test_data["admin"])
+    response = client.post(url, {"file": upload(), "year": 2025, "term": "I"})
+
+    assert response.status_code == 200
+    report = response.context["report"]
+    assert (report["rows"], report["users_created"], report["links_created"]) == (1, 1, 1)
+    assert list(setup_test_data["groups"][1].students.values_list("email", flat=True)) == ["ana@example.com"]
+
+    response = client.post(url, {"file": SimpleUploadedFile("roster.csv", b"email,name\n"),
+                                 "year": 2025, "term": "I"})
+    assert response.context["report"] is None
+    assert "Faltan columnas en el archivo: student_id, group." in response.content.decode()
@@ -0,0 +1,98 @@
+import pytest
+from django.db import IntegrityError
+from supply_room.models import Class, ClassGroups, Order, StudentGroups, UserOrder, Users
+
+
+@pytest.fixture
+def setup_test_data():
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    students = [
+        Users.objects.create_user(
+            email=f"student{i}@example.com",
+            password="studentpass",
+            role="student",
+            name=f"Student {i}"
+        )
+        for i in range(6)
+    ]
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+    group = ClassGroups.objects.create(number=1,
+                                       year=2025,
+                                       term='I',
+                                       professor=teacher,
+                                       class_id=class1
+                                       )
+
+    return {
+        "group": group,
+        "students": students,
+    }
+
+
+@pytest.mark.django_db
+def test_set_students_summary(setup_test_data):
+    """
+    Test that the sync adds and removes only the differences and reports them
+    """
+    group = setup_test_data["group"]
+    s = setup_test_data["students"]
+
+    assert group.set_students(s[:3]) == {
+        "added": [s[0].id, s[1].id, s[2].id], "removed": [], "unchanged": 0
+    }
+    kept = StudentGroups.objects.get(group=group, student=s[1])
+
+    assert group.set_students(s[1:4]) == {
+        "added": [s[3].id], "removed": [s[0].id], "unchanged": 2
+    }
+    assert set(group.students) == set(s[1:4])
+    # The links that didn't change keep their row
+    assert StudentGroups.objects.filter(pk=kept.pk).exists()
+
+    assert group.add_students([s[3], s[4]]) == {
+        "added": [s[4].id], "removed": [], "unchanged": 1
+    }
+    assert group.students.count() == 4
+
+
+@pytest.mark.django_db
+def test_set_students_query_count(setup_test_data, django_assert_num_queries):
+    """
+    Test that the sync runs the same queries whatever the number of students
+    """
+    group = setup_test_data["group"]
+    students = setup_test_data["students"]
+    group.add_students(students[:1])
+
+    # Current members, bulk insert and delete (in a savepoint), the delete
+    # loads the links for the signals that invalidate the cached memberships
+    with django_assert_num_queries(6):
+        group.set_students(students[1:])
+
+    with pytest.raises(IntegrityError):
+        StudentGroups.objects.create(group=group, student=students[1])
+
+
+@pytest.mark.django_db
+def test_order_set_students(setup_test_data):
+    """
+    Test that the order sync keeps the search document up to date
+    """
+    group = setup_test_data["group"]
+    s = setup_test_data["students"]
+    order = Order.objects.create(group=group)
+
+    order.add_students(s[:2])
+    assert order.set_students([s[1], s[2]]) == {
+        "added": [s[2].id], "removed": [s[0].id], "unchanged": 1
+    }
+    assert set(UserOrder.objects.filter(order=order).values_list("user", flat=True)) == {s[1].id, s[2].id}
+    assert list(Order.objects.search("student 2")) == [order]
+    assert not Order.objects.search("student 0").exists()
@@ -0,0 +1,90 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from supply_room.cron import clear_expired_requests
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                Item, ItemOrder, ItemOrderUnit, ItemStock)
+
+
+@pytest.fixture
+def setup_test_data():
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    order1 = Order.objects.create(group=group1)
+
+    units = [Item.objects.create(name='Cables tipo lagarto') for _ in range(6)]
+
+    def request(count, hours_ago):
+        """
+        Reserves `count` units in a new ItemOrder made `hours_ago` hours ago
+        """
+        reserved = Item.objects.reserve('Cables tipo lagarto', count)
+        assert len(reserved) == count
+        item_order = ItemOrder(order=order1,
+                               item=reserved[0],
+                               quantity=count,
+                               request_date=timezone.now() - timedelta(hours=hours_ago))
+        item_order.reserved_units = reserved
+        item_order.save()
+        ItemStock.objects.move('Cables tipo lagarto', count, None, 'Solicitado',
+                               available=-count)
+        return item_order
+
+    return {
+        "units": units,
+        "expired": [request(2, 30), request(1, 26), request(2, 25)],
+        "recent": request(1, 2)
+    }
+
+
+@pytest.mark.django_db
+def test_clear_expired_requests_in_batches(setup_test_data):
+    """
+    Test that the sweep processes every expired request in batches,
+    releases all their units and leaves recent requests untouched.
+    """
+    units = setup_test_data["units"]
+    recent = setup_test_data["recent"]
+
+    # Each request reserved the next free units, in order
+    reserved = [
+        list(item_order.units.order_by('item_id').values_list('item_id', flat=True))
+        for item_order in setup_test_data["expired"] + [recent]
+    ]
+    assert reserved == [[units[0].id, units[1].id], [units[2].id], [units[3].id, units[4].id], [units[5].id]]
+    assert not Item.objects.filter(is_available=True).exists()
+
+    summary = clear_expired_requests(batch_size=2)
+
+    assert summary["processed"] == 3
+    assert summary["released"] == 5
+    assert list(ItemOrder.objects.all()) == [recent]
+    assert list(ItemOrderUnit.objects.values_list('item_order_id', flat=True)) == [recent.id]
+    assert list(Item.objects.filter(is_available=False)) == [units[5]]
+    assert ItemStock.objects.rebuild(commit=False) == {}
+
+
+@pytest.mark.django_db
+def test_clear_expired_requests_nothing_to_do(setup_test_data):
+    """
+    Test that a second run finds nothing to process.
+    """
+    clear_expired_requests()
+    summary = clear_expired_requests()
+
+    assert summary["processed"] == 0
+    assert summary["released"] == 0
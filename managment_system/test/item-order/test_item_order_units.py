@@ -0,0 +1,181 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from supply_room.cron import clear_expired_requests
+from supply_room.models import (Class, Users, ClassGroups, Order, UserOrder,
+                                Item, ItemOrder, ItemOrderUnit, ItemStock)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    student1 = Users.objects.create_user(
+        username="student1",
+        email="student1@example.com",
+        password="student1pass",
+        role="student",
+        name="Sebas"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    group1.add_students([student1])
+
+    order1 = Order.objects.create(group=group1)
+
+    UserOrder.objects.create(order=order1, user=student1)
+
+    units = [Item.objects.create(name='Resistor 100') for _ in range(5)]
+
+    client.force_login(student1)
+    client.post(reverse("orden-articulo", kwargs={'pk': order1.id}),
+                {'item': units[0].id, 'quantity': 3})
+
+    return {
+        "client": client,
+        "admin": admin,
+        "order": order1,
+        "units": units,
+        "item_order": ItemOrder.objects.get(order=order1)
+    }
+
+
+def status_data(item_order, status):
+    return {
+        'form-TOTAL_FORMS': '1',
+        'form-INITIAL_FORMS': '1',
+        'form-MIN_NUM_FORMS': '0',
+        'form-MAX_NUM_FORMS': '1000',
+        'form-0-id': str(item_order.id),
+        'form-0-item': str(item_order.item.id),
+        'form-0-quantity': str(item_order.quantity),
+        'form-0-status': status
+    }
+
+
+@pytest.mark.django_db
+def test_item_order_records_units(setup_test_data):
+    """
+    Test that creating an ItemOrder records every unit it reserved.
+    """
+    units = setup_test_data["units"]
+    item_order = setup_test_data["item_order"]
+
+    reserved = set(item_order.units.values_list('item_id', flat=True))
+    assert reserved == {units[0].id, units[1].id, units[2].id}
+
+
+@pytest.mark.django_db
+def test_denied_order_releases_its_units(setup_test_data):
+    """
+    Test that denying an order releases exactly the units it held,
+    even when other units of the same name are unavailable.
+    """
+    client = setup_test_data["client"]
+    units = setup_test_data["units"]
+    item_order = setup_test_data["item_order"]
+
+    other = units[4]
+    other.is_available = False
+    other.save()
+
+    client.force_login(setup_test_data["admin"])
+    client.post(reverse("admin-orden", kwargs={"pk": setup_test_data["order"].pk}),
+                status_data(item_order, 'Denegado'))
+
+    item_order.refresh_from_db()
+    assert item_order.status == 'Denegado'
+    assert set(Item.objects.filter(is_available=False).values_list('id', flat=True)) == {other.id}
+    assert ItemStock.objects.available('Resistor 100') == 4
+    assert ItemOrderUnit.objects.filter(item_order=item_order).count() == 3
+
+
+@pytest.mark.django_db
+def test_expired_order_releases_all_units(setup_test_data):
+    """
+    Test that the expiry job releases every unit of the expired orders.
+    """
+    item_order = setup_test_data["item_order"]
+    ItemOrder.objects.filter(pk=item_order.pk).update(
+        request_date=timezone.now() - timedelta(hours=25)
+    )
+
+    assert clear_expired_requests()
+
+    assert not ItemOrder.objects.exists()
+    assert not ItemOrderUnit.objects.exists()
+    assert Item.objects.filter(is_available=True).count() == 5
+    assert ItemStock.objects.rebuild(commit=False) == {}
+
+
+@pytest.mark.django_db
+def test_released_unit_keeps_its_history(setup_test_data):
+    """
+    Test that a unit with reservations can't be deleted, so the loan
+    history of the orders is kept.
+    """
+    client = setup_test_data["client"]
+    item_order = setup_test_data["item_order"]
+    client.force_login(setup_test_data["admin"])
+    client.post(reverse("admin-orden", kwargs={"pk": setup_test_data["order"].pk}),
+                status_data(item_order, 'Denegado'))
+
+    unit = Item.objects.get(id=item_order.units.exclude(item=item_order.item).values_list('item', flat=True)[0])
+    assert unit.is_available
+
+    response = client.post(reverse("eliminar-articulo", args=[unit.id]))
+
+    assert response.status_code == 302
+    assert Item.objects.filter(id=unit.id).exists()
+    assert ItemOrderUnit.objects.filter(item_order=item_order).count() == 3
+
+
+@pytest.mark.django_db
+def test_posted_quantity_does_not_change_the_counters(setup_test_data):
+    """
+    Test that a quantity posted with a status change is ignored and the
+    stock counters stay equal to the computed ones.
+    """
+    client = setup_test_data["client"]
+    item_order = setup_test_data["item_order"]
+    client.force_login(setup_test_data["admin"])
+
+    data = status_data(item_order, 'Prestado')
+    data['form-0-quantity'] = '1'
+    client.post(reverse("admin-orden", kwargs={"pk": setup_test_data["order"].pk}), data)
+
+    item_order.refresh_from_db()
+    assert (item_order.status, item_order.quantity) == ('Prestado', 3)
+    stock = ItemStock.objects.get(pk='Resistor 100')
+    assert (stock.requested, stock.on_loan) == (0, 3)
+    assert ItemStock.objects.rebuild(commit=False) == {}
+
+    data = status_data(item_order, 'Devuelto')
+    data['form-0-quantity'] = '5'
+    client.post(reverse("admin-orden", kwargs={"pk": setup_test_data["order"].pk}), data)
+
+    item_order.refresh_from_db()
+    assert (item_order.status, item_order.quantity) == ('Devuelto', 3)
+    assert Item.objects.filter(is_available=True).count() == 5
+    assert ItemStock.objects.rebuild(commit=False) == {}
@@ -2,6 +2,7 @@ import pytest
 from django.urls import reverse
 from supply_room.models import (Class, Users, ClassGroups, Order,
                                 UserOrder, Item)
+from supply_room.utils import encode_cursor
 
 
 @pytest.fixture
@@ -94,3 +95,68 @@ def test_item_search_view(setup_test_data):
     assert response.status_code == 200
     data = response.json()
     assert len(data['results']) == 0  # Capacitor is not available
+
+
+@pytest.mark.django_db
+def test_item_search_accents_and_ranking(setup_test_data):
+    """
+    Test that the search ignores accents and ranks the closest names first
+    """
+    client = setup_test_data["client"]
+    client.force_login(Users.objects.get(username="student1"))
+    Item.objects.create(name='Multímetro digital')
+    Item.objects.create(name='Multímetro')
+
+    response = client.get(reverse("item_search"), {'q': 'MULTIMETRO'})
+    data = response.json()
+
+    assert [result['text'] for result in data['results']] == ['Multímetro', 'Multímetro digital']
+    assert data['pagination'] == {'more': False, 'cursor': None}
+
+
+@pytest.mark.django_db
+def test_item_search_pagination(setup_test_data):
+    """
+    Test that the pages follow the cursor without repeating names
+    """
+    client = setup_test_data["client"]
+    client.force_login(Users.objects.get(username="student1"))
+    for i in range(25):
+        Item.objects.create(name=f'Cable {i:02}')
+
+    url = reverse("item_search")
+    first = client.get(url, {'q': 'cable'}).json()
+    assert len(first['results']) == 20
+    assert first['pagination']['more']
+
+    second = client.get(url, {'q': 'cable', 'cursor': first['pagination']['cursor']}).json()
+    assert len(second['results']) == 5
+    assert not second['pagination']['more']
+
+    names = [result['text'] for result in first['results'] + second['results']]
+    assert sorted(names) == [f'Cable {i:02}' for i in range(25)]
+
+    # An invalid cursor starts from the first page
+    response = client.get(url, {'q': 'cable', 'cursor': 'invalido'})
+    assert response.json() == first
+
+    # So does a valid cursor with a tampered sort key
+    for tampered in (["x"], [1, 2, 3], ["x", "Cable 05"], [0.5, 7], {"rank": 1}):
+        response = client.get(url, {'q': 'cable', 'cursor': encode_cursor(tampered)})
+        assert response.status_code == 200
+        assert response.json() == first
+
+
+@pytest.mark.django_db
+def test_item_search_cache(setup_test_data, django_assert_num_queries):
+    """
+    Test that repeated searches of the same prefix are served from the cache
+    """
+    client = setup_test_data["client"]
+    client.force_login(Users.objects.get(username="student1"))
+    url = reverse("item_search")
+
+    first = client.get(url, {'q': 'Resis'}).json()
+    with django_assert_num_queries(2):
+        # Only the session and the user
+        assert client.get(url, {'q': ' resis '}).json() == first
@@ -0,0 +1,123 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from supply_room.caching import get_generations
+from supply_room.forms import ItemForm
+from supply_room.models import (Class, ClassGroups, Item, ItemOrder, ItemStock,
+                                Order, OrderQuerySet, Users)
+
+
+@pytest.mark.django_db
+def test_reserve_units():
+    """
+    Test that the reservation claims the requested units in code order
+    and marks them as unavailable.
+    """
+    units = [Item.objects.create(name='Resistor 100', code=str(i)) for i in (3, 1, 2)]
+    Item.objects.create(name='Resistor 200')
+
+    reserved = Item.objects.reserve('Resistor 100', 2)
+
+    assert [unit.id for unit in reserved] == [units[1].id, units[2].id]
+    assert all(not unit.is_available for unit in reserved)
+    assert Item.objects.filter(name='Resistor 100', is_available=True).get() == units[0]
+    assert Item.objects.get(name='Resistor 200').is_available
+
+
+@pytest.mark.django_db
+def test_reserve_by_code_and_shortage():
+    """
+    Test that a code reserves only that unit and that the reservation
+    returns fewer units when there is not enough stock.
+    """
+    Item.objects.create(name='Osciloscopio', code='10')
+    Item.objects.create(name='Osciloscopio', code='11')
+
+    reserved = Item.objects.reserve('Osciloscopio', 1, code='11')
+    assert [unit.code for unit in reserved] == ['11']
+    assert Item.objects.reserve('Osciloscopio', 1, code='11') == []
+
+    reserved = Item.objects.reserve('Osciloscopio', 3)
+    assert [unit.code for unit in reserved] == ['10']
+
+    # Stock counters are only adjusted by the caller
+    assert ItemStock.objects.available('Osciloscopio') == 2
+
+
+@pytest.mark.django_db
+def test_reserve_bumps_the_generation_at_commit(django_capture_on_commit_callbacks):
+    """
+    Test that the reservation invalidates the cached lists of items when it
+    commits, not while it holds the locks of the units.
+    """
+    Item.objects.create(name='Resistor 100')
+    before, = get_generations(['item'])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            Item.objects.reserve('Resistor 100', 1)
+            assert get_generations(['item']) == [before]
+
+    assert get_generations(['item'])[0] > before
+
+
+@pytest.mark.django_db(transaction=True)
+def test_same_item_requests_do_not_serialize():
+    """
+    Test that a request of an item is not blocked by another request of
+    the same item that has not committed yet: the stock counters of the
+    name are only locked at the end of the transaction.
+    """
+    teacher = Users.objects.create_user(username='teacher', email='teacher@example.com', password='testpass', role='teacher')
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+    group = ClassGroups.objects.create(number=1, year=2025, term='I', professor=teacher, class_id=class1)
+    first_order = Order.objects.create(group=group)
+    second_order = Order.objects.create(group=group)
+    item = Item.objects.create(name='Resistor 100')
+    Item.objects.create(name='Resistor 100')
+
+    paused = threading.Event()
+    resume = threading.Event()
+    move_items = OrderQuerySet.move_items
+
+    def slow_move_items(self, *args, **kwargs):
+        # The first request stops in the middle of its transaction
+        if threading.current_thread().name == 'first':
+            paused.set()
+            resume.wait(10)
+        return move_items(self, *args, **kwargs)
+
+    def request(order):
+        form = ItemForm(data={'item': item.id, 'quantity': 1, 'code': ''},
+                        instance=ItemOrder(order=order, request_date=timezone.now()))
+        assert form.is_valid(), form.errors
+        return form.save()
+
+    def first_request():
+        try:
+            request(first_order)
+        finally:
+            connections.close_all()
+
+    with patch.object(OrderQuerySet, 'move_items', slow_move_items):
+        first = threading.Thread(target=first_request, name='first')
+        first.start()
+        try:
+            assert paused.wait(10)
+            with connection.cursor() as cursor:
+                cursor.execute("SET lock_timeout = '2s'")
+            try:
+                request(second_order)
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute("RESET lock_timeout")
+        finally:
+            resume.set()
+            first.join(10)
+
+    assert ItemOrder.objects.count() == 2
+    assert ItemStock.objects.available('Resistor 100') == 0
+    assert ItemStock.objects.rebuild(commit=False) == {}
@@ -1,4 +1,3 @@
-import json
 import pytest
 from django.urls import reverse
 from supply_room.models import Item, Users
@@ -18,9 +17,9 @@ def test_articulos(client):
     client.force_login(user)
 
     # Create test data
-    item1 = Item.objects.create(name="Resistencia", is_available=True)
-    item2 = Item.objects.create(name="Resistencia", is_available=False)
-    item3 = Item.objects.create(name="Capacitor", is_available=True)
+    Item.objects.create(name="Resistencia", is_available=True)
+    Item.objects.create(name="Resistencia", is_available=False)
+    Item.objects.create(name="Capacitor", is_available=True)
 
     # Make GET request
     url = reverse("articulos")
@@ -39,14 +38,63 @@ def test_articulos(client):
     # Verify group Resistencia
     resistencia_group = next(item for item in items if item['name'] == 'Resistencia')
     assert resistencia_group['count'] == 2
-    detalles = json.loads(resistencia_group['detalles'])
-    assert len(detalles) == 2
-    assert any(d['id'] == item1.id and d['is_available'] for d in detalles)
-    assert any(d['id'] == item2.id and not d['is_available'] for d in detalles)
+    assert resistencia_group['available'] == 1
 
     # Verify group Capacitor
     capacitor_group = next(item for item in items if item['name'] == 'Capacitor')
     assert capacitor_group['count'] == 1
-    detalles = json.loads(capacitor_group['detalles'])
-    assert detalles[0]['id'] == item3.id
-    assert detalles[0]['is_available'] is True
+    assert capacitor_group['available'] == 1
+
+
+@pytest.mark.django_db
+def test_articulos_search(client):
+    """
+    Test that the ItemList view filters the groups by name.
+    """
+    user = Users.objects.create_user(
+        username='testuser',
+        password='testpass',
+        role='admin'
+    )
+    client.force_login(user)
+
+    Item.objects.create(name="Resistencia", is_available=True)
+    Item.objects.create(name="Capacitor", is_available=True)
+
+    response = client.get(reverse("articulos"), {'q': 'resis'})
+
+    assert response.status_code == 200
+    items = response.context['object_list']
+    assert [item['name'] for item in items] == ['Resistencia']
+
+
+@pytest.mark.django_db
+def test_articulos_detalle(client):
+    """
+    Test that the units of an item are loaded by name and paginated.
+    """
+    user = Users.objects.create_user(
+        username='testuser',
+        password='testpass',
+        role='admin'
+    )
+    client.force_login(user)
+
+    units = [Item.objects.create(name="Multímetro", code=str(i)) for i in range(1, 8)]
+    units[0].is_available = False
+    units[0].save()
+    Item.objects.create(name="Capacitor")
+
+    url = reverse("articulos-detalle")
+    response = client.get(url, {'name': 'Multímetro'})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['page'] == 1
+    assert data['num_pages'] == 2
+    assert len(data['results']) == 5
+    assert data['results'][0] == {'id': units[0].id, 'code': '1', 'is_available': False}
+
+    response = client.get(url, {'name': 'Multímetro', 'page': 2})
+    data = response.json()
+    assert [d['id'] for d in data['results']] == [units[5].id, units[6].id]
@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.caching import fragment_cache_stats
+from supply_room.models import Class, Item, ItemStock, Users
+
+
+@pytest.mark.django_db
+def test_articulos_cache_hit(client):
+    """
+    Test that the second request reuses the cached list without querying the items.
+    """
+    user = Users.objects.create_user(username='testuser', password='testpass', role='admin')
+    client.force_login(user)
+    Item.objects.create(name="Resistencia", is_available=True)
+
+    with CaptureQueriesContext(connection) as miss:
+        first = client.get(reverse("articulos"))
+    with CaptureQueriesContext(connection) as hit:
+        second = client.get(reverse("articulos"))
+
+    assert first.status_code == second.status_code == 200
+    assert "Resistencia" in second.content.decode()
+    assert 'object_list' not in second.context
+    assert len(hit) < len(miss)
+    assert fragment_cache_stats()["articulos"] == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.django_db
+def test_articulos_cache_invalidation(client, django_capture_on_commit_callbacks):
+    """
+    Test that creating an item or changing the stock invalidates the cached lists.
+    """
+    user = Users.objects.create_user(username='testuser', password='testpass', role='admin')
+    client.force_login(user)
+    Item.objects.create(name="Resistencia", is_available=True)
+    client.get(reverse("articulos-disponibles"))
+
+    Item.objects.create(name="Capacitor", is_available=True)
+    response = client.get(reverse("articulos-disponibles"))
+    assert "Capacitor" in response.content.decode()
+
+    # The counters invalidate the lists when they commit
+    with django_capture_on_commit_callbacks(execute=True):
+        ItemStock.objects.adjust("Capacitor", available=-1)
+    client.get(reverse("articulos-disponibles"))
+    assert fragment_cache_stats()["articulos-disponibles"] == {"hits": 0, "misses": 3}
+
+
+@pytest.mark.django_db
+def test_cursos_cache_por_rol(client):
+    """
+    Test that the cached lists are kept per role and invalidated when a class changes.
+    """
+    admin = Users.objects.create_user(username='admin', email='admin@test.com', password='testpass', role='admin')
+    teacher = Users.objects.create_user(username='teacher', email='teacher@test.com', password='testpass', role='teacher')
+    lab = Class.objects.create(name="Lab Digitales", code="IE-001")
+
+    client.force_login(admin)
+    client.get(reverse("cursos"))
+    client.force_login(teacher)
+    client.get(reverse("cursos"))
+    assert fragment_cache_stats()["cursos"] == {"hits": 0, "misses": 2}
+
+    client.get(reverse("cursos"))
+    assert fragment_cache_stats()["cursos"] == {"hits": 1, "misses": 2}
+
+    lab.name = "Lab Potencia"
+    lab.save()
+    response = client.get(reverse("cursos"))
+    assert "Lab Potencia" in response.content.decode()
+    assert fragment_cache_stats()["cursos"] == {"hits": 1, "misses": 3}
+
+
+@pytest.mark.django_db
+def test_estadisticas_cache(client):
+    """
+    Test that only the admins can read the counters of the cache.
+    """
+    teacher = Users.objects.create_user(username='teacher', email='teacher@test.com', password='testpass', role='teacher')
+    client.force_login(teacher)
+    assert client.get(reverse("estadisticas-cache")).status_code == 403
+
+    admin = Users.objects.create_user(username='admin', email='admin@test.com', password='testpass', role='admin')
+    client.force_login(admin)
+    response = client.get(reverse("estadisticas-cache"))
+    assert response.status_code == 200
+    assert response.json()["fragments"]["cursos"] == {"hits": 0, "misses": 0}
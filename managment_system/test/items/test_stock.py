@@ -0,0 +1,167 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                UserOrder, Item, ItemOrder, ItemStock)
+
+
+def stock(name):
+    """
+    Reads the counters of an item name as a tuple
+    (total, available, on_loan, requested)
+    """
+    row = ItemStock.objects.get(pk=name)
+    return row.total, row.available, row.on_loan, row.requested
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    student1 = Users.objects.create_user(
+        username="student1",
+        email="student1@example.com",
+        password="student1pass",
+        role="student",
+        name="Sebas"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    group1.add_students([student1])
+
+    order1 = Order.objects.create(group=group1)
+
+    UserOrder.objects.create(order=order1, user=student1)
+
+    return {
+        "client": client,
+        "admin": admin,
+        "student": student1,
+        "order": order1
+    }
+
+
+@pytest.mark.django_db
+def test_stock_follows_order_lifecycle(setup_test_data):
+    """
+    Test that the counters stay correct when items are created,
+    requested, loaned and returned.
+    """
+    client = setup_test_data["client"]
+    order = setup_test_data["order"]
+
+    client.force_login(setup_test_data["admin"])
+    client.post(reverse('crear-articulo'), {'name': 'Multímetro', 'quantity': 4})
+    assert stock('Multímetro') == (4, 4, 0, 0)
+
+    client.force_login(setup_test_data["student"])
+    unit = Item.objects.filter(name='Multímetro').first()
+    response = client.post(reverse("orden-articulo", kwargs={'pk': order.id}),
+                           {'item': unit.id, 'quantity': 3})
+    assert response.status_code == 302
+    assert stock('Multímetro') == (4, 1, 0, 3)
+
+    item_order = ItemOrder.objects.get(order=order)
+    data = {
+        'form-TOTAL_FORMS': '1',
+        'form-INITIAL_FORMS': '1',
+        'form-MIN_NUM_FORMS': '0',
+        'form-MAX_NUM_FORMS': '1000',
+        'form-0-id': str(item_order.id),
+        'form-0-item': str(item_order.item.id),
+        'form-0-quantity': str(item_order.quantity),
+        'form-0-status': 'Prestado'
+    }
+    client.force_login(setup_test_data["admin"])
+    client.post(reverse("admin-orden", kwargs={"pk": order.pk}), data)
+    assert stock('Multímetro') == (4, 1, 3, 0)
+
+    data['form-0-status'] = 'Devuelto'
+    client.post(reverse("admin-orden", kwargs={"pk": order.pk}), data)
+    assert stock('Multímetro') == (4, 4, 0, 0)
+
+    assert ItemStock.objects.rebuild(commit=False) == {}
+
+
+@pytest.mark.django_db
+def test_stock_on_save_without_loading():
+    """
+    Test that saving a unit built with the id of an existing row, without
+    loading it, updates the counters from the stored row instead of
+    counting it again.
+    """
+    unit = Item.objects.create(name='Fuente', code='1')
+    Item.objects.create(name='Fuente', code='2')
+
+    Item(pk=unit.pk, name='Fuente', code='1', is_available=False).save()
+    assert stock('Fuente') == (2, 1, 0, 0)
+
+    Item(pk=unit.pk, name='Generador', code='1', is_available=False).save()
+    assert stock('Fuente') == (1, 1, 0, 0)
+    assert stock('Generador') == (1, 0, 0, 0)
+
+    assert ItemStock.objects.rebuild(commit=False) == {}
+
+
+@pytest.mark.django_db
+def test_stock_on_delete_and_validation(setup_test_data):
+    """
+    Test that deleting a unit updates the counters and that the order
+    form validates the quantity against them.
+    """
+    client = setup_test_data["client"]
+    order = setup_test_data["order"]
+
+    units = [Item.objects.create(name='Protoboard') for _ in range(2)]
+    assert stock('Protoboard') == (2, 2, 0, 0)
+
+    client.force_login(setup_test_data["admin"])
+    client.post(reverse("eliminar-articulo", kwargs={"pk": units[1].pk}))
+    assert stock('Protoboard') == (1, 1, 0, 0)
+
+    client.force_login(setup_test_data["student"])
+    response = client.post(reverse("orden-articulo", kwargs={'pk': order.id}),
+                           {'item': units[0].id, 'quantity': 2})
+    assert response.status_code == 200
+    assert ItemOrder.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_reconcile_stock_command(setup_test_data):
+    """
+    Test that the command detects and rebuilds counters out of sync.
+    """
+    Item.objects.create(name='Capacitor')
+    Item.objects.create(name='Capacitor')
+    Item.objects.filter(name='Capacitor').update(is_available=False)
+    ItemStock.objects.create(name='Fantasma', total=3, available=3)
+
+    with pytest.raises(CommandError):
+        call_command('reconcile_stock', '--check')
+
+    call_command('reconcile_stock')
+
+    assert stock('Capacitor') == (2, 0, 0, 0)
+    assert not ItemStock.objects.filter(pk='Fantasma').exists()
+    call_command('reconcile_stock', '--check')
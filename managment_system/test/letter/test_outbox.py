@@ -0,0 +1,134 @@
+import json
+import smtplib
+from datetime import timedelta
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.utils import timezone
+from supply_room import outbox
+from supply_room.models import Users, OutboundEmail
+
+
+@pytest.fixture
+def admin_client(client):
+    admin = Users.objects.create_user(username="admin", email="admin@example.com",
+                                      password="admin", role="admin")
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.django_db
+def test_generar_carta_queues_email(admin_client):
+    """
+    Verify that the letter is queued instead of sent during the request,
+    and that the worker sends it
+    """
+    student = Users.objects.create_user(username="student1", email="student1@example.com",
+                                        password="pass", role="student", name="Sebas", student_id="C18282")
+
+    response = admin_client.post(
+        "/generar-carta",
+        json.dumps({"student_id": student.id, "extra_email": "extra@example.com"}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert len(mail.outbox) == 0
+    email = OutboundEmail.objects.get()
+    assert email.status == "pendiente"
+    assert email.recipients == ["student1@example.com", "extra@example.com"]
+
+    summary = outbox.send_outbox()
+
+    assert summary["sent"] == 1
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["student1@example.com", "extra@example.com"]
+    assert mail.outbox[0].subject == "Confirmación de devolución completa"
+    assert mail.outbox[0].alternatives[0][1] == "text/html"
+    email.refresh_from_db()
+    assert email.status == "enviado"
+    assert email.sent_at is not None
+
+    # Sent emails are not sent again
+    assert outbox.send_outbox()["sent"] == 0
+
+
+@pytest.mark.django_db
+def test_send_outbox_uses_one_connection(monkeypatch):
+    """
+    Verify that a batch of emails is sent over a single connection
+    """
+    connections = []
+
+    def get_connection():
+        connections.append(EmailBackend())
+        return connections[-1]
+
+    monkeypatch.setattr(outbox, "get_connection", get_connection)
+    for i in range(5):
+        OutboundEmail.objects.enqueue(f"Correo {i}", "admin@example.com", [f"s{i}@example.com"])
+
+    summary = outbox.send_outbox(batch_size=2)
+
+    assert summary["sent"] == 5
+    assert len(connections) == 1
+    assert [email.subject for email in mail.outbox] == [f"Correo {i}" for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_send_outbox_retries_with_backoff(monkeypatch):
+    """
+    Verify that a failed email is retried later and marked as failed
+    after the last attempt
+    """
+    def send_messages(self, messages):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    monkeypatch.setattr(EmailBackend, "send_messages", send_messages)
+    email = OutboundEmail.objects.enqueue("Recordatorio", "admin@example.com", ["s@example.com"])
+
+    summary = outbox.send_outbox()
+
+    assert summary == {"sent": 0, "retried": 1, "failed": 0, "seconds": summary["seconds"]}
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ("pendiente", 1)
+    assert email.last_error == "Connection unexpectedly closed"
+    assert email.next_attempt > timezone.now() + timedelta(seconds=outbox.OUTBOX_RETRY_DELAY - 5)
+
+    # Not due until the backoff passes
+    assert outbox.send_outbox()["retried"] == 0
+
+    OutboundEmail.objects.update(attempts=outbox.OUTBOX_MAX_ATTEMPTS - 1, next_attempt=timezone.now())
+    assert outbox.send_outbox()["failed"] == 1
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ("fallido", outbox.OUTBOX_MAX_ATTEMPTS)
+
+
+@pytest.mark.django_db
+def test_send_outbox_takes_over_expired_claims():
+    """
+    Verify that an email claimed by a worker that died is sent once its lease expires
+    """
+    email = OutboundEmail.objects.enqueue("Recordatorio", "admin@example.com", ["s@example.com"])
+    OutboundEmail.objects.claim(10, outbox.OUTBOX_LEASE)
+
+    assert outbox.send_outbox()["sent"] == 0
+
+    OutboundEmail.objects.update(next_attempt=timezone.now() - timedelta(seconds=1))
+    assert outbox.send_outbox()["sent"] == 1
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ("enviado", 2)
+
+    # A worker that dies on every attempt does not get the email retried forever
+    crashing = OutboundEmail.objects.enqueue("Recordatorio", "admin@example.com", ["c@example.com"])
+    for _ in range(outbox.OUTBOX_MAX_ATTEMPTS):
+        assert OutboundEmail.objects.claim(10, outbox.OUTBOX_LEASE, outbox.OUTBOX_MAX_ATTEMPTS) == [crashing]
+        OutboundEmail.objects.filter(id=crashing.id).update(next_attempt=timezone.now() - timedelta(seconds=1))
+    assert OutboundEmail.objects.claim(10, outbox.OUTBOX_LEASE, outbox.OUTBOX_MAX_ATTEMPTS) == []
+
+    summary = outbox.send_outbox()
+    crashing.refresh_from_db()
+    assert (summary["sent"], summary["failed"]) == (0, 1)
+    assert (crashing.status, crashing.attempts) == ("fallido", outbox.OUTBOX_MAX_ATTEMPTS)
+    assert crashing.last_error
+    assert len(mail.outbox) == 1
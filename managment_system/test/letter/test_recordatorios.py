@@ -0,0 +1,135 @@
+import email
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from supply_room.models import (Class, Users, ClassGroups, Order, UserOrder,
+                                ItemOrder, Item, OutboundEmail)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(username="admin", email="admin@example.com",
+                                      password="admin", role="admin")
+    client.force_login(admin)
+
+    teacher = Users.objects.create_user(username="teacher", email="teacher@example.com",
+                                        password="teacherpass", role="teacher")
+    group = ClassGroups.objects.create(number=1, year=2025, term='I', professor=teacher,
+                                       class_id=Class.objects.create(name="Lab Maquinas", code="IE001"))
+
+    students = [
+        Users.objects.create_user(username=f"student{i}", email=f"student{i}@example.com",
+                                  password="pass", role="student", name=f"Estudiante {i}",
+                                  student_id=f"C1000{i}")
+        for i in range(4)
+    ]
+    items = [Item.objects.create(name=f"Articulo {i}") for i in range(6)]
+
+    # Students 0 and 1 share an order with two items on loan, student 2 has one
+    # on loan and one requested, student 3 has nothing on loan
+    shared = Order.objects.create(group=group)
+    shared.add_students(students[:2])
+    ItemOrder.objects.create(order=shared, item=items[0], quantity=1, status="Prestado")
+    ItemOrder.objects.create(order=shared, item=items[1], quantity=1, status="Prestado")
+
+    own = Order.objects.create(group=group)
+    UserOrder.objects.create(order=own, user=students[2])
+    ItemOrder.objects.create(order=own, item=items[2], quantity=1, status="Prestado")
+    ItemOrder.objects.create(order=own, item=items[3], quantity=1, status="Solicitado")
+
+    returned = Order.objects.create(group=group)
+    UserOrder.objects.create(order=returned, user=students[3])
+    ItemOrder.objects.create(order=returned, item=items[4], quantity=1, status="Devuelto")
+
+    return {"client": client, "students": students}
+
+
+@pytest.mark.django_db
+def test_recordatorios_queue_one_letter_per_student(setup_test_data):
+    """
+    Verify that every student with items on loan gets one letter with only
+    their borrowed items, with a constant number of queries
+    """
+    client = setup_test_data["client"]
+
+    response = client.get("/generar-carta/recordatorios")
+    assert response.status_code == 200
+    assert "3 estudiantes con 5 artículos prestados" in response.content.decode()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post("/generar-carta/recordatorios")
+    content = response.content.decode()
+
+    assert "Correos en cola: 3" in content
+    assert len(mail.outbox) == 0
+    letters = {email.recipients[0]: email for email in OutboundEmail.objects.all()}
+    assert sorted(letters) == [f"student{i}@example.com" for i in range(3)]
+    assert "Articulo 1" in letters["student1@example.com"].html_message
+    assert "Articulo 2" in letters["student2@example.com"].html_message
+    assert "Articulo 3" not in letters["student2@example.com"].html_message
+    assert letters["student2@example.com"].from_email == "admin@example.com"
+
+    # Session and user, the grouped query, users, items, the insert and the preview again
+    assert len(queries) <= 8
+
+
+@pytest.mark.django_db
+def test_recordatorios_only_students(setup_test_data, capsys):
+    """
+    Verify that a teacher or an admin linked to an order with items on loan
+    doesn't get the student letter
+    """
+    shared = Order.objects.filter(itemorder__item__name="Articulo 0").get()
+    for username in ("teacher", "admin"):
+        UserOrder.objects.create(order=shared, user=Users.objects.get(username=username))
+
+    call_command("send_reminders")
+
+    assert "3 students with 5 items on loan" in capsys.readouterr().out
+    assert sorted(letter.recipients[0] for letter in OutboundEmail.objects.all()) == [
+        f"student{i}@example.com" for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+def test_recordatorios_requires_admin(setup_test_data, client):
+    """
+    Verify that students can't send the campaign
+    """
+    client.force_login(setup_test_data["students"][0])
+
+    response = client.post("/generar-carta/recordatorios")
+
+    assert response.status_code == 403
+    assert not OutboundEmail.objects.exists()
+
+
+@pytest.mark.django_db
+def test_send_reminders_dry_run(setup_test_data, tmp_path, capsys):
+    """
+    Verify that the dry run writes the letters to disk without queuing them
+    """
+    call_command("send_reminders", "--dry-run", str(tmp_path), "--batch-size", "2")
+
+    assert "3 students with 5 items on loan, wrote 3 letters" in capsys.readouterr().out
+    assert not OutboundEmail.objects.exists()
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == [f"student{i}@example.com.eml" for i in range(3)]
+
+    message = email.message_from_bytes((tmp_path / "student0@example.com.eml").read_bytes())
+    assert message["To"] == "student0@example.com"
+    html = message.get_payload()[-1].get_payload(decode=True).decode()
+    assert "Estudiante 0" in html and "Articulo 0" in html
+
+
+@pytest.mark.django_db
+def test_send_reminders_send(setup_test_data, capsys):
+    """
+    Verify that --send delivers the queued letters
+    """
+    call_command("send_reminders", "--send")
+
+    assert "Sent 3 emails" in capsys.readouterr().out
+    assert sorted(message.to[0] for message in mail.outbox) == [f"student{i}@example.com" for i in range(3)]
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from supply_room.models import (Class, Users, ClassGroups, Order,
                                 UserOrder, ItemOrder, Item)
@@ -192,3 +194,33 @@ def test_search_by_student_name(setup_test_data):
     assert order1 in items
     assert order3 in items
     assert order2 not in items
+
+
+@pytest.mark.django_db
+def test_status_totals_cached(setup_test_data, django_capture_on_commit_callbacks):
+    """
+    Test that the totals per status are counted once and counted again
+    when an order changes status.
+    """
+    client = setup_test_data["client"]
+    order1 = setup_test_data["orders"][0]
+    url = reverse("administrar-ordenes")
+
+    def totals_queries(context):
+        return [query for query in context.captured_queries if 'COUNT("supply_room_order"."id") FILTER' in query["sql"]]
+
+    with CaptureQueriesContext(connection) as first:
+        assert client.get(url).context["status_totals"]["pendiente"] == 1
+    with CaptureQueriesContext(connection) as second:
+        assert client.get(url).context["status_totals"]["pendiente"] == 1
+    assert len(totals_queries(first)) == 1
+    assert totals_queries(second) == []
+
+    item_order = ItemOrder.objects.get(order=order1)
+    item_order.status = "Prestado"
+    # The order counters invalidate the totals when they commit
+    with django_capture_on_commit_callbacks(execute=True):
+        item_order.save()
+
+    totals = client.get(url).context["status_totals"]
+    assert (totals["pendiente"], totals["prestado"]) == (0, 2)
@@ -0,0 +1,106 @@
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from supply_room.models import Class, Users, ClassGroups, Order, UserOrder, StudentGroups
+from supply_room.authz import get_authorization
+
+
+@pytest.fixture
+def setup_test_data():
+    teacher = Users.objects.create_user(username="teacher", email="teacher@example.com",
+                                        password="teacherpass", role="teacher")
+    other_teacher = Users.objects.create_user(username="teacher2", email="teacher2@example.com",
+                                              password="teacherpass", role="teacher")
+    student = Users.objects.create_user(username="student1", email="student1@example.com",
+                                        password="student1pass", role="student", name="Sebas")
+    group = ClassGroups.objects.create(number=1, year=2025, term='I', professor=teacher,
+                                       class_id=Class.objects.create(name="Lab Maquinas", code="IE001"))
+    order = Order.objects.create(group=group)
+    return {"teacher": teacher, "other_teacher": other_teacher, "student": student,
+            "group": group, "order": order}
+
+
+def authorization(user):
+    """
+    Authorization of a new request of the user
+    """
+    request = RequestFactory().get("/")
+    request.user = Users.objects.get(pk=user.pk)
+    return get_authorization(request)
+
+
+@pytest.mark.django_db
+def test_authorization_is_cached(setup_test_data, django_assert_num_queries):
+    """
+    Verify that the memberships are loaded once and then read from the cache
+    """
+    student = setup_test_data["student"]
+    setup_test_data["group"].add_students([student])
+    request = RequestFactory().get("/")
+    request.user = student
+
+    with django_assert_num_queries(3):
+        authz = get_authorization(request)
+    assert authz == {"role": "student", "groups": {setup_test_data["group"].pk}, "orders": set()}
+
+    with django_assert_num_queries(0):
+        assert get_authorization(request) is authz
+        request = RequestFactory().get("/")
+        request.user = student
+        assert get_authorization(request) == authz
+
+
+@pytest.mark.django_db
+def test_authorization_is_invalidated(setup_test_data):
+    """
+    Verify that changes of the memberships, the role and the professor
+    drop the cached authorization
+    """
+    student, teacher, group, order = (setup_test_data[key] for key in ("student", "teacher", "group", "order"))
+    assert authorization(student)["groups"] == set()
+    assert authorization(teacher)["groups"] == {group.pk}
+
+    # Bulk paths and signals
+    group.add_students([student])
+    assert authorization(student)["groups"] == {group.pk}
+    StudentGroups.objects.filter(student=student).delete()
+    assert authorization(student)["groups"] == set()
+
+    order.add_students([student])
+    assert authorization(student)["orders"] == {order.pk}
+    UserOrder.objects.filter(user=student).delete()
+    assert authorization(student)["orders"] == set()
+    UserOrder.objects.create(user=student, order=order)
+    assert authorization(student)["orders"] == {order.pk}
+
+    student.role = "teacher"
+    student.save()
+    assert authorization(student)["role"] == "teacher"
+
+    group.professor = setup_test_data["other_teacher"]
+    group.save()
+    assert authorization(teacher)["groups"] == set()
+    assert authorization(setup_test_data["other_teacher"])["groups"] == {group.pk}
+
+
+@pytest.mark.django_db
+def test_order_views_use_cached_memberships(setup_test_data, client):
+    """
+    Verify that the order views allow the members, forbid the others and
+    see the changes of the memberships
+    """
+    student, group, order = (setup_test_data[key] for key in ("student", "group", "order"))
+    client.force_login(student)
+
+    assert client.get(reverse("orden", kwargs={"pk": order.pk})).status_code == 403
+    assert client.get(reverse("crear-orden", kwargs={"pk": group.pk})).status_code == 403
+    assert client.get(reverse("crear-orden", kwargs={"pk": group.pk + 100})).status_code == 404
+
+    group.add_students([student])
+    UserOrder.objects.create(user=student, order=order)
+
+    assert client.get(reverse("orden", kwargs={"pk": order.pk})).status_code == 200
+    assert client.get(reverse("crear-orden", kwargs={"pk": group.pk})).status_code == 200
+
+    client.force_login(setup_test_data["teacher"])
+    assert client.get(reverse("crear-orden", kwargs={"pk": group.pk})).status_code == 200
@@ -0,0 +1,130 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                UserOrder, ItemOrder, Item, ItemStock)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+    client.force_login(admin)
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+    student = Users.objects.create_user(
+        username="student",
+        email="student@example.com",
+        password="studentpass",
+        role="student",
+        name="Sebas"
+    )
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    def create_order(count, status):
+        """
+        Creates an order with `count` items of different names in the given status
+        """
+        order = Order.objects.create(group=group1)
+        UserOrder.objects.create(order=order, user=student)
+        for i in range(count):
+            item = Item.objects.create(name=f"Item {order.pk}-{i}", is_available=False)
+            ItemOrder.objects.create(order=order, status=status, quantity=1, item=item)
+        # The items are created without the order forms, which keep the stock counters
+        ItemStock.objects.rebuild()
+        return order
+
+    return {
+        "client": client,
+        "create_order": create_order,
+    }
+
+
+def post_data(order, status):
+    item_orders = list(ItemOrder.objects.filter(order=order).order_by("id"))
+    data = {
+        'form-TOTAL_FORMS': str(len(item_orders)),
+        'form-INITIAL_FORMS': str(len(item_orders)),
+        'form-MIN_NUM_FORMS': '0',
+        'form-MAX_NUM_FORMS': '1000',
+    }
+    for i, item_order in enumerate(item_orders):
+        data.update({
+            f'form-{i}-id': str(item_order.id),
+            f'form-{i}-quantity': str(item_order.quantity),
+            f'form-{i}-code': item_order.code,
+            f'form-{i}-status': status,
+        })
+    return data
+
+
+@pytest.mark.django_db
+def test_order_details_admin_get_query_count(setup_test_data):
+    """
+    Test that the admin order details run the same number of queries
+    whatever the number of items in the order.
+    """
+    client = setup_test_data["client"]
+    small = setup_test_data["create_order"](1, "Solicitado")
+    large = setup_test_data["create_order"](6, "Solicitado")
+
+    counts = []
+    for order in (small, large):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse("admin-orden", kwargs={"pk": order.pk}))
+        assert response.status_code == 200
+        counts.append(len(context.captured_queries))
+
+    assert counts[0] == counts[1]
+    assert "Item %s-5" % large.pk in response.content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("source, target, order_status", [
+    ("Solicitado", "Prestado", "prestado"),
+    ("Prestado", "Devuelto", "completado"),
+])
+def test_order_details_admin_post_query_count(setup_test_data, source, target, order_status):
+    """
+    Test that the transitions of all the items of an order are applied in
+    the same number of queries whatever the number of items, keeping the
+    stock counters and the status of the order in sync.
+    """
+    client = setup_test_data["client"]
+    small = setup_test_data["create_order"](1, source)
+    large = setup_test_data["create_order"](6, source)
+
+    counts = []
+    for order in (small, large):
+        data = post_data(order, target)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(reverse("admin-orden", kwargs={"pk": order.pk}), data)
+        assert response.status_code == 302
+        counts.append(len(context.captured_queries))
+
+    assert counts[0] == counts[1]
+    assert set(ItemOrder.objects.filter(order=large).values_list("status", flat=True)) == {target}
+    large.refresh_from_db()
+    assert large.status == order_status
+    assert ItemStock.objects.rebuild(commit=False) == {}
+    if target == "Devuelto":
+        assert not Item.objects.filter(is_available=False).exists()
+        assert not ItemOrder.objects.filter(return_date__isnull=True).exists()
+    else:
+        assert not ItemOrder.objects.filter(loan_date__isnull=True).exists()
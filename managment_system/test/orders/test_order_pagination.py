@@ -0,0 +1,146 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.models import Class, ClassGroups, Order, UserOrder, Users
+from supply_room.utils import encode_cursor
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+    student = Users.objects.create_user(
+        username="student",
+        email="student@example.com",
+        password="studentpass",
+        role="student"
+    )
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    # 25 orders spread over 5 semesters, created out of order
+    for year, term in [(2024, "II"), (2025, "I"), (2023, "III"), (2025, "II"), (2024, "I")]:
+        group = ClassGroups.objects.create(number=1, year=year, term=term, professor=teacher, class_id=class1)
+        for i in range(5):
+            order = Order.objects.create(group=group)
+            UserOrder.objects.create(order=order, user=student)
+
+    expected = list(Order.objects.order_by("-year", "-term", "id").values_list("id", flat=True))
+    return {
+        "client": client,
+        "users": {"admin": admin, "teacher": teacher, "student": student},
+        "expected": expected,
+    }
+
+
+def walk(client, url, direction, cursor=None):
+    """
+    Follows the cursors of the list from the given cursor, returns the ids of every page
+    """
+    pages = []
+    while True:
+        response = client.get(url, {"cursor": cursor} if cursor else {})
+        assert response.status_code == 200
+        page_obj = response.context["page_obj"]
+        pages.append([order.id for order in page_obj])
+        cursor = page_obj.next_cursor if direction == "next" else page_obj.previous_cursor
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("role, url_name", [
+    ("student", "mis-ordenes"),
+    ("teacher", "mis-ordenes"),
+    ("admin", "administrar-ordenes"),
+])
+def test_order_pagination_cursors(setup_test_data, role, url_name):
+    """
+    Test that following the next and previous cursors visits every order once, in order.
+    """
+    client = setup_test_data["client"]
+    expected = setup_test_data["expected"]
+    client.force_login(setup_test_data["users"][role])
+    url = reverse(url_name)
+
+    pages = walk(client, url, "next")
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == expected
+
+    # From the last page back to the first one
+    last = client.get(url, {"cursor": client.get(url).context["page_obj"].last_cursor})
+    assert [order.id for order in last.context["page_obj"]] == expected[-10:]
+    pages = walk(client, url, "prev", last.context["page_obj"].previous_cursor)
+    assert sum(reversed(pages), []) == expected[:15]
+
+
+@pytest.mark.django_db
+def test_order_pagination_invalid_cursor(setup_test_data):
+    """
+    Test that an invalid cursor shows the first page.
+    """
+    client = setup_test_data["client"]
+    client.force_login(setup_test_data["users"]["student"])
+
+    response = client.get(reverse("mis-ordenes"), {"cursor": "no-es-un-cursor"})
+
+    assert response.status_code == 200
+    assert [order.id for order in response.context["page_obj"]] == setup_test_data["expected"][:10]
+    assert not response.context["page_obj"].has_previous()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["mis-ordenes", "administrar-ordenes"])
+@pytest.mark.parametrize("values", [
+    ["next", "abc", "I", 1],
+    ["prev", 2025, "I", {"id": 1}],
+    ["next", 2025, "I", None],
+    ["next", [2025], "I", 1],
+])
+def test_order_pagination_tampered_cursor(setup_test_data, url_name, values):
+    """
+    Test that a cursor with sort key values that don't fit the fields shows the first page.
+    """
+    client = setup_test_data["client"]
+    role = "admin" if url_name == "administrar-ordenes" else "student"
+    client.force_login(setup_test_data["users"][role])
+
+    response = client.get(reverse(url_name), {"cursor": encode_cursor(values)})
+
+    assert response.status_code == 200
+    assert [order.id for order in response.context["page_obj"]] == setup_test_data["expected"][:10]
+
+
+@pytest.mark.django_db
+def test_admin_order_pagination_total_and_queries(setup_test_data):
+    """
+    Test that the admin list shows the total without searching and that a
+    deep page runs the same queries as the first one.
+    """
+    client = setup_test_data["client"]
+    client.force_login(setup_test_data["users"]["admin"])
+    url = reverse("administrar-ordenes")
+
+    with CaptureQueriesContext(connection) as first:
+        response = client.get(url)
+    assert response.context["page_obj"].paginator.count == 25
+    cursor = response.context["page_obj"].next_cursor
+    cursor = client.get(url, {"cursor": cursor}).context["page_obj"].next_cursor
+    with CaptureQueriesContext(connection) as deep:
+        response = client.get(url, {"cursor": cursor})
+    assert len(response.context["page_obj"]) == 5
+    assert len(deep) == len(first)
+
+    response = client.get(url, {"search": "maquinas"})
+    assert response.context["page_obj"].paginator.count is None
+    assert "de <span" not in response.content.decode()
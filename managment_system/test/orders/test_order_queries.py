@@ -0,0 +1,115 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                UserOrder, ItemOrder, Item)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+    client.force_login(admin)
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2025,
+                                        term='I',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    item1 = Item.objects.create(name='Resistor', is_available=True)
+
+    def create_orders(count):
+        """
+        Creates `count` orders with two members and an item in a different status each
+        """
+        statuses = ["Solicitado", "Prestado", "Devuelto"]
+        for i in range(count):
+            order = Order.objects.create(group=group1)
+            for j in range(2):
+                student = Users.objects.create_user(
+                    email=f"student{Order.objects.count()}-{j}@example.com",
+                    password="studentpass",
+                    role="student",
+                    name=f"Student {i}-{j}"
+                )
+                UserOrder.objects.create(order=order, user=student)
+            ItemOrder.objects.create(order=order, status=statuses[i % 3], quantity=1, item=item1)
+
+    return {
+        "client": client,
+        "create_orders": create_orders,
+    }
+
+
+def count_queries(client, url):
+    # Every request starts without the cached totals per status
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_admin_order_list_query_count(setup_test_data):
+    """
+    Test that the admin order list runs the same number of queries
+    whatever the number of orders in the page.
+    """
+    client = setup_test_data["client"]
+    url = reverse("administrar-ordenes")
+
+    setup_test_data["create_orders"](2)
+    few = count_queries(client, url)
+
+    setup_test_data["create_orders"](8)
+    many = count_queries(client, url)
+
+    assert few == many
+    assert count_queries(client, url + "?status=pendiente&search=Student") == many
+
+
+@pytest.mark.django_db
+def test_admin_order_list_status(setup_test_data):
+    """
+    Test that the annotated status matches the items of each order.
+    """
+    client = setup_test_data["client"]
+    setup_test_data["create_orders"](3)
+
+    response = client.get(reverse("administrar-ordenes"))
+    statuses = sorted(order.needs_attention for order in response.context['object_list'])
+
+    assert statuses == ["completado", "pendiente", "prestado"]
+
+
+@pytest.mark.django_db
+def test_admin_order_details_query_count(setup_test_data):
+    """
+    Test that the order header doesn't query the status and members per access.
+    """
+    client = setup_test_data["client"]
+    setup_test_data["create_orders"](1)
+    order = Order.objects.get()
+
+    response = client.get(reverse("admin-orden", kwargs={"pk": order.pk}))
+    assert response.status_code == 200
+    assert response.context["order"].needs_attention == "pendiente"
+    assert len(response.context["order"].members) == 2
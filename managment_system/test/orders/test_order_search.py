@@ -0,0 +1,106 @@
+import pytest
+from django.urls import reverse
+from supply_room.models import (Class, Users, ClassGroups, Order, UserOrder)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+    client.force_login(admin)
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    student1 = Users.objects.create_user(
+        username="student1",
+        email="student1@example.com",
+        password="student1pass",
+        role="student",
+        name="José Núñez",
+        student_id="B12345"
+    )
+
+    student2 = Users.objects.create_user(
+        username="student2",
+        email="student2@example.com",
+        password="student2pass",
+        role="student",
+        name="Ana"
+    )
+
+    class1 = Class.objects.create(name="Lab Máquinas", code="IE001")
+    class2 = Class.objects.create(name="Circuitos", code="IE002")
+
+    group1 = ClassGroups.objects.create(number=1, year=2025, term='I',
+                                        professor=teacher, class_id=class1)
+    group2 = ClassGroups.objects.create(number=1, year=2025, term='I',
+                                        professor=teacher, class_id=class2)
+
+    order1 = Order.objects.create(group=group1)
+    order2 = Order.objects.create(group=group2)
+    UserOrder.objects.create(order=order1, user=student1)
+    order2.add_students([student2])
+
+    return {
+        "client": client,
+        "students": [student1, student2],
+        "classes": [class1, class2],
+        "orders": [order1, order2],
+    }
+
+
+def search(client, text):
+    response = client.get(reverse("administrar-ordenes"), {'search': text})
+    assert response.status_code == 200
+    return list(response.context['object_list'])
+
+
+@pytest.mark.django_db
+def test_search_document(setup_test_data):
+    """
+    Test that the orders are found by class and member data, ignoring case and accents
+    """
+    client = setup_test_data["client"]
+    order1, order2 = setup_test_data["orders"]
+
+    assert search(client, "maquinas") == [order1]
+    assert search(client, "ie00") == [order1, order2]
+    assert search(client, "JOSE nuñez") == [order1]
+    assert search(client, "b123") == [order1]
+    assert search(client, "student2@") == [order2]
+    assert search(client, "nadie") == []
+
+
+@pytest.mark.django_db
+def test_search_document_follows_changes(setup_test_data):
+    """
+    Test that the signals keep the search document in sync
+    """
+    client = setup_test_data["client"]
+    student1, student2 = setup_test_data["students"]
+    class1, _ = setup_test_data["classes"]
+    order1, order2 = setup_test_data["orders"]
+
+    student2.name = "Beatriz"
+    student2.save()
+    assert search(client, "beatriz") == [order2]
+
+    class1.name = "Electrónica"
+    class1.save()
+    assert search(client, "electronica") == [order1]
+    assert search(client, "maquinas") == []
+
+    UserOrder.objects.create(order=order2, user=student1)
+    assert search(client, "jose") == [order1, order2]
+
+    UserOrder.objects.filter(order=order1, user=student1).delete()
+    assert search(client, "jose") == [order2]
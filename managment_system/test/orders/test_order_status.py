@@ -0,0 +1,160 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from supply_room.cron import clear_expired_requests
+from supply_room.models import (Class, Users, ClassGroups, Order,
+                                ItemOrder, Item)
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username="admin",
+        email="admin@example.com",
+        password="adminpass",
+        role="admin"
+    )
+    client.force_login(admin)
+
+    teacher = Users.objects.create_user(
+        username="teacher",
+        email="teacher@example.com",
+        password="teacherpass",
+        role="teacher"
+    )
+
+    class1 = Class.objects.create(name="Lab Maquinas", code="IE001")
+
+    group1 = ClassGroups.objects.create(number=1,
+                                        year=2024,
+                                        term='II',
+                                        professor=teacher,
+                                        class_id=class1
+                                        )
+
+    order1 = Order.objects.create(group=group1)
+    order2 = Order.objects.create(group=group1)
+
+    items = [Item.objects.create(name='Resistor', is_available=False) for _ in range(3)]
+
+    return {
+        "client": client,
+        "group": group1,
+        "orders": [order1, order2],
+        "items": items,
+    }
+
+
+def status(order):
+    order.refresh_from_db()
+    return order.status, order.requested_items, order.loaned_items
+
+
+@pytest.mark.django_db
+def test_status_follows_items(setup_test_data):
+    """
+    Test that the stored status changes with the status of the items of the order.
+    """
+    order = setup_test_data["orders"][0]
+    item1, item2, _ = setup_test_data["items"]
+    assert status(order) == ("completado", 0, 0)
+
+    first = ItemOrder.objects.create(order=order, item=item1, quantity=1)
+    second = ItemOrder.objects.create(order=order, item=item2, quantity=1, status="Prestado")
+    assert status(order) == ("pendiente", 1, 1)
+
+    first = ItemOrder.objects.get(pk=first.pk)
+    first.status = "Denegado"
+    first.save()
+    assert status(order) == ("prestado", 0, 1)
+
+    second = ItemOrder.objects.get(pk=second.pk)
+    second.status = "Devuelto"
+    second.save()
+    assert status(order) == ("completado", 0, 0)
+
+    third = ItemOrder.objects.create(order=order, item=item1, quantity=1)
+    assert status(order) == ("pendiente", 1, 0)
+    third.delete()
+    assert status(order) == ("completado", 0, 0)
+
+
+@pytest.mark.django_db
+def test_status_after_expiry(setup_test_data):
+    """
+    Test that the expired requests sweep updates the status of the orders.
+    """
+    order1, order2 = setup_test_data["orders"]
+    item1, item2, item3 = setup_test_data["items"]
+
+    expired = timezone.now() - timedelta(hours=48)
+    ItemOrder.objects.create(order=order1, item=item1, quantity=1, request_date=expired)
+    ItemOrder.objects.create(order=order1, item=item2, quantity=1, status="Prestado", request_date=expired)
+    ItemOrder.objects.create(order=order2, item=item3, quantity=1, request_date=expired)
+
+    clear_expired_requests()
+
+    assert status(order1) == ("prestado", 0, 1)
+    assert status(order2) == ("completado", 0, 0)
+    assert Order.objects.filter(pk=order1.pk).refresh_status() == 1
+    assert status(order1) == ("prestado", 0, 1)
+
+
+@pytest.mark.django_db
+def test_semester_follows_group(setup_test_data):
+    """
+    Test that the orders keep the semester of their group as sort key.
+    """
+    group = setup_test_data["group"]
+    order = setup_test_data["orders"][0]
+
+    order.refresh_from_db()
+    assert (order.year, order.term) == (2024, "II")
+
+    group.year, group.term = 2025, "I"
+    group.save()
+
+    order.refresh_from_db()
+    assert (order.year, order.term) == (2025, "I")
+
+
+@pytest.mark.django_db
+def test_admin_status_totals(setup_test_data):
+    """
+    Test that the admin list filters on the stored status and shows the totals.
+    """
+    client = setup_test_data["client"]
+    order1, order2 = setup_test_data["orders"]
+    ItemOrder.objects.create(order=order1, item=setup_test_data["items"][0], quantity=1)
+
+    response = client.get(reverse("administrar-ordenes") + "?status=pendiente")
+
+    assert response.status_code == 200
+    assert list(response.context['object_list']) == [order1]
+    assert response.context['status_totals'] == {"pendiente": 1, "prestado": 0, "completado": 1, "todas": 2}
+    assert "Pendientes (1)" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_admin_status_filters_overlap(setup_test_data):
+    """
+    Test that an order with items requested and on loan is listed under
+    pendiente and under prestado, and counted in both.
+    """
+    client = setup_test_data["client"]
+    order1, order2 = setup_test_data["orders"]
+    item1, item2, _ = setup_test_data["items"]
+    ItemOrder.objects.create(order=order1, item=item1, quantity=1)
+    ItemOrder.objects.create(order=order1, item=item2, quantity=1, status="Prestado")
+
+    url = reverse("administrar-ordenes")
+    for status in ("pendiente", "prestado"):
+        response = client.get(url, {"status": status})
+        assert list(response.context['object_list']) == [order1]
+        assert response.context['page_obj'].paginator.count == 1
+    assert list(client.get(url, {"status": "completado"}).context['object_list']) == [order2]
+
+    response = client.get(url)
+    assert response.context['status_totals'] == {"pendiente": 1, "prestado": 1, "completado": 1, "todas": 2}
+    assert response.context['page_obj'].paginator.count == 2
@@ -0,0 +1,82 @@
+import pytest
+from django.urls import reverse
+from supply_room.models import Item, SlowQuery, Users
+from supply_room.slow_queries import normalize, redact
+
+
+def test_huella_sin_literales():
+    """
+    Test that the same query with other values gives the same normalized text.
+    """
+    first = normalize("SELECT * FROM item WHERE id IN (%s, %s, %s) AND name = 'a'  LIMIT 21")
+    second = normalize("SELECT *\n FROM item WHERE id IN (%s) AND name = 'it''s' LIMIT 5")
+
+    assert first == second == "SELECT * FROM item WHERE id IN (...) AND name = ? LIMIT ?"
+    assert normalize("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (...)"
+
+
+def test_parametros_redactados():
+    """
+    Test that the text parameters are not saved, only their length.
+    """
+    assert redact(("admin@example.com", 5, None, ["a", True])) == ["<str 17>", 5, None, ["<str 1>", True]]
+
+
+@pytest.mark.django_db
+def test_consultas_lentas_capturadas(client, settings):
+    """
+    Test that the slow statements of a request are saved with their view,
+    the code and template that ran them and their plan.
+    """
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_EXPLAIN = True
+    admin = Users.objects.create_user(username='admin', email='admin@example.com', password='adminpass', role='admin')
+    client.force_login(admin)
+    Item.objects.create(name="Resistencia", is_available=True)
+
+    response = client.get(reverse("articulos"), {"q": "Resis"})
+    assert response.status_code == 200
+
+    queries = SlowQuery.objects.filter(view="articulos")
+    assert queries.exists()
+    assert all(len(query.fingerprint) == 32 for query in queries)
+    assert queries.filter(caller__startswith="supply_room/").exists()
+    # The search text is never saved
+    assert not queries.filter(params__icontains="Resis").exists()
+    assert queries.filter(explain__contains="actual time").exists()
+    # The watchdog does not capture its own statements
+    assert not SlowQuery.objects.filter(statement__contains="supply_room_slowquery").exists()
+
+
+@pytest.mark.django_db
+def test_consultas_lentas_desactivadas(client, settings):
+    """
+    Test that nothing is captured without SLOW_QUERY_THRESHOLD_MS.
+    """
+    settings.SLOW_QUERY_THRESHOLD_MS = None
+    admin = Users.objects.create_user(username='admin', email='admin@example.com', password='adminpass', role='admin')
+    client.force_login(admin)
+
+    client.get(reverse("articulos"))
+
+    assert not SlowQuery.objects.exists()
+
+
+@pytest.mark.django_db
+def test_consultas_lentas_por_huella(client, settings):
+    """
+    Test that the admin groups the slow queries by fingerprint.
+    """
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    superuser = Users.objects.create_superuser(username='root', email='root@example.com', password='rootpass')
+    client.force_login(superuser)
+    client.get(reverse("articulos"))
+    client.get(reverse("articulos"))
+
+    rows = list(SlowQuery.objects.by_fingerprint())
+    assert rows and any(row["calls"] >= 2 for row in rows)
+
+    response = client.get(reverse("admin:supply_room_slowquery_fingerprints"))
+    assert response.status_code == 200
+    assert "Consultas lentas por huella" in response.content.decode()
+    assert client.get(reverse("admin:supply_room_slowquery_changelist")).status_code == 200
@@ -0,0 +1,64 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from managment_system.middleware import LoginRequiredMiddleware
+from supply_room.models import Users
+
+
+def ok(request):
+    return HttpResponse("ok")
+
+
+def anonymous_request(path):
+    """
+    Request without session nor user, any access to them fails
+    """
+    return RequestFactory().get(path)
+
+
+@pytest.mark.django_db
+def test_login_required_redirects_anonymous_users(client):
+    """
+    Verify that the private pages redirect to the login and the public ones don't
+    """
+    response = client.get("/ordenes")
+    assert response.status_code == 302
+    assert response.url == "/accounts/login/"
+
+    assert client.get("/accounts/login/").status_code == 200
+    assert client.get("/accounts/register/").status_code == 200
+
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.content == b"ok"
+
+
+@pytest.mark.django_db
+def test_login_required_lets_users_in(client):
+    """
+    Verify that an authenticated user reaches the private pages
+    """
+    user = Users.objects.create_user(email="student@example.com", password="pass", role="student")
+    client.force_login(user)
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/", follow=False).status_code == 200
+
+
+def test_login_required_exempt_paths_skip_the_user(settings):
+    """
+    Verify that the exempt paths, prefixes and regular expressions are
+    answered without loading the user
+    """
+    settings.LOGIN_EXEMPT_PREFIXES = ["/static/", "/public/"]
+    settings.LOGIN_EXEMPT_REGEXES = [r"/api/v\d+/status$"]
+    middleware = LoginRequiredMiddleware(ok)
+
+    for path in ("/accounts/login/", "/health", "/static/css/output.css", "/public/x", "/api/v2/status"):
+        # The requests have no user, reading it would raise AttributeError
+        assert middleware(anonymous_request(path)).status_code == 200
+
+    assert not middleware.is_exempt("/api/v2/status/other")
+    assert not middleware.is_exempt("/ordenes")
+    with pytest.raises(AttributeError):
+        middleware(anonymous_request("/ordenes"))
@@ -0,0 +1,91 @@
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.urls import reverse
+from supply_room import metrics
+from supply_room.metrics import reset_metrics
+from supply_room.models import Item, Users
+
+
+def metric(text, line_start):
+    """
+    Value of the first line of the exposition that starts with `line_start`
+    """
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+@pytest.mark.django_db
+def test_metricas_por_vista(client):
+    """
+    Test that the requests are measured under the URL name of their view.
+    """
+    reset_metrics()
+    admin = Users.objects.create_user(username='admin', email='admin@example.com', password='adminpass', role='admin')
+    client.force_login(admin)
+    Item.objects.create(name="Resistencia", is_available=True)
+
+    client.get(reverse("articulos"))
+    client.get(reverse("articulos"))
+
+    response = client.get(reverse("metrics"))
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    text = response.content.decode()
+
+    assert metric(text, 'supply_room_request_duration_seconds_count{view="articulos"}') == 2
+    assert metric(text, 'supply_room_request_duration_seconds_bucket{view="articulos",le="+Inf"}') == 2
+    assert metric(text, 'supply_room_responses_total{view="articulos",status="2xx"}') == 2
+    assert metric(text, 'supply_room_sql_queries_total{view="articulos"}') > 0
+    assert metric(text, 'supply_room_sql_duration_seconds_total{view="articulos"}') > 0
+    assert metric(text, 'supply_room_template_duration_seconds_total{view="articulos"}') > 0
+    # The second request reads the list from the cache
+    assert metric(text, 'supply_room_cache_requests_total{view="articulos",result="hit"}') >= 1
+    assert metric(text, 'supply_room_cache_requests_total{view="articulos",result="miss"}') >= 1
+
+
+@pytest.mark.django_db
+def test_metricas_solo_admin(client):
+    """
+    Test that only the admins can read the metrics.
+    """
+    teacher = Users.objects.create_user(username='teacher', email='teacher@example.com', password='testpass', role='teacher')
+    client.force_login(teacher)
+
+    assert client.get(reverse("metrics")).status_code == 403
+
+
+class ClientCache(LocMemCache):
+    """
+    Cache with the extra argument of the reads of django_redis
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        return super().get(key, default, version)
+
+    def get_many(self, keys, version=None, client=None):
+        return super().get_many(keys, version)
+
+
+def test_metricas_cache_con_argumentos_extra():
+    """
+    Test that the measured reads pass through the extra arguments of the
+    backend and that only the instance is wrapped, not its class.
+    """
+    cache = ClientCache("metricas", {})
+    metrics._measure_cache(cache)
+    cache.set("a", 1)
+
+    stats = metrics.RequestStats()
+    metrics._local.stats = stats
+    try:
+        assert cache.get("a", client=None) == 1
+        assert cache.get("b", "x", None, client=None) == "x"
+        assert cache.get("b", default="y", version=None) == "y"
+        assert cache.get_many(["a", "b"], version=None, client=None) == {"a": 1}
+    finally:
+        metrics._local.stats = None
+
+    assert (stats.cache_hits, stats.cache_misses) == (2, 3)
+    assert not hasattr(ClientCache, "measured") and not hasattr(LocMemCache, "measured")
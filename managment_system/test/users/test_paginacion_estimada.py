@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from supply_room.models import Users
+from supply_room.utils import EstimatedCountPaginator
+
+
+@pytest.fixture
+def setup_test_data(client):
+    admin = Users.objects.create_user(
+        username='admin',
+        email='admin@example.com',
+        password='adminpass',
+        role='admin'
+    )
+    client.force_login(admin)
+    Users.objects.bulk_create([
+        Users(username=f'student{i}', email=f'student{i}@example.com', name=f'Student {i:02}', role='student')
+        for i in range(15)
+    ])
+    return client
+
+
+def count_queries(context):
+    return [query for query in context.captured_queries if 'COUNT(' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_estudiantes_count_cached(setup_test_data):
+    """
+    Test that the exact count of a small list is cached between requests.
+    """
+    client = setup_test_data
+
+    with CaptureQueriesContext(connection) as first:
+        response = client.get(reverse('estudiantes'))
+    assert response.context['page_obj'].paginator.count == 15
+    assert not response.context['page_obj'].paginator.estimated
+    assert len(count_queries(first)) == 1
+
+    with CaptureQueriesContext(connection) as second:
+        response = client.get(reverse('estudiantes'), {'page': 2})
+    assert len(response.context['page_obj']) == 5
+    assert count_queries(second) == []
+    assert 'Página 2 de 2.' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_estudiantes_count_estimated(setup_test_data, monkeypatch):
+    """
+    Test that large lists use the estimate of the database without counting
+    and find the last page from the rows.
+    """
+    monkeypatch.setattr(EstimatedCountPaginator, 'estimate_threshold', 0)
+    client = setup_test_data
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse('estudiantes'))
+    page_obj = response.context['page_obj']
+    assert page_obj.paginator.estimated
+    assert count_queries(context) == []
+    assert page_obj.has_next()
+    assert '~' in response.content.decode()
+    assert 'Última' not in response.content.decode()
+
+    response = client.get(reverse('estudiantes'), {'page': 2})
+    page_obj = response.context['page_obj']
+    assert [student.name for student in page_obj] == [f'Student {i:02}' for i in range(10, 15)]
+    assert not page_obj.has_next()
+    assert page_obj.has_previous()
+
+    # A page past the rows is not found, as with an exact count
+    assert client.get(reverse('estudiantes'), {'page': 50}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_get_page_fuera_de_rango(setup_test_data):
+    """
+    Test that get_page gives the first page for non-integers and the last
+    one for out of range numbers, as Paginator.get_page.
+    """
+    paginator = EstimatedCountPaginator(Users.objects.filter(role='student').order_by('name'), 10)
+
+    assert paginator.get_page('abc').number == 1
+    assert paginator.get_page(99).number == 2
+    assert paginator.get_page(0).number == 2
+
+
+@pytest.mark.django_db
+def test_get_page_fuera_de_rango_estimado(setup_test_data, monkeypatch):
+    """
+    Test that with an estimate larger than the rows an out of range number
+    gives the real last page.
+    """
+    monkeypatch.setattr(EstimatedCountPaginator, 'estimate_threshold', 0)
+    monkeypatch.setattr(EstimatedCountPaginator, 'estimate', lambda self: 1000)
+    paginator = EstimatedCountPaginator(Users.objects.filter(role='student').order_by('name'), 10)
+    assert paginator.estimated
+
+    page = paginator.get_page(99)
+    assert page.number == 2
+    assert [student.name for student in page] == [f'Student {i:02}' for i in range(10, 15)]
+    assert not page.has_next()
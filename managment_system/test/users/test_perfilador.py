@@ -0,0 +1,49 @@
+import pytest
+from django.urls import reverse
+from supply_room.models import Item, RequestProfile, Users
+
+
+@pytest.mark.django_db
+def test_perfil_de_solicitud(client):
+    """
+    Test that an admin gets the profile of a request with ?perfilar.
+    """
+    admin = Users.objects.create_user(username='admin', email='admin@example.com', password='adminpass', role='admin')
+    client.force_login(admin)
+    Item.objects.create(name="Resistencia", is_available=True)
+
+    response = client.get(reverse("articulos"), {"perfilar": ""})
+    assert response.status_code == 200
+
+    profile = RequestProfile.objects.get()
+    assert response["X-Profile-Url"] == reverse("perfil-solicitud", args=[profile.id])
+    assert response["X-Profile-Url"].encode() in response.content
+    assert profile.user == admin
+    assert profile.view == "articulos"
+    assert profile.status_code == 200
+    assert profile.sql_queries == sum(query["calls"] for query in profile.queries) > 0
+    assert profile.peak_memory > 0
+    assert profile.allocations
+    assert any(function["location"].startswith("supply_room/views.py") for function in profile.functions if function["project"])
+
+    detail = client.get(response["X-Profile-Url"])
+    assert detail.status_code == 200
+    assert "SQL por consulta" in detail.content.decode()
+    assert client.get(reverse("perfiles")).status_code == 200
+
+
+@pytest.mark.django_db
+def test_perfil_solo_admin(client):
+    """
+    Test that the flag is ignored for the other users and they can not
+    see the profiles.
+    """
+    teacher = Users.objects.create_user(username='teacher', email='teacher@example.com', password='testpass', role='teacher')
+    client.force_login(teacher)
+
+    response = client.get(reverse("articulos"), {"perfilar": ""})
+
+    assert response.status_code == 200
+    assert not response.has_header("X-Profile-Url")
+    assert not RequestProfile.objects.exists()
+    assert client.get(reverse("perfiles")).status_code == 403